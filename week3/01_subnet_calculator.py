@@ -3,6 +3,16 @@
 # Calculates network information for IPv4 subnets
 # This helps determine how many devices can be on a network
 
+import re
+import time
+from array import array
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def calculate_subnet(network_ip, subnet_mask):
     
     """
@@ -34,7 +44,13 @@ def calculate_subnet(network_ip, subnet_mask):
     # First desk = the teacher's desk (network address - identifies the classroom)
     # Last desk = the teacher's microphone (broadcast address - talks to everyone)
     # Whatever number we calculated above, we subtract 2 to get usable student desks
-    usable_hosts = total_ips - 2
+    # Two exceptions: a /31 is a point-to-point link (RFC 3021) with no
+    # teacher's desk or microphone, so both desks are usable, and a /32 is
+    # a single desk (one host)
+    if subnet_mask <= 30:
+        usable_hosts = total_ips - 2
+    else:
+        usable_hosts = total_ips
     
  # This part figures out which ATCC building this network belongs to (network class)
     # We look at the first number of the IP address:
@@ -72,63 +88,720 @@ def calculate_subnet(network_ip, subnet_mask):
     }
 
 
+# Batch mode
+# calculate_subnet answers for ONE classroom at a time. For an IPAM audit
+# we get whole lists of networks, so the functions below do the same math
+# on entire columns of (network, prefix) pairs at once. With NumPy every
+# step is one bit operation over the whole column, no Python loop per row.
+
+# First octets where the network class changes:
+# below 1 = Unknown, 1-127 = A, 128-191 = B, 192-223 = C, 224 and up = Unknown
+CLASS_BOUNDS = (1, 128, 192, 224)
+CLASS_NAMES = ('Unknown', 'A', 'B', 'C', 'Unknown')
+
+# One entry per line: an IP address, optionally followed by a prefix
+# length after a slash, comma or whitespace ("192.168.1.0/24")
+IP_LINE = re.compile(rb'\s*(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})\s*')
+SUBNET_LINE = re.compile(
+    rb'\s*(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})(?:\s*[/,]\s*|\s+)(\d{1,3})\s*')
+
+# bytes.translate table sorting every byte into one of these kinds (0 for
+# anything that cannot appear in an entry); the NumPy parser works on kinds
+DIGIT, DOT, SEPARATOR, SPACE, NEWLINE = 1, 2, 3, 4, 5
+CHAR_KINDS = bytes(
+    DIGIT if 48 <= c <= 57
+    else DOT if c == ord('.')
+    else SEPARATOR if c in b'/,'
+    else NEWLINE if c == ord('\n')
+    else SPACE if c in b' \t\r\f\v'
+    else 0
+    for c in range(256)
+)
+
+
+def ip_to_int(ip):
+    """
+    Converts a dotted IP address to its 32-bit number.
+    """
+    octets = [int(octet) for octet in ip.split('.')]
+    if len(octets) != 4 or not all(0 <= octet <= 255 for octet in octets):
+        raise ValueError(f"Invalid IP address: {ip}")
+    return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+
+def int_to_ip(value):
+    """
+    Converts a 32-bit number back to a dotted IP address.
+    """
+    value = int(value)
+    return f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+
+
+def _split_numbers(data, width):
+    """
+    Splits lines of dotted/slashed text into unsigned numbers.
+    
+    Every non-blank line must be one entry: an IP address (width 4) or
+    an IP address plus a prefix length (width 5), see IP_LINE and
+    SUBNET_LINE. With NumPy the checks and the digit conversion run over
+    the whole buffer at once instead of line by line.
+    
+    Returns: uint64 NumPy array (array('Q') without NumPy) of the
+    numbers in row order
+    
+    Raises: ValueError naming the first malformed line
+    """
+    example = "192.168.1.0/24" if width == 5 else "192.168.1.0"
+    if np is None:
+        pattern = SUBNET_LINE if width == 5 else IP_LINE
+        fields = array('Q')
+        for number, line in enumerate(data.split(b'\n'), 1):
+            if line.isspace() or not line:
+                continue
+            match = pattern.fullmatch(line)
+            if match is None:
+                raise ValueError(f"Line {number}: expected an entry like {example}")
+            fields.extend(map(int, match.groups()))
+        return fields
+    
+    raw = np.frombuffer(data, dtype=np.uint8)
+    kind = np.frombuffer(data.translate(CHAR_KINDS), dtype=np.uint8)
+    # Line number (from 0) of every byte
+    line = np.cumsum(kind == NEWLINE, dtype=np.int32)
+    line_count = int(line[-1]) + 1 if line.size else 1
+    
+    def line_of(position):
+        return int(line[position]) + 1
+    
+    digit = kind == DIGIT
+    bad = kind == 0
+    if bad.any():
+        raise ValueError(f"Line {line_of(np.argmax(bad))}: expected an entry like {example}")
+    
+    # Numbers are runs of digits
+    edges = np.diff(np.concatenate(([False], digit, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    lengths = ends - starts + 1
+    
+    # Each non-blank line holds exactly one entry
+    per_line = np.bincount(line[starts], minlength=line_count)
+    wrong = (per_line != 0) & (per_line != width)
+    if wrong.any():
+        raise ValueError(f"Line {np.argmax(wrong) + 1}: expected an entry like {example}")
+    if lengths.size and lengths.max() > 3:
+        raise ValueError(f"Line {line_of(starts[np.argmax(lengths > 3)])}: "
+                         f"expected an entry like {example}")
+    
+    # The only dots are the three single ones joining the octets
+    row_starts = starts.reshape(-1, width)
+    row_ends = ends.reshape(-1, width)
+    joined = ((row_starts[:, 1:4] == row_ends[:, :3] + 2) &
+              (raw[row_ends[:, :3] + 1] == ord('.'))).all(axis=1)
+    dots_per_line = np.bincount(line[kind == DOT], minlength=line_count)
+    wrong = dots_per_line != np.where(per_line > 0, 3, 0)
+    wrong[line[row_starts[~joined, 0]]] = True
+    if wrong.any():
+        raise ValueError(f"Line {np.argmax(wrong) + 1}: expected an entry like {example}")
+    
+    # At most one slash/comma per entry, between the address and the prefix
+    separators = np.flatnonzero(kind == SEPARATOR)
+    numbers_before = np.searchsorted(starts, separators)
+    misplaced = (numbers_before % width != 4) | np.concatenate(
+        ([False], np.diff(numbers_before) == 0))
+    if misplaced.any():
+        raise ValueError(f"Line {line_of(separators[np.argmax(misplaced)])}: "
+                         f"expected an entry like {example}")
+    
+    # Digits to values, one digit position per pass (at most three)
+    fields = (raw[starts] - ord('0')).astype(np.int32)
+    for offset in (1, 2):
+        more = np.flatnonzero(lengths > offset)
+        fields[more] = fields[more] * 10 + (raw[starts[more] + offset] - ord('0'))
+    return fields.astype(np.uint64)
+
+
+def _pack_octets(fields, width):
+    """
+    Combines the four octets at the start of each row into a 32-bit number.
+    
+    Returns: (addresses, rest) where rest is the remaining column (the
+    prefix length) when width is 5, or None
+    """
+    if np is not None:
+        table = fields.reshape(-1, width)
+        if table.size and table[:, :4].max() > 255:
+            raise ValueError("IP address octets must be 0-255")
+        addresses = ((table[:, 0] << 24) | (table[:, 1] << 16) |
+                     (table[:, 2] << 8) | table[:, 3]).astype(np.uint32)
+        rest = table[:, 4] if width == 5 else None
+        return addresses, rest
+    
+    columns = [fields[i::width] for i in range(width)]
+    if fields and max(max(column) for column in columns[:4]) > 255:
+        raise ValueError("IP address octets must be 0-255")
+    addresses = array('I', map(lambda a, b, c, d: (a << 24) | (b << 16) | (c << 8) | d,
+                               *columns[:4]))
+    rest = columns[4] if width == 5 else None
+    return addresses, rest
+
+
+def ips_to_ints(ips):
+    """
+    Converts a list of dotted IP addresses to 32-bit numbers in one go.
+    
+    Returns: uint32 NumPy array (array('I') without NumPy)
+    """
+    data = '\n'.join(ips).encode()
+    addresses, _ = _pack_octets(_split_numbers(data, 4), 4)
+    return addresses
+
+
+def parse_subnets(data):
+    """
+    Parses (network, prefix) pairs from text or bytes with one entry per
+    line, written as 192.168.1.0/24, "192.168.1.0 24" or 192.168.1.0,24.
+    
+    Returns: (networks, prefixes) as uint32 and uint8 NumPy arrays, or
+    array('I') and array('B') when NumPy is not installed
+    
+    Raises: ValueError naming the first malformed line
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    networks, prefixes = _pack_octets(_split_numbers(data, 5), 5)
+    if np is not None:
+        if prefixes.size and prefixes.max() > 32:
+            raise ValueError("Prefix lengths must be 0-32")
+        return networks, prefixes.astype(np.uint8)
+    if prefixes and max(prefixes) > 32:
+        raise ValueError("Prefix lengths must be 0-32")
+    return networks, array('B', prefixes)
+
+
+def load_subnets(filename):
+    """
+    Reads a file of subnets (see parse_subnets).
+    
+    Parameters:
+    - filename: Text file with one network/prefix per line
+    
+    Returns: (networks, prefixes) arrays
+    """
+    with open(filename, 'rb') as f:
+        return parse_subnets(f.read())
+
+
+def calculate_subnets(networks, prefixes):
+    """
+    Batch version of calculate_subnet for whole columns of subnets.
+    
+    With NumPy each field is computed for every row at once using
+    uint32/uint64 bit operations: host bits = 2^(32 - prefix) - 1,
+    network = address & ~host bits, broadcast = network | host bits.
+    Without NumPy the same formulas run row by row over arrays.
+    
+    Parameters:
+    - networks: 32-bit addresses (NumPy array, array('I') or list of
+      ints) or dotted IP strings
+    - prefixes: Prefix lengths 0-32, one per network or a single int
+    
+    Returns: Dictionary of columns with one entry per row:
+    - 'network': Network address (as a 32-bit number)
+    - 'broadcast': Broadcast address (as a 32-bit number)
+    - 'subnet_mask': Prefix length
+    - 'total_ips': Total IP addresses
+    - 'usable_hosts': Usable host IPs (2 for a /31, 1 for a /32)
+    - 'network_class': 'A', 'B', 'C' or 'Unknown', from the first octet
+      of the given address like calculate_subnet
+    """
+    if len(networks) and isinstance(networks[0], str):
+        networks = ips_to_ints(networks)
+    
+    if np is not None:
+        address = np.asarray(networks, dtype=np.uint64)
+        prefix = np.broadcast_to(np.asarray(prefixes, dtype=np.uint64), address.shape)
+        if address.size and address.max() > 0xFFFFFFFF:
+            raise ValueError("IP addresses must fit in 32 bits")
+        if prefix.size and prefix.max() > 32:
+            raise ValueError("Prefix lengths must be 0-32")
+        
+        # uint64 so that a /0 (2^32 addresses) does not overflow
+        total = np.left_shift(np.uint64(1), 32 - prefix)
+        host_bits = total - 1
+        network = address & (0xFFFFFFFF ^ host_bits)
+        return {
+            'network': network.astype(np.uint32),
+            'broadcast': (network | host_bits).astype(np.uint32),
+            'subnet_mask': prefix.astype(np.uint8),
+            'total_ips': total,
+            'usable_hosts': np.where(prefix <= 30, total - 2, total),
+            'network_class': np.array(CLASS_NAMES)[
+                np.searchsorted(CLASS_BOUNDS, address >> 24, side='right')]
+        }
+    
+    try:
+        address = array('I', networks)
+        if isinstance(prefixes, int):
+            prefixes = [prefixes] * len(address)
+        prefix = array('B', prefixes)
+    except OverflowError:
+        raise ValueError("IP addresses must fit in 32 bits and prefixes be 0-32") from None
+    if len(prefix) != len(address):
+        raise ValueError("Need one prefix length per network")
+    if prefix and max(prefix) > 32:
+        raise ValueError("Prefix lengths must be 0-32")
+    
+    total = [1 << (32 - p) for p in prefix]
+    network = array('I', map(lambda a, t: a & (0xFFFFFFFF ^ (t - 1)), address, total))
+    return {
+        'network': network,
+        'broadcast': array('I', map(lambda n, t: n | (t - 1), network, total)),
+        'subnet_mask': prefix,
+        'total_ips': total,
+        # Only /31 (2) and /32 (1) have 2 or fewer addresses
+        'usable_hosts': [t - 2 if t > 2 else t for t in total],
+        'network_class': [CLASS_NAMES[bisect_right(CLASS_BOUNDS, a >> 24)] for a in address]
+    }
+
+
+def save_subnets_csv(results, output_file):
+    """
+    Writes calculate_subnets results as a CSV file.
+    """
+    with open(output_file, 'w') as f:
+        f.write("network,broadcast,subnet_mask,total_ips,usable_hosts,network_class\n")
+        for row in zip(results['network'], results['broadcast'], results['subnet_mask'],
+                       results['total_ips'], results['usable_hosts'], results['network_class']):
+            network, broadcast, mask, total, usable, network_class = row
+            f.write(f"{int_to_ip(network)},{int_to_ip(broadcast)},{int(mask)},"
+                    f"{int(total)},{int(usable)},{network_class}\n")
+
+
+def run_batch(filename, output_file):
+    """
+    Batch mode: calculates every subnet in a file and saves a CSV report.
+    """
+    print("=" * 60)
+    print("BATCH SUBNET CALCULATOR")
+    print("=" * 60)
+    
+    print(f"📖 Reading subnets from {filename}...")
+    networks, prefixes = load_subnets(filename)
+    
+    start = time.perf_counter()
+    results = calculate_subnets(networks, prefixes)
+    elapsed = time.perf_counter() - start
+    rows = len(networks)
+    rate = rows / elapsed if elapsed else float('inf')
+    print(f"✓ Calculated {rows:,} subnets in {elapsed:.3f}s ({rate:,.0f} rows/sec"
+          f"{'' if np is not None else ', NumPy not installed'})")
+    
+    class_counts = {}
+    for network_class in results['network_class']:
+        class_counts[str(network_class)] = class_counts.get(str(network_class), 0) + 1
+    print(f"   Usable Host IPs: {sum(int(usable) for usable in results['usable_hosts']):,}")
+    for network_class, count in sorted(class_counts.items()):
+        print(f"   Class {network_class}: {count:,} subnets")
+    
+    save_subnets_csv(results, output_file)
+    print(f"✓ Results saved to {output_file}")
+
+
+# CIDR set engine
+# A set of networks is kept as sorted, non-overlapping address ranges
+# [first, last]. Every set operation sorts the range endpoints once and
+# sweeps over them, so nothing is ever compared pair by pair.
+
+def _merge_ranges(starts, ends):
+    """
+    Sorts ranges once and sweeps, joining ranges that overlap or touch.
+    
+    Returns: (starts, ends) of disjoint, sorted, non-adjacent ranges
+    (int64 NumPy arrays, or lists without NumPy)
+    """
+    if np is not None:
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        if not starts.size:
+            return starts, ends
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+        # Furthest address reached by any range so far; a new run begins
+        # where a range starts past it (+1 so touching ranges join too)
+        reach = np.maximum.accumulate(ends)
+        first = np.flatnonzero(np.concatenate(([True], starts[1:] > reach[:-1] + 1)))
+        last = np.append(first[1:] - 1, len(starts) - 1)
+        return starts[first], reach[last]
+    
+    merged_starts, merged_ends = [], []
+    for start, end in sorted(zip(starts, ends)):
+        if merged_ends and start <= merged_ends[-1] + 1:
+            merged_ends[-1] = max(merged_ends[-1], end)
+        else:
+            merged_starts.append(start)
+            merged_ends.append(end)
+    return merged_starts, merged_ends
+
+
+def _combine(a, b, keep):
+    """
+    Sweeps the endpoints of two CIDRSets together.
+    
+    Ranges of a add 1 to a running state while open and ranges of b add
+    2, so the state says which sets cover each stretch of addresses:
+    0 = neither, 1 = only a, 2 = only b, 3 = both.
+    
+    Parameters:
+    - a, b: CIDRSets
+    - keep: States to keep (e.g. (3,) for the intersection)
+    
+    Returns: (starts, ends) of the kept address ranges
+    """
+    if np is not None:
+        positions = np.concatenate((a.starts, a.ends + 1, b.starts, b.ends + 1))
+        if not positions.size:
+            return positions, positions
+        deltas = np.repeat(np.array([1, -1, 2, -2]),
+                           [len(a.starts), len(a.starts), len(b.starts), len(b.starts)])
+        order = np.argsort(positions, kind='stable')
+        positions = positions[order]
+        state = np.cumsum(deltas[order])
+        # State after the last event at each distinct position holds until
+        # the next position
+        settled = np.append(positions[1:] != positions[:-1], True)
+        positions, state = positions[settled], state[settled]
+        kept = np.isin(state[:-1], keep)
+        return _merge_ranges(positions[:-1][kept], positions[1:][kept] - 1)
+    
+    events = sorted([(start, 1) for start in a.starts] + [(end + 1, -1) for end in a.ends] +
+                    [(start, 2) for start in b.starts] + [(end + 1, -2) for end in b.ends])
+    starts, ends = [], []
+    state = 0
+    for i, (position, delta) in enumerate(events):
+        state += delta
+        if i + 1 < len(events) and events[i + 1][0] != position and state in keep:
+            starts.append(position)
+            ends.append(events[i + 1][0] - 1)
+    return _merge_ranges(starts, ends)
+
+
+def _range_to_cidrs(starts, ends):
+    """
+    Splits address ranges into the fewest CIDR blocks that cover them
+    exactly (a range from .0 to .255 is one /24, .0 to .383 is a /24
+    plus a /25).
+    
+    Each block is the largest one that is aligned at the range start and
+    still fits. With NumPy every range takes its next block in the same
+    step, so there are at most ~64 steps however many ranges there are.
+    
+    Returns: (networks, prefixes) sorted by network
+    """
+    if np is not None:
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        networks, sizes = [], []
+        while starts.size:
+            # Largest power of two dividing the start (/0 for 0.0.0.0)
+            aligned = np.where(starts == 0, 1 << 32, starts & -starts)
+            # Largest power of two that fits in what is left
+            _, exponent = np.frexp((ends - starts + 1).astype(np.float64))
+            fits = np.left_shift(1, exponent.astype(np.int64) - 1)
+            size = np.minimum(aligned, fits)
+            networks.append(starts)
+            sizes.append(size)
+            starts = starts + size
+            remaining = starts <= ends
+            starts, ends = starts[remaining], ends[remaining]
+        if not networks:
+            return np.zeros(0, np.uint32), np.zeros(0, np.uint8)
+        networks = np.concatenate(networks)
+        # 2^(32 - prefix) = size, and frexp(size) gives exponent log2(size) + 1
+        prefixes = 33 - np.frexp(np.concatenate(sizes).astype(np.float64))[1]
+        order = np.argsort(networks, kind='stable')
+        return networks[order].astype(np.uint32), prefixes[order].astype(np.uint8)
+    
+    networks, prefixes = array('I'), array('B')
+    for start, end in zip(starts, ends):
+        while start <= end:
+            aligned = start & -start if start else 1 << 32
+            size = min(aligned, 1 << ((end - start + 1).bit_length() - 1))
+            networks.append(start)
+            prefixes.append(33 - size.bit_length())
+            start += size
+    return networks, prefixes
+
+
+class CIDRSet:
+    """
+    A set of IPv4 addresses built from CIDR blocks.
+    
+    Stored as sorted, disjoint ranges, so overlapping and adjacent
+    subnets are merged on the way in. Supports union (|), intersection
+    (&), difference (-) and symmetric difference (^), membership tests
+    for single addresses, and to_cidrs() for the minimal list of CIDR
+    blocks covering the set (10.0.0.0/25 + 10.0.0.128/25 -> 10.0.0.0/24).
+    """
+    
+    def __init__(self, starts=(), ends=()):
+        """
+        Parameters:
+        - starts, ends: First and last addresses (32-bit numbers) of
+          ranges, in any order and possibly overlapping
+        """
+        self.starts, self.ends = _merge_ranges(starts, ends)
+    
+    @classmethod
+    def from_subnets(cls, networks, prefixes):
+        """
+        Builds a set from columns of (network, prefix) pairs, like
+        calculate_subnets takes them (host bits are ignored).
+        """
+        results = calculate_subnets(networks, prefixes)
+        return cls(results['network'], results['broadcast'])
+    
+    @classmethod
+    def from_cidrs(cls, cidrs):
+        """
+        Builds a set from CIDR strings such as "10.0.0.0/8".
+        """
+        networks, prefixes = parse_subnets('\n'.join(cidrs))
+        return cls.from_subnets(networks, prefixes)
+    
+    def _new(self, ranges):
+        result = CIDRSet()
+        result.starts, result.ends = ranges
+        return result
+    
+    def union(self, other):
+        if np is not None:
+            return CIDRSet(np.concatenate((self.starts, other.starts)),
+                           np.concatenate((self.ends, other.ends)))
+        return CIDRSet(self.starts + other.starts, self.ends + other.ends)
+    
+    def intersection(self, other):
+        return self._new(_combine(self, other, (3,)))
+    
+    def difference(self, other):
+        return self._new(_combine(self, other, (1,)))
+    
+    def symmetric_difference(self, other):
+        return self._new(_combine(self, other, (1, 2)))
+    
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+    
+    def __eq__(self, other):
+        return (isinstance(other, CIDRSet) and
+                list(self.starts) == list(other.starts) and list(self.ends) == list(other.ends))
+    
+    def __bool__(self):
+        return len(self.starts) > 0
+    
+    def __contains__(self, ip):
+        """
+        Membership test for a dotted IP address or 32-bit number.
+        """
+        value = ip_to_int(ip) if isinstance(ip, str) else int(ip)
+        i = bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+    
+    def num_addresses(self):
+        return sum(int(end) - int(start) + 1 for start, end in zip(self.starts, self.ends))
+    
+    def ranges(self):
+        """
+        Returns: List of (first, last) address pairs as 32-bit numbers
+        """
+        return [(int(start), int(end)) for start, end in zip(self.starts, self.ends)]
+    
+    def to_subnets(self):
+        """
+        Returns: (networks, prefixes) of the fewest CIDR blocks covering
+        exactly this set, sorted by network
+        """
+        return _range_to_cidrs(self.starts, self.ends)
+    
+    def to_cidrs(self):
+        """
+        Returns: Same blocks as to_subnets, as "network/prefix" strings
+        """
+        networks, prefixes = self.to_subnets()
+        return [f"{int_to_ip(network)}/{int(prefix)}" for network, prefix in zip(networks, prefixes)]
+    
+    def __repr__(self):
+        return f"CIDRSet({len(self.starts)} ranges, {self.num_addresses():,} addresses)"
+
+
+def find_overlaps(networks, prefixes):
+    """
+    Finds the subnets that overlap an earlier or larger one.
+    
+    Two CIDR blocks either do not overlap or one contains the other, so
+    after one sort by (first address, largest block first, line) a single
+    pass with a stack of the distinct blocks still open finds them: every
+    block on the stack contains the current one and the top is the
+    smallest. Each row is reported at most once, against the first line
+    with the same block or else its nearest enclosing block, so the cost
+    is the sort plus one step per row however deeply blocks nest.
+    
+    Parameters:
+    - networks, prefixes: Columns of subnets (see calculate_subnets)
+    
+    Returns: List of (outer row, inner row, kind) where kind is
+    'duplicate' for a block already listed on the outer row and 'nested'
+    when the inner block lies inside the outer one
+    """
+    results = calculate_subnets(networks, prefixes)
+    starts, ends = results['network'], results['broadcast']
+    if np is not None:
+        starts = starts.astype(np.int64)
+        ends = ends.astype(np.int64)
+        order = np.lexsort((-(ends - starts), starts)).tolist()
+        starts, ends = starts.tolist(), ends.tolist()
+    else:
+        order = sorted(range(len(starts)), key=lambda row: (starts[row], starts[row] - ends[row]))
+    
+    overlaps = []
+    stack = []
+    for row in order:
+        start, end = starts[row], ends[row]
+        while stack and ends[stack[-1]] < start:
+            stack.pop()
+        if stack:
+            outer = stack[-1]
+            if starts[outer] == start and ends[outer] == end:
+                # Later copies stay off the stack, so blocks inside them
+                # are reported against the first line
+                overlaps.append((outer, row, 'duplicate'))
+                continue
+            overlaps.append((outer, row, 'nested'))
+        stack.append(row)
+    return overlaps
+
+
+def run_aggregate(filename, output_file):
+    """
+    Aggregate mode: reports overlapping subnets in a file and saves the
+    minimal list of CIDR blocks covering all of them.
+    """
+    print("=" * 60)
+    print("CIDR AGGREGATION")
+    print("=" * 60)
+    
+    print(f"📖 Reading subnets from {filename}...")
+    networks, prefixes = load_subnets(filename)
+    
+    start = time.perf_counter()
+    cidr_set = CIDRSet.from_subnets(networks, prefixes)
+    collapsed = cidr_set.to_cidrs()
+    overlaps = find_overlaps(networks, prefixes)
+    elapsed = time.perf_counter() - start
+    
+    print(f"✓ {len(networks):,} subnets collapse to {len(collapsed):,} CIDR blocks "
+          f"({cidr_set.num_addresses():,} addresses) in {elapsed:.3f}s")
+    duplicates = sum(1 for _, _, kind in overlaps if kind == 'duplicate')
+    print(f"⚠️  {len(overlaps) - duplicates:,} nested and {duplicates:,} duplicate allocations")
+    for outer, inner, kind in overlaps[:10]:
+        print(f"   Line {inner + 1}: {int_to_ip(networks[inner])}/{int(prefixes[inner])} "
+              f"{'duplicates' if kind == 'duplicate' else 'is inside'} line {outer + 1}: "
+              f"{int_to_ip(networks[outer])}/{int(prefixes[outer])}")
+    
+    with open(output_file, 'w') as f:
+        f.write('\n'.join(collapsed) + '\n')
+    print(f"✓ Collapsed CIDR list saved to {output_file}")
+
+
+def main():
+    """
+    Interactive demo: two worked examples, then your own network.
+    """
+    # The equals signs create a visual border for the output
+    print("=" * 60)
+    print("NETWORK SUBNET CALCULATOR")
+    print("=" * 60 + "\n")
+    
+    # Test Case 1: /24 subnet (common for small office networks)
+    print("Test Case 1: Common Small Network")
+    print("-" * 60)
+    result1 = calculate_subnet("192.168.1.0", 24)
+    print(f"Network Address: {result1['network_ip']}/{result1['subnet_mask']}")
+    print(f"Network Class: Class {result1['network_class']}")
+    # The :, in the f-string adds commas to numbers (256 becomes 256)
+    print(f"Total IP Addresses: {result1['total_ips']:,}")
+    print(f"Usable Host IPs: {result1['usable_hosts']:,}")
+    # Show the calculation so we understand how we got the answer
+    print(f"Calculation: 2^(32-{result1['subnet_mask']}) = 2^{32-result1['subnet_mask']} = {result1['total_ips']}\n")
+    
+    # Test Case 2: /28 subnet (smaller network for better security)
+    print("Test Case 2: Security Segmented Subnet")
+    print("-" * 60)
+    result2 = calculate_subnet("10.0.10.0", 28)
+    print(f"Network Address: {result2['network_ip']}/{result2['subnet_mask']}")
+    print(f"Network Class: Class {result2['network_class']}")
+    print(f"Total IP Addresses: {result2['total_ips']}")
+    print(f"Usable Host IPs: {result2['usable_hosts']}")
+    print(f"Calculation: 2^(32-{result2['subnet_mask']}) = 2^{32-result2['subnet_mask']} = {result2['total_ips']}\n")
+    
+    # Interactive mode - let the user enter their own values
+    print("=" * 60)
+    print("INTERACTIVE MODE")
+    print("=" * 60)
+    
+    # Get input from the user
+    # input() always returns text, so we need to convert the mask to an integer
+    network = input("\nEnter network IP address (e.g., 172.16.0.0): ")
+    mask = int(input("Enter subnet mask (CIDR notation, e.g., 24): "))
+    
+    # Calculate using the function we created above
+    result = calculate_subnet(network, mask)
+    
+    # Display the results in a nicely formatted report
+    print("\n" + "=" * 60)
+    print("SUBNET CALCULATION RESULTS")
+    print("=" * 60)
+    print(f"Network Address:    {result['network_ip']}/{result['subnet_mask']}")
+    print(f"Network Class:      Class {result['network_class']}")
+    print(f"Total IP Addresses: {result['total_ips']:,}")
+    print(f"Usable Host IPs:    {result['usable_hosts']:,}")
+    print(f"\nFormula: 2^(32-{result['subnet_mask']}) = {result['total_ips']}")
+    print("=" * 60)
+    
+    # Give a security tip based on the subnet size
+    print("\n💡 Security Note:")
+    if result['total_ips'] > 256:
+        print("   Large subnet - consider segmentation for security isolation")
+    elif result['total_ips'] <= 16:
+        print("   Small subnet - good for critical infrastructure isolation")
+    else:
+        print("   Medium subnet - suitable for departmental segmentation")
+
+
 # Main program starts here
-# The equals signs create a visual border for the output
-print("=" * 60)
-print("NETWORK SUBNET CALCULATOR")
-print("=" * 60 + "\n")
-
-# Test Case 1: /24 subnet (common for small office networks)
-print("Test Case 1: Common Small Network")
-print("-" * 60)
-result1 = calculate_subnet("192.168.1.0", 24)
-print(f"Network Address: {result1['network_ip']}/{result1['subnet_mask']}")
-print(f"Network Class: Class {result1['network_class']}")
-# The :, in the f-string adds commas to numbers (256 becomes 256)
-print(f"Total IP Addresses: {result1['total_ips']:,}")
-print(f"Usable Host IPs: {result1['usable_hosts']:,}")
-# Show the calculation so we understand how we got the answer
-print(f"Calculation: 2^(32-{result1['subnet_mask']}) = 2^{32-result1['subnet_mask']} = {result1['total_ips']}\n")
-
-# Test Case 2: /28 subnet (smaller network for better security)
-print("Test Case 2: Security Segmented Subnet")
-print("-" * 60)
-result2 = calculate_subnet("10.0.10.0", 28)
-print(f"Network Address: {result2['network_ip']}/{result2['subnet_mask']}")
-print(f"Network Class: Class {result2['network_class']}")
-print(f"Total IP Addresses: {result2['total_ips']}")
-print(f"Usable Host IPs: {result2['usable_hosts']}")
-print(f"Calculation: 2^(32-{result2['subnet_mask']}) = 2^{32-result2['subnet_mask']} = {result2['total_ips']}\n")
-
-# Interactive mode - let the user enter their own values
-print("=" * 60)
-print("INTERACTIVE MODE")
-print("=" * 60)
-
-# Get input from the user
-# input() always returns text, so we need to convert the mask to an integer
-network = input("\nEnter network IP address (e.g., 172.16.0.0): ")
-mask = int(input("Enter subnet mask (CIDR notation, e.g., 24): "))
-
-# Calculate using the function we created above
-result = calculate_subnet(network, mask)
-
-# Display the results in a nicely formatted report
-print("\n" + "=" * 60)
-print("SUBNET CALCULATION RESULTS")
-print("=" * 60)
-print(f"Network Address:    {result['network_ip']}/{result['subnet_mask']}")
-print(f"Network Class:      Class {result['network_class']}")
-print(f"Total IP Addresses: {result['total_ips']:,}")
-print(f"Usable Host IPs:    {result['usable_hosts']:,}")
-print(f"\nFormula: 2^(32-{result['subnet_mask']}) = {result['total_ips']}")
-print("=" * 60)
-
-# Give a security tip based on the subnet size
-print("\n💡 Security Note:")
-if result['total_ips'] > 256:
-    print("   Large subnet - consider segmentation for security isolation")
-elif result['total_ips'] <= 16:
-    print("   Small subnet - good for critical infrastructure isolation")
-else:
-    print("   Medium subnet - suitable for departmental segmentation")
\ No newline at end of file
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="IPv4 subnet calculator")
+    parser.add_argument("-f", "--file",
+                        help="Batch mode: file with one network/prefix per line (e.g. 10.0.0.0/8)")
+    parser.add_argument("-a", "--aggregate",
+                        help="Aggregate mode: collapse the subnets in a file and report overlaps")
+    parser.add_argument("-o", "--output",
+                        help="Results file (default subnets.csv, or collapsed_subnets.txt "
+                             "in aggregate mode)")
+    args = parser.parse_args()
+    
+    try:
+        if args.aggregate:
+            run_aggregate(args.aggregate, args.output or "collapsed_subnets.txt")
+        elif args.file:
+            run_batch(args.file, args.output or "subnets.csv")
+        else:
+            main()
+    except (OSError, ValueError) as e:
+        # Malformed or unreadable subnet files: report instead of a traceback
+        print(f"\n❌ Error: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# subnet_harness.py
+# Checks the batch subnet calculator and the CIDR set engine against
+# Python's ipaddress module, with NumPy and with the pure-Python fallback
+
+import argparse
+import importlib.util
+import ipaddress
+import itertools
+import os
+import random
+import sys
+
+# The calculator's file name starts with a digit, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    "subnet_calculator", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      "01_subnet_calculator.py"))
+calc = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(calc)
+
+# Entries every parser must reject (with the line they are on)
+MALFORMED = [
+    "1.2.3.4\n" * 5,
+    "10.0.0.0/8\n10.1.0.0\n",
+    "1.2.3.4.5",
+    "1.2.3 4/5",
+    "1..2.3.4/5",
+    "1.2.3.4//24",
+    "/1.2.3.4 24",
+    "1.2.3.4/24 25",
+    "1.2.3.0004/24",
+    "1.2.3.4/x",
+    "1.2.3.256/24",
+    "1.2.3.4/33",
+]
+
+
+def random_cidrs(rng, count, base=0x0A000000, span=10, largest=None):
+    """
+    Returns: List of random CIDR strings inside a 2^span address window,
+    so overlaps and adjacent blocks are common (blocks hold at most
+    2^largest addresses, default the whole window)
+    """
+    largest = span if largest is None else largest
+    cidrs = []
+    for _ in range(count):
+        prefix = rng.randint(32 - largest, 32)
+        address = base + rng.getrandbits(span)
+        cidrs.append(f"{calc.int_to_ip(address)}/{prefix}")
+    return cidrs
+
+
+def networks(cidrs):
+    return [ipaddress.ip_network(cidr, strict=False) for cidr in cidrs]
+
+
+def addresses(ranges):
+    """
+    Expands (first, last) ranges into a set of integer addresses.
+    """
+    return set(itertools.chain.from_iterable(range(first, last + 1) for first, last in ranges))
+
+
+def reference_set(cidrs):
+    return addresses((int(net.network_address), int(net.broadcast_address))
+                     for net in networks(cidrs))
+
+
+def check_parser(rng):
+    """
+    Parsing round-trips random entries and rejects malformed ones.
+    """
+    failures = []
+    separators = ["/", " ", ",", " / ", "\t"]
+    rows = [(rng.getrandbits(32), rng.randint(0, 32)) for _ in range(500)]
+    text = "\n".join(f"{calc.int_to_ip(a)}{rng.choice(separators)}{p}" for a, p in rows) + "\n\n"
+    parsed_networks, parsed_prefixes = calc.parse_subnets(text)
+    if [int(n) for n in parsed_networks] != [a for a, _ in rows] or \
+            [int(p) for p in parsed_prefixes] != [p for _, p in rows]:
+        failures.append("parse_subnets did not round-trip random entries")
+    
+    for text in MALFORMED:
+        try:
+            calc.parse_subnets(text)
+            failures.append(f"parse_subnets accepted {text!r}")
+        except ValueError:
+            pass
+    return failures
+
+
+def check_calculate(rng):
+    """
+    Batch results match calculate_subnet and ipaddress row by row.
+    """
+    failures = []
+    rows = [(rng.getrandbits(32), rng.randint(0, 32)) for _ in range(2000)]
+    rows += [(0, 0), (0xFFFFFFFF, 31), (0xFFFFFFFF, 32)]
+    results = calc.calculate_subnets([a for a, _ in rows], [p for _, p in rows])
+    for i, (address, prefix) in enumerate(rows):
+        single = calc.calculate_subnet(calc.int_to_ip(address), prefix)
+        net = ipaddress.ip_network(f"{calc.int_to_ip(address)}/{prefix}", strict=False)
+        if (int(results['network'][i]) != int(net.network_address)
+                or int(results['broadcast'][i]) != int(net.broadcast_address)
+                or int(results['total_ips'][i]) != single['total_ips']
+                or int(results['usable_hosts'][i]) != single['usable_hosts']
+                or str(results['network_class'][i]) != single['network_class']):
+            failures.append(f"calculate_subnets differs for {net}")
+            break
+    return failures
+
+
+def check_sets(rng, trials):
+    """
+    Set operations, minimal covers and overlaps match ipaddress.
+    """
+    failures = []
+    for trial in range(trials):
+        a_cidrs = random_cidrs(rng, rng.randint(0, 8), span=rng.choice([6, 8, 10]))
+        b_cidrs = random_cidrs(rng, rng.randint(0, 8), span=rng.choice([6, 8, 10]))
+        a, b = calc.CIDRSet.from_cidrs(a_cidrs), calc.CIDRSet.from_cidrs(b_cidrs)
+        ref_a, ref_b = reference_set(a_cidrs), reference_set(b_cidrs)
+        
+        for name, got, expected in (("union", a | b, ref_a | ref_b),
+                                    ("intersection", a & b, ref_a & ref_b),
+                                    ("difference", a - b, ref_a - ref_b),
+                                    ("symmetric difference", a ^ b, ref_a ^ ref_b)):
+            if addresses(got.ranges()) != expected:
+                failures.append(f"trial {trial}: {name} of {a_cidrs} and {b_cidrs}")
+        
+        collapsed = [str(net) for net in ipaddress.collapse_addresses(networks(a_cidrs))]
+        if a.to_cidrs() != collapsed:
+            failures.append(f"trial {trial}: to_cidrs {a.to_cidrs()} != {collapsed}")
+        
+        parsed_networks, parsed_prefixes = calc.parse_subnets("\n".join(a_cidrs))
+        nets = networks(a_cidrs)
+        expected = {}
+        for j, net in enumerate(nets):
+            copies = [i for i in range(j) if nets[i] == net]
+            if copies:
+                expected[j] = (copies[0], 'duplicate')
+                continue
+            # Nearest enclosing block, first line if it is listed twice
+            enclosing = [i for i in range(len(nets)) if nets[i] != net and net.subnet_of(nets[i])]
+            if enclosing:
+                nearest = max(enclosing, key=lambda i: (nets[i].prefixlen, -i))
+                expected[j] = (nearest, 'nested')
+        found = {}
+        for outer, inner, kind in calc.find_overlaps(parsed_networks, parsed_prefixes):
+            if inner in found:
+                failures.append(f"trial {trial}: row {inner} reported twice")
+            found[inner] = (outer, kind)
+        if found != expected:
+            failures.append(f"trial {trial}: find_overlaps on {a_cidrs}: {found} != {expected}")
+    
+    # Copies of one block are each reported once, against the first line
+    copies = calc.parse_subnets("\n".join(["10.0.0.0/8"] * 3000 + ["10.1.0.0/16"]))
+    if sorted(calc.find_overlaps(*copies)) != \
+            [(0, row, 'duplicate') for row in range(1, 3000)] + [(0, 3000, 'nested')]:
+        failures.append("find_overlaps on 3,000 copies of one /8")
+    return failures
+
+
+def run_checks(seed, trials):
+    """
+    Runs every check with the calculator's current backend.
+    
+    Returns: List of failure messages
+    """
+    rng = random.Random(seed)
+    return check_parser(rng) + check_calculate(rng) + check_sets(rng, trials)
+
+
+def main():
+    """
+    Runs the checks with NumPy (if installed) and without, then compares
+    the two backends on a larger random input.
+    """
+    parser = argparse.ArgumentParser(description="Subnet calculator / CIDR set harness")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trials", type=int, default=300)
+    args = parser.parse_args()
+    
+    numpy_module = calc.np
+    backends = [("NumPy", numpy_module)] if numpy_module is not None else []
+    backends.append(("pure Python", None))
+    if numpy_module is None:
+        print("⚠️  NumPy not installed: only the pure-Python fallback is checked")
+    
+    failed = False
+    outputs = {}
+    big = random_cidrs(random.Random(args.seed), 20000, span=22)
+    for name, module in backends:
+        calc.np = module
+        failures = run_checks(args.seed, args.trials)
+        cidr_set = calc.CIDRSet.from_cidrs(big)
+        half = calc.CIDRSet.from_cidrs(big[:10000])
+        big_networks, big_prefixes = calc.parse_subnets("\n".join(big))
+        outputs[name] = (cidr_set.to_cidrs(), (cidr_set - half).ranges(),
+                         (cidr_set & half).ranges(),
+                         sorted(calc.find_overlaps(big_networks, big_prefixes)))
+        for failure in failures[:10]:
+            print(f"   {name}: {failure}")
+        print(f"{'❌' if failures else '✓'} {name}: {len(failures)} failures")
+        failed = failed or bool(failures)
+    calc.np = numpy_module
+    
+    if len(outputs) == 2:
+        same = outputs["NumPy"] == outputs["pure Python"]
+        print(f"{'✓' if same else '❌'} NumPy and pure Python agree on 20,000 random prefixes")
+        failed = failed or not same
+    
+    if failed:
+        print("❌ FAIL")
+        sys.exit(1)
+    print("✅ PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# bench_incremental_report.py
+# Benchmark: full report rebuild vs incremental regeneration on a generated feed
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from threat_parser import load_threat_data, analyze_threats, generate_report
+from incremental_report import regenerate_report
+
+
+def generate_feed(filename, threats, revision=0, seed=2646):
+    """
+    Writes a synthetic threat feed (JSON document).
+    
+    Parameters:
+    - filename: Output filename
+    - threats: Number of threats to write
+    - revision: 0 for the original feed; each later revision changes
+      the severity of the first threat and adds an indicator to the
+      second
+    - seed: Random seed so runs are comparable
+    
+    Returns: The first two threats (the ones revisions change); the rest
+    is not kept, so the timed runs do not share memory with the feed
+    """
+    rng = random.Random(seed)
+    feed = {'feed_name': "Benchmark Feed", 'date': "2024-12-01", 'threats': []}
+    for i in range(threats):
+        feed['threats'].append({
+            'id': f"THREAT-{i:06d}",
+            'type': rng.choice(["malware", "phishing", "botnet", "scanner"]),
+            'severity': rng.choice(["CRITICAL", "HIGH", "MEDIUM", "LOW"]),
+            'indicators': {
+                'ips': [f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}."
+                        f"{rng.randrange(1, 255)}" for _ in range(3)],
+                'domains': [f"host{rng.randrange(10 ** 6)}.example.com" for _ in range(2)]
+            },
+            'active_exploit': rng.random() < 0.2,
+            'description': f"Campaign {i}"
+        })
+    changed = feed['threats'][:2]
+    for number in range(1, revision + 1):
+        changed[0]['severity'] = ["CRITICAL", "HIGH", "MEDIUM", "LOW"][number % 4]
+        changed[1]['indicators']['ips'].append(f"203.0.113.{number}")
+        changed[1]['indicators']['domains'].append(f"new{number}.example.net")
+    with open(filename, 'w') as f:
+        json.dump(feed, f, indent=2)
+    return changed
+
+
+def report_body(filename):
+    """
+    Returns: Report lines without the Generated timestamp
+    """
+    with open(filename, 'r') as f:
+        return [line for line in f.read().split('\n') if not line.startswith("Generated:")]
+
+
+def timed(label, func, prepare=None, repeat=1):
+    """
+    Times func (after an untimed prepare(run) for each run).
+    
+    Returns: Best time of `repeat` runs in seconds
+    """
+    best = None
+    for run in range(repeat):
+        if prepare is not None:
+            prepare(run)
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:42} {best:8.3f} s")
+    return best
+
+
+def full_rebuild(feed_file, output_file):
+    threat_data = load_threat_data(feed_file)
+    generate_report(threat_data, analyze_threats(threat_data), output_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full and incremental report generation")
+    parser.add_argument("--threats", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing (best is kept)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        feed_file = os.path.join(tmpdir, "feed.json")
+        delta_file = os.path.join(tmpdir, "delta.ndjson")
+        baseline_file = os.path.join(tmpdir, "baseline.txt")
+        output_file = os.path.join(tmpdir, "report.txt")
+        
+        print(f"Generating {args.threats:,} threats...")
+        generate_feed(feed_file, args.threats)
+        print(f"Feed size: {os.path.getsize(feed_file) / 1e6:,.1f} MB")
+        
+        baseline = timed("Full rebuild (load + analyze + generate)",
+                         lambda: full_rebuild(feed_file, baseline_file), repeat=args.repeat)
+        timed("Incremental, first run (no state)",
+              lambda: regenerate_report(feed_file, output_file))
+        timed("Incremental, unchanged feed",
+              lambda: regenerate_report(feed_file, output_file), repeat=args.repeat)
+        
+        # Each revision changes two threats: one severity, and one gets a
+        # new IP and domain
+        def next_feed(run):
+            generate_feed(feed_file, args.threats, revision=1 + run)
+        
+        full_delta = timed("Incremental, full feed with 2 changes",
+                           lambda: regenerate_report(feed_file, output_file),
+                           prepare=next_feed, repeat=args.repeat)
+        
+        # The same kind of change again, as a delta feed
+        def next_delta(run):
+            changed = generate_feed(feed_file, args.threats, revision=1 + args.repeat + run)
+            with open(delta_file, 'w') as f:
+                f.write(''.join(json.dumps(threat) + '\n' for threat in changed))
+        
+        delta = timed("Incremental, --delta feed with 2 changes",
+                      lambda: regenerate_report(delta_file, output_file, delta=True),
+                      prepare=next_delta, repeat=args.repeat)
+        
+        full_rebuild(feed_file, baseline_file)
+        same = report_body(output_file) == report_body(baseline_file)
+        print(f"  Reports identical: {same}")
+        print(f"  Speedup (full feed, 2 changes): {baseline / full_delta:.1f}x")
+        print(f"  Speedup (delta feed, 2 changes): {baseline / delta:.1f}x")
+    
+    if not same or full_delta >= baseline or delta >= baseline:
+        print("❌ FAIL: incremental runs must match and beat the full rebuild")
+        raise SystemExit(1)
+    print("✅ PASS")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# bench_log_parsers.py
+# Benchmark: text log parser vs the mmap/bytes fast path on a generated log
+
+import argparse
+import os
+import random
+import time
+
+from log_analyzer import analyze_logs, iter_log_entries
+from log_fastpath import analyze_logs_fast, iter_fast_records
+
+
+def generate_log(filename, lines, sources=50000, seed=2646):
+    """
+    Writes a synthetic chronological firewall log.
+    
+    Parameters:
+    - filename: Output filename
+    - lines: Number of lines to write
+    - sources: Size of the source IP pool (repeats like a real log)
+    - seed: Random seed so runs are comparable
+    """
+    rng = random.Random(seed)
+    pool = [f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            for _ in range(sources)]
+    ports = [22, 23, 53, 80, 135, 443, 445, 3306, 3389, 8080]
+    dests = ["10.0.0.5", "10.0.0.10", "8.8.8.8", "1.1.1.1"]
+    
+    with open(filename, 'w') as f:
+        batch = []
+        for i in range(lines):
+            second = i // 50
+            batch.append(f"2024-12-{1 + second // 86400 % 28:02d} "
+                         f"{second // 3600 % 24:02d}:{second // 60 % 60:02d}:{second % 60:02d} "
+                         f"{'DENY' if rng.random() < 0.6 else 'ALLOW'} {rng.choice(pool)} "
+                         f"{rng.choice(dests)} {rng.choice(ports)}\n")
+            if len(batch) >= 100000:
+                f.write(''.join(batch))
+                batch.clear()
+        f.write(''.join(batch))
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:38} {elapsed:8.2f} s")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare log parsers")
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--file", default="bench_firewall.log")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated log")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.file):
+        print(f"Generating {args.lines:,} lines into {args.file}...")
+        generate_log(args.file, args.lines)
+    size_mb = os.path.getsize(args.file) / 1e6
+    print(f"Log size: {size_mb:,.0f} MB")
+    
+    try:
+        baseline, slow = timed("Text parser + analyze_logs",
+                               lambda: analyze_logs(iter_log_entries(args.file)))
+        fast_result, fast = timed("mmap bytes fast path (analyze)",
+                                  lambda: analyze_logs_fast(args.file))
+        timed("mmap numeric records (iterate only)",
+              lambda: sum(1 for _ in iter_fast_records(args.file)))
+        
+        print(f"  Results identical: {baseline == fast_result}")
+        print(f"  Speedup (analyze): {slow / fast:.1f}x")
+    finally:
+        if not args.keep:
+            os.remove(args.file)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# domain_matcher.py
+# Matches threat feed domains against DNS, proxy and URL logs
+
+import json
+from collections import deque
+from itertools import compress
+from operator import not_
+
+from log_fastpath import gc_paused, iter_windows
+from threat_parser import domain_key, load_threat_data
+
+# bytes.translate table that lowercases host-name characters and turns
+# everything else except newlines into spaces. Domain indicators only use
+# [a-z0-9.-], so every occurrence of one in a line lies inside a single
+# whitespace-separated token of the translated text.
+HOST_TABLE = bytes(
+    c + 32 if 65 <= c <= 90
+    else c if (97 <= c <= 122 or 48 <= c <= 57 or c in b'.-\n')
+    else 32
+    for c in range(256)
+)
+
+# Distinct host runs whose matches are remembered across windows
+MAX_CACHED_HOSTS = 1 << 18
+
+
+class DomainTrie:
+    """
+    Trie over reversed domain labels (com -> evil-domain -> cdn).
+    
+    A host matches every indicator whose labels form a suffix of its
+    own, so evil-domain.com matches cdn.evil-domain.com but not
+    notevil-domain.com. Lookups cost one dict step per label.
+    """
+    
+    # Node key holding the annotations of a complete indicator
+    END = ''
+    
+    def __init__(self):
+        self.root = {}
+    
+    def add(self, domain, annotation):
+        node = self.root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node.setdefault(self.END, []).append(annotation)
+    
+    def match(self, host):
+        """
+        Returns: List of (indicator, annotations) for every indicator
+        that is a label suffix of host, most specific first
+        """
+        found = []
+        node = self.root
+        labels = host.split('.')
+        for depth in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[depth])
+            if node is None:
+                break
+            if self.END in node:
+                found.append(('.'.join(labels[depth:]), node[self.END]))
+        found.reverse()
+        return found
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton finding every occurrence of many patterns in
+    one left-to-right pass over the text.
+    """
+    
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        
+        for number, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                following = self.goto[state].get(char)
+                if following is None:
+                    following = len(self.goto)
+                    self.goto[state][char] = following
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = following
+            self.output[state].append(number)
+        
+        # Breadth-first failure links; outputs inherit along them
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(char, 0)
+                self.output[following] = self.output[following] + self.output[self.fail[following]]
+    
+    def iter_matches(self, text):
+        """
+        Returns: Generator of (start, pattern number) for every occurrence
+        """
+        goto, fail, output, patterns = self.goto, self.fail, self.output, self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for number in output[state]:
+                yield position - len(patterns[number]) + 1, number
+
+
+class DomainMatcher:
+    """
+    Domain indicators compiled for log matching.
+    
+    Each host-like run of a line is checked against the suffix trie for
+    'domain' matches (the run is the indicator or one of its
+    subdomains). For URL and proxy logs the Aho-Corasick automaton can
+    also report 'substring' matches, where the indicator is embedded in
+    a longer name such as fake-bank.com.login-check.net. That is off by
+    default: in a DNS log notevil-domain.com is not evil-domain.com.
+    """
+    
+    def __init__(self, domains, substring=False):
+        """
+        Parameters:
+        - domains: Dictionary of normalized domain -> list of annotations
+        - substring: Also report indicators embedded in longer names
+          (for URL logs)
+        """
+        self.domains = domains
+        self.trie = DomainTrie()
+        for domain, annotations in domains.items():
+            for annotation in annotations:
+                self.trie.add(domain, annotation)
+        self.automaton = AhoCorasick(domains) if substring else None
+    
+    def match_host(self, host):
+        """
+        Returns: List of (indicator, match type, annotations) for one
+        lowercase host-like string
+        """
+        found = [(indicator, 'domain', annotations)
+                 for indicator, annotations in self.trie.match(host)]
+        if self.automaton is None:
+            return found
+        seen = {indicator for indicator, _, _ in found}
+        for start, number in self.automaton.iter_matches(host):
+            indicator = self.automaton.patterns[number]
+            if indicator not in seen:
+                seen.add(indicator)
+                found.append((indicator, 'substring', self.domains[indicator]))
+        return found
+
+
+def build_domain_matcher(threat_data, substring=False):
+    """
+    Compiles the domain indicators of a threat feed.
+    
+    Parameters:
+    - threat_data: Parsed threat feed (see threat_parser.load_threat_data)
+    - substring: Also report indicators embedded in longer host names
+      (URL and proxy logs; leave off for DNS logs)
+    
+    Returns: DomainMatcher whose annotations describe the threat the
+    way analyze_threats' active_exploits records do ('id', 'type',
+    'description') plus 'severity' and 'active_exploit'
+    """
+    domains = {}
+    for threat in threat_data['threats']:
+        annotation = {
+            'id': threat['id'],
+            'type': threat['type'],
+            'description': threat['description'],
+            'severity': threat['severity'],
+            'active_exploit': threat['active_exploit']
+        }
+        for domain in threat['indicators'].get('domains', ()):
+            annotations = domains.setdefault(domain_key(domain), [])
+            if annotation not in annotations:
+                annotations.append(annotation)
+    return DomainMatcher(domains, substring)
+
+
+def iter_domain_hits(logfile, matcher):
+    """
+    Streams a text log (DNS queries, proxy or URL logs) and yields the
+    domain indicator hits.
+    
+    Each window is lowercased and cut into host-like runs with one
+    bytes.translate and one split, both in C. Every distinct run is
+    matched once (results are cached across windows), and only windows
+    containing a hit are split into lines to locate the hits.
+    
+    Parameters:
+    - logfile: Any line-oriented text log
+    - matcher: DomainMatcher from build_domain_matcher
+    
+    Returns: Generator of hit dictionaries: the threat fields of the
+    annotation plus 'indicator', 'host', 'match' ('domain', or
+    'substring' when the matcher was built with substring=True),
+    'line_number' and 'line'
+    """
+    if not matcher.domains:
+        return
+    cache = {}
+    line_number = 0
+    
+    with gc_paused():
+        for window in iter_windows(logfile):
+            hosts = window.translate(HOST_TABLE)
+            hit_runs = {}
+            for run in set(hosts.split()):
+                if b'.' not in run:
+                    continue
+                found = cache.get(run)
+                if found is None:
+                    if len(cache) > MAX_CACHED_HOSTS:
+                        cache.clear()
+                    host = run.strip(b'.').decode()
+                    found = cache[run] = matcher.match_host(host) if host else []
+                if found:
+                    hit_runs[run] = found
+            
+            if not hit_runs:
+                line_number += window.count(b'\n')
+                continue
+            
+            # Flag lines sharing a run with hit_runs; map/compress keep the
+            # per-line work in C
+            host_lines = hosts.split(b'\n')
+            misses = map(hit_runs.keys().isdisjoint, map(bytes.split, host_lines))
+            lines = window.split(b'\n')
+            for offset in compress(range(len(host_lines)), map(not_, misses)):
+                runs = host_lines[offset].split()
+                line = lines[offset].decode(errors='replace').rstrip('\r')
+                for run in runs:
+                    for indicator, match_type, annotations in hit_runs.get(run, ()):
+                        for annotation in annotations:
+                            yield {
+                                **annotation,
+                                'indicator': indicator,
+                                'host': run.strip(b'.').decode(),
+                                'match': match_type,
+                                'line_number': line_number + offset + 1,
+                                'line': line
+                            }
+            line_number += window.count(b'\n')
+
+
+# Main program
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Match threat feed domains against DNS/URL logs")
+    parser.add_argument("logfile", help="DNS, proxy or URL log")
+    parser.add_argument("-t", "--threats", default="threats.json",
+                        help="Threat intelligence feed (JSON or NDJSON)")
+    parser.add_argument("-o", "--output", default="domain_hits.ndjson",
+                        help="NDJSON file for domain hits")
+    parser.add_argument("--url", action="store_true",
+                        help="URL/proxy log: also report indicators embedded in longer "
+                             "host names (substring matches)")
+    args = parser.parse_args()
+    
+    matcher = build_domain_matcher(load_threat_data(args.threats), substring=args.url)
+    print(f"🔍 Matching {args.logfile} against {len(matcher.domains)} domains...")
+    
+    total = 0
+    by_threat = {}
+    with open(args.output, 'w') as f:
+        for hit in iter_domain_hits(args.logfile, matcher):
+            total += 1
+            by_threat[hit['id']] = by_threat.get(hit['id'], 0) + 1
+            f.write(json.dumps(hit) + '\n')
+    
+    print(f"🚨 {total} domain hits")
+    for threat_id, count in sorted(by_threat.items(), key=lambda item: -item[1]):
+        print(f"   {threat_id}: {count}")
+    print(f"✓ Hits saved to {args.output}")
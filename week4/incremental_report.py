@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+# incremental_report.py
+# Keeps a threat report up to date by re-rendering only what changed
+
+import hashlib
+import json
+import os
+import struct
+from bisect import bisect_left
+from collections import Counter
+
+from threat_parser import (domain_key, iter_threats, report_header, report_summary,
+                           report_severity, report_listing, report_exploits, report_footer)
+
+STATE_VERSION = 3
+
+# Report sections in file order
+SECTIONS = ('header', 'summary', 'severity', 'ips', 'domains', 'exploits', 'footer')
+
+# Parts of the state kept in their own files and loaded on first use,
+# with the attributes each one fills in
+PARTS = {
+    'ips': ('ip_refs', 'sorted_ips'),
+    'domains': ('domain_refs', 'sorted_domains'),
+    'exploits': ('active_exploits',)
+}
+_PART_OF = {attr: part for part, attrs in PARTS.items() for attr in attrs}
+
+# The index file is the commit point of a saved state: one JSON line of
+# metadata and threat ids, then one entry per threat (hash of its feed
+# text, offset of its record in the threat log)
+INDEX_FILE = 'index'
+INDEX_ENTRY = struct.Struct("16sQ")
+NO_DIGEST = bytes(16)
+
+# Compact encoder, built once (json.dumps with options builds one per call)
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def section_hash(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class IncrementalReport:
+    """
+    Aggregates behind generate_report, maintained threat by threat.
+    
+    Each threat's contribution (severity, IP and domain occurrences,
+    active exploit record) is remembered as a record, and a change
+    subtracts the old contribution before adding the new one; threats
+    whose feed text hashes the same as last time are skipped without
+    building a record. IP/domain reference counts decide when an
+    address enters or leaves the unique lists, which are patched with
+    bisect rather than re-sorted (unless a large batch changed). Only sections whose
+    inputs changed are re-rendered, and a section is written to disk
+    only if its text hash differs from the last write.
+    
+    The state is saved between runs as a directory (see save), so a run
+    reads and writes roughly what changed: threat records stay in an
+    append-only log until a changed threat needs its old record, and
+    the IP, domain and exploit parts are only loaded when touched.
+    """
+    
+    def __init__(self):
+        self.feed = {}
+        # id -> record (or the record's offset in the log), and hash of
+        # the threat's feed text (NO_DIGEST if unknown)
+        self.records = {}
+        self.text_digests = {}
+        self.severity_counts = {'CRITICAL': 0, 'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
+        self.ip_refs = Counter()
+        self.domain_refs = Counter()
+        self.sorted_ips = []
+        self.sorted_domains = []
+        # Items whose membership changed since the lists were last sorted
+        self.ip_changes = set()
+        self.domain_changes = set()
+        self.total_ips = 0
+        self.total_domains = 0
+        # id -> exploit record, in first-seen order
+        self.active_exploits = {}
+        self.dirty = set(SECTIONS)
+        # Content hash and length of each section as last written
+        self.written = {}
+        self.written_file = None
+        
+        # Saved state this report was loaded from (None if in memory only)
+        self.state_dir = None
+        self.files = {}
+        self.generation = 0
+        self.log_size = 0
+        self.dead_records = 0
+        self.loaded_parts = set(PARTS)
+        self.part_sizes = {}
+        self.modified_parts = set()
+        self.new_records = set()
+        self._log = None
+    
+    def __getattr__(self, name):
+        # Only reached for attributes not set yet: parts still on disk
+        part = _PART_OF.get(name)
+        if part is None or part in self.__dict__.get('loaded_parts', PARTS):
+            raise AttributeError(name)
+        self._load_part(part)
+        return getattr(self, name)
+    
+    def _load_part(self, part):
+        with open(os.path.join(self.state_dir, self.files[part]), 'r') as f:
+            data = json.load(f)
+        if part == 'exploits':
+            self.active_exploits = {exploit['id']: exploit for exploit in data}
+        else:
+            refs_name, sorted_name = PARTS[part]
+            setattr(self, refs_name, Counter(dict(zip(data['items'], data['counts']))))
+            setattr(self, sorted_name, data['items'])
+        self.loaded_parts.add(part)
+    
+    def _part_size(self, part):
+        """
+        Returns: Number of unique IPs, domains or exploits, without
+        loading the part
+        """
+        if part in self.loaded_parts:
+            return len(getattr(self, PARTS[part][-1]))
+        return self.part_sizes[part]
+    
+    def _record(self, threat_id):
+        """
+        Returns: A threat's stored record, read from the log if needed
+        """
+        record = self.records[threat_id]
+        if not isinstance(record, int):
+            return record
+        if self._log is None:
+            self._log = open(os.path.join(self.state_dir, self.files['log']), 'rb')
+        self._log.seek(record)
+        return json.loads(self._log.readline())
+    
+    @staticmethod
+    def _count(refs, changes, items, delta):
+        """
+        Updates reference counts; records items entering or leaving.
+        """
+        for item in items:
+            count = refs.get(item, 0) + delta
+            if count <= 0:
+                del refs[item]
+                changes.add(item)
+            else:
+                refs[item] = count
+                if count == delta:
+                    changes.add(item)
+    
+    @staticmethod
+    def _refresh_sorted(refs, ordered, changes):
+        """
+        Applies membership changes to a sorted list: a few changes are
+        inserted/removed with bisect, a large batch re-sorts once.
+        
+        Returns: True if the list changed
+        """
+        modified = False
+        if len(changes) > len(ordered) // 8:
+            modified = bool(changes)
+            ordered[:] = sorted(refs)
+        else:
+            for item in changes:
+                i = bisect_left(ordered, item)
+                present = i < len(ordered) and ordered[i] == item
+                if item in refs and not present:
+                    ordered.insert(i, item)
+                    modified = True
+                elif item not in refs and present:
+                    del ordered[i]
+                    modified = True
+        changes.clear()
+        return modified
+    
+    def _refresh(self):
+        # Lists with no pending changes are left alone (possibly unloaded)
+        if self.ip_changes and self._refresh_sorted(self.ip_refs, self.sorted_ips,
+                                                    self.ip_changes):
+            self.dirty.add('ips')
+        if self.domain_changes and self._refresh_sorted(self.domain_refs, self.sorted_domains,
+                                                        self.domain_changes):
+            self.dirty.add('domains')
+    
+    def _apply(self, record, sign, other=None):
+        """
+        Adds (sign 1) or subtracts (sign -1) a record's contribution.
+        
+        Indicator lists equal to those of `other` (the record it replaces
+        or is replaced by) cancel out and are skipped, so e.g. a severity
+        change never loads the IP and domain parts.
+        """
+        self.severity_counts[record['severity']] += sign
+        self.dirty.update(('summary', 'severity'))
+        
+        if other is None or other['ips'] != record['ips']:
+            self.total_ips += sign * len(record['ips'])
+            self._count(self.ip_refs, self.ip_changes, record['ips'], sign)
+            self.modified_parts.add('ips')
+        
+        if other is None or other['domains'] != record['domains']:
+            self.total_domains += sign * len(record['domains'])
+            self._count(self.domain_refs, self.domain_changes, record['domains'], sign)
+            self.modified_parts.add('domains')
+    
+    def _set_exploit(self, threat_id, exploit, old_exploit):
+        if exploit == old_exploit:
+            return
+        # Assigning an existing key keeps the exploit in its position
+        if exploit:
+            self.active_exploits[threat_id] = exploit
+        else:
+            self.active_exploits.pop(threat_id, None)
+        self.dirty.add('exploits')
+        self.modified_parts.add('exploits')
+    
+    def set_threat(self, threat, text=None):
+        """
+        Adds or replaces one threat.
+        
+        Parameters:
+        - threat: Threat dictionary
+        - text: Optional source text of the threat in the feed; when it
+          is unchanged since the last run the threat is skipped without
+          looking at its content
+        
+        Returns: True if the threat was new or its part of the report
+        changed
+        """
+        threat_id = threat['id']
+        text_digest = section_hash(text.encode()) if text is not None else NO_DIGEST
+        known = threat_id in self.records
+        if known and text_digest != NO_DIGEST and self.text_digests[threat_id] == text_digest:
+            return False
+        
+        record = {
+            'severity': threat['severity'],
+            'ips': list(threat['indicators']['ips']),
+            'domains': list(map(domain_key, threat['indicators'].get('domains', ()))),
+            'exploit': {
+                'id': threat_id,
+                'type': threat['type'],
+                'description': threat['description']
+            } if threat['active_exploit'] else None
+        }
+        old = self._record(threat_id) if known else None
+        self.text_digests[threat_id] = text_digest
+        if record == old:
+            return False
+        # Add before subtracting so indicators the threat keeps never
+        # drop out of the unique lists
+        self._apply(record, 1, old)
+        if old is not None:
+            self._apply(old, -1, record)
+        self._set_exploit(threat_id, record['exploit'], old and old['exploit'])
+        
+        if known and isinstance(self.records[threat_id], int):
+            self.dead_records += 1
+        self.records[threat_id] = record
+        self.new_records.add(threat_id)
+        return True
+    
+    def remove_threat(self, threat_id):
+        """
+        Returns: True if the threat was present
+        """
+        if threat_id not in self.records:
+            return False
+        record = self._record(threat_id)
+        self._apply(record, -1)
+        self._set_exploit(threat_id, None, record['exploit'])
+        
+        if isinstance(self.records[threat_id], int):
+            self.dead_records += 1
+        del self.records[threat_id], self.text_digests[threat_id]
+        self.new_records.discard(threat_id)
+        return True
+    
+    def update(self, changed=(), removed=()):
+        """
+        Applies a delta: threats added or modified, and ids removed.
+        
+        Returns: Number of threats that actually changed
+        """
+        count = sum(self.set_threat(threat) for threat in changed)
+        count += sum(self.remove_threat(threat_id) for threat_id in removed)
+        return count
+    
+    def sync(self, threats, feed=None, with_text=False):
+        """
+        Brings the state in line with a complete feed: unchanged threats
+        are skipped, missing ones are removed.
+        
+        Parameters:
+        - threats: Iterable of every threat in the feed
+        - feed: Feed metadata (feed_name, date)
+        - with_text: threats are (threat, source text) pairs, as
+          iter_threats(..., with_text=True) yields them
+        
+        Returns: Number of threats that changed
+        """
+        seen = set()
+        count = 0
+        for threat in threats:
+            threat, text = threat if with_text else (threat, None)
+            seen.add(threat['id'])
+            count += self.set_threat(threat, text)
+        gone = [threat_id for threat_id in self.records if threat_id not in seen]
+        count += self.update(removed=gone)
+        if feed is not None:
+            self.set_feed(feed)
+        return count
+    
+    def set_feed(self, feed):
+        feed = {key: feed.get(key) for key in ('feed_name', 'date') if key in feed}
+        if feed != self.feed:
+            self.feed = feed
+            self.dirty.add('header')
+    
+    def critical_percentage(self):
+        if not self.records:
+            return 0.0
+        return (self.severity_counts['CRITICAL'] / len(self.records)) * 100
+    
+    def analysis(self):
+        """
+        Returns: Dictionary in the shape of analyze_threats' result
+        (unique lists are already sorted)
+        """
+        self._refresh()
+        return {
+            'total_threats': len(self.records),
+            'severity_counts': dict(self.severity_counts),
+            'unique_ips': self.sorted_ips,
+            'total_ips': self.total_ips,
+            'unique_domains': self.sorted_domains,
+            'total_domains': self.total_domains,
+            'active_exploits': list(self.active_exploits.values()),
+            'critical_percentage': self.critical_percentage()
+        }
+    
+    def _render(self, name):
+        if name == 'header':
+            return report_header(self.feed)
+        if name == 'summary':
+            # Only the counts are needed here
+            return report_summary({
+                'total_threats': len(self.records),
+                'total_ips': self.total_ips,
+                'unique_ips': range(self._part_size('ips')),
+                'total_domains': self.total_domains,
+                'unique_domains': range(self._part_size('domains')),
+                'active_exploits': range(self._part_size('exploits'))
+            })
+        if name == 'severity':
+            return report_severity({
+                'severity_counts': self.severity_counts,
+                'critical_percentage': self.critical_percentage()
+            })
+        if name == 'ips':
+            return report_listing("MALICIOUS IP ADDRESSES", self.sorted_ips)
+        if name == 'domains':
+            return report_listing("MALICIOUS DOMAINS", self.sorted_domains)
+        if name == 'exploits':
+            return report_exploits(self.active_exploits.values())
+        return report_footer()
+    
+    def write(self, output_file):
+        """
+        Writes the report, touching only the sections that changed.
+        
+        The header is always refreshed (its Generated time). A changed
+        section of the same byte length is overwritten in place; the
+        first one whose length changed causes the rest of the file from
+        that point to be rewritten, reusing the bytes already on disk for
+        sections that did not change. If the file is not the one this
+        state last wrote, every section is rendered and written.
+        
+        Returns: Names of the sections written
+        """
+        self._refresh()
+        previous = self.written if self._file_unchanged(output_file) else {}
+        if not previous:
+            self.dirty.update(SECTIONS)
+        self.dirty.add('header')
+        texts = {name: '\n'.join(self._render(name)).encode()
+                 for name in SECTIONS if name in self.dirty}
+        self.dirty.clear()
+        
+        hashes = {name: section_hash(texts[name]) if name in texts else previous[name][0]
+                  for name in SECTIONS}
+        lengths = {name: len(texts[name]) if name in texts else previous[name][1]
+                   for name in SECTIONS}
+        
+        written = []
+        mode = 'r+b' if previous else 'wb'
+        with open(output_file, mode) as f:
+            offset = 0
+            for position, name in enumerate(SECTIONS):
+                old = previous.get(name)
+                if old is None or old[0] != hashes[name]:
+                    f.seek(offset)
+                    if old is not None and old[1] == lengths[name]:
+                        f.write(texts[name])
+                        written.append(name)
+                    else:
+                        # Length changed: rewrite from here to the end
+                        old_tail = f.read() if previous else b''
+                        tail = []
+                        old_offset = 0
+                        for rest in SECTIONS[position:]:
+                            if rest in texts:
+                                tail.append(texts[rest])
+                            else:
+                                tail.append(old_tail[old_offset:old_offset + lengths[rest]])
+                            old_offset += (previous[rest][1] if previous else 0) + 1
+                        f.seek(offset)
+                        f.write(b'\n'.join(tail))
+                        f.truncate()
+                        written.extend(SECTIONS[position:])
+                        break
+                offset += lengths[name] + 1
+        
+        self.written = {name: (hashes[name], lengths[name]) for name in SECTIONS}
+        stat = os.stat(output_file)
+        self.written_file = (os.path.abspath(output_file), stat.st_size, stat.st_mtime_ns)
+        return written
+    
+    def _file_unchanged(self, output_file):
+        if not self.written or self.written_file is None:
+            return False
+        try:
+            stat = os.stat(output_file)
+        except FileNotFoundError:
+            return False
+        return self.written_file == (os.path.abspath(output_file), stat.st_size, stat.st_mtime_ns)
+    
+    def save(self, state_dir):
+        """
+        Saves the state to a directory, writing roughly what changed.
+        
+        - threats.<n>.log: append-only log of threat records (JSON lines);
+          new and changed records are appended, and the log is rewritten
+          with only live records once dead ones outnumber them
+        - ips/domains/exploits.<n>.json: one file per part, written again
+          (under the new generation number) only if the part changed
+        - index: metadata, threat ids, hashes and log offsets; replaced
+          atomically last, so an interrupted save leaves the previous
+          state in place, and files it no longer names are then deleted
+        """
+        if os.path.isfile(state_dir):
+            # A single-file state from an older version
+            os.remove(state_dir)
+        os.makedirs(state_dir, exist_ok=True)
+        self._refresh()
+        moved = self.state_dir is None or \
+            os.path.abspath(state_dir) != os.path.abspath(self.state_dir)
+        generation = self.generation + 1
+        files = dict(self.files)
+        
+        if moved or self.dead_records > len(self.records):
+            # Records are read from the old log before it is replaced
+            files['log'] = f'threats.{generation}.log'
+            with open(os.path.join(state_dir, files['log']), 'wb') as f:
+                self.log_size = self._write_records(f, list(self.records), 0)
+            self.dead_records = 0
+        elif self.new_records:
+            with open(os.path.join(state_dir, files['log']), 'r+b') as f:
+                # Drop anything an interrupted save appended
+                f.truncate(self.log_size)
+                f.seek(self.log_size)
+                self.log_size = self._write_records(f, self.new_records, self.log_size)
+        self.new_records.clear()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        
+        for part in PARTS:
+            if moved or part in self.modified_parts:
+                files[part] = f'{part}.{generation}.json'
+                with open(os.path.join(state_dir, files[part]), 'w') as f:
+                    f.write(_encode(self._part_data(part)))
+        self.modified_parts.clear()
+        
+        ids = list(self.records)
+        meta = {
+            'version': STATE_VERSION,
+            'generation': generation,
+            'files': files,
+            'log_size': self.log_size,
+            'dead_records': self.dead_records,
+            'feed': self.feed,
+            'severity_counts': self.severity_counts,
+            'total_ips': self.total_ips,
+            'total_domains': self.total_domains,
+            'part_sizes': {part: self._part_size(part) for part in PARTS},
+            'dirty': sorted(self.dirty),
+            'written': {name: [digest.hex(), length]
+                        for name, (digest, length) in self.written.items()},
+            'written_file': self.written_file,
+            'ids': ids
+        }
+        index = os.path.join(state_dir, INDEX_FILE)
+        with open(index + '.tmp', 'wb') as f:
+            f.write(_encode(meta).encode() + b'\n')
+            f.write(b''.join(map(INDEX_ENTRY.pack, map(self.text_digests.__getitem__, ids),
+                                 map(self.records.__getitem__, ids))))
+        os.replace(index + '.tmp', index)
+        
+        for name in os.listdir(state_dir):
+            if name != INDEX_FILE and name not in files.values():
+                os.remove(os.path.join(state_dir, name))
+        self.state_dir = state_dir
+        self.files = files
+        self.generation = generation
+    
+    def _write_records(self, f, threat_ids, offset):
+        """
+        Writes threat records as JSON lines, replacing each in-memory
+        record by its offset in the log.
+        
+        Returns: Offset after the last record
+        """
+        lines = []
+        offsets = {}
+        for threat_id in threat_ids:
+            line = _encode(self._record(threat_id)).encode() + b'\n'
+            offsets[threat_id] = offset
+            offset += len(line)
+            lines.append(line)
+        f.write(b''.join(lines))
+        self.records.update(offsets)
+        return offset
+    
+    def _part_data(self, part):
+        if part == 'exploits':
+            return list(self.active_exploits.values())
+        refs_name, sorted_name = PARTS[part]
+        refs = getattr(self, refs_name)
+        items = getattr(self, sorted_name)
+        return {'items': items, 'counts': list(map(refs.__getitem__, items))}
+    
+    @classmethod
+    def load(cls, state_dir):
+        """
+        Reads a saved state's index; parts and threat records are read
+        from the directory later, when needed.
+        
+        Returns: Saved state, or a fresh one if missing, unreadable or
+        incompatible
+        """
+        try:
+            with open(os.path.join(state_dir, INDEX_FILE), 'rb') as f:
+                meta = json.loads(f.readline())
+                entries = f.read()
+            return cls._from_index(state_dir, meta, entries)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, struct.error):
+            return cls()
+    
+    @classmethod
+    def _from_index(cls, state_dir, meta, entries):
+        if meta['version'] != STATE_VERSION:
+            raise ValueError("Incompatible state version")
+        ids = meta['ids']
+        if len(entries) != len(ids) * INDEX_ENTRY.size:
+            raise ValueError("Truncated state index")
+        
+        report = cls()
+        text_digests, offsets = zip(*INDEX_ENTRY.iter_unpack(entries)) if ids else ((), ())
+        report.records = dict(zip(ids, offsets))
+        report.text_digests = dict(zip(ids, text_digests))
+        
+        report.state_dir = state_dir
+        report.generation = int(meta['generation'])
+        report.files = {name: str(meta['files'][name]) for name in ('log', *PARTS)}
+        report.log_size = int(meta['log_size'])
+        report.dead_records = int(meta['dead_records'])
+        report.feed = dict(meta['feed'])
+        report.severity_counts = {severity: int(count)
+                                  for severity, count in meta['severity_counts'].items()}
+        report.total_ips = int(meta['total_ips'])
+        report.total_domains = int(meta['total_domains'])
+        report.part_sizes = {part: int(meta['part_sizes'][part]) for part in PARTS}
+        report.dirty = set(meta['dirty']) & set(SECTIONS)
+        report.written = {name: (bytes.fromhex(digest), int(length))
+                          for name, (digest, length) in meta['written'].items()}
+        if meta['written_file'] is not None:
+            path, size, mtime_ns = meta['written_file']
+            report.written_file = (str(path), int(size), int(mtime_ns))
+        
+        # Leave the parts on disk until something touches them
+        for part, attrs in PARTS.items():
+            for attr in attrs:
+                delattr(report, attr)
+        report.loaded_parts = set()
+        return report
+
+
+def state_path(output_file):
+    """
+    Returns the state directory kept next to a report.
+    """
+    return output_file + '.state'
+
+
+def regenerate_report(feed_file, output_file, delta=False, removed=()):
+    """
+    Updates a report from a feed, re-rendering only changed sections.
+    
+    Parameters:
+    - feed_file: JSON or NDJSON threat feed
+    - output_file: Report file
+    - delta: The feed holds only added or changed threats; threats not
+      in it are kept (unless listed in removed)
+    - removed: Threat ids to remove (with delta)
+    
+    Returns: (number of changed threats, names of sections written)
+    """
+    report = IncrementalReport.load(state_path(output_file))
+    metadata = {}
+    if delta:
+        changed = report.update(iter_threats(feed_file, metadata), removed)
+        if metadata:
+            report.set_feed(metadata)
+    else:
+        changed = report.sync(iter_threats(feed_file, metadata, with_text=True), metadata,
+                              with_text=True)
+    written = report.write(output_file)
+    report.save(state_path(output_file))
+    return changed, written
+
+
+# Main program
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Incrementally regenerate a threat report")
+    parser.add_argument("feed", nargs="?", default="threats.json")
+    parser.add_argument("-o", "--output", default="threat_report.txt")
+    parser.add_argument("--delta", action="store_true",
+                        help="The feed holds only added or changed threats")
+    parser.add_argument("--remove", action="append", default=[], metavar="ID",
+                        help="Remove a threat (with --delta; repeatable)")
+    args = parser.parse_args()
+    
+    if args.remove and not args.delta:
+        parser.error("--remove needs --delta")
+    changed, written = regenerate_report(args.feed, args.output, args.delta, args.remove)
+    print(f"🔄 {changed} threats changed; rewrote {', '.join(written) or 'nothing'}")
+    print(f"✓ Report saved to {args.output}")
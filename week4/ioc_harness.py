@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# ioc_harness.py
+# Checks the windowed IOC matcher against a line-by-line reference on
+# generated logs, including malformed lines
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from ioc_matcher import FIELDS, build_ip_index, iter_ioc_hits
+from log_fastpath import ip_bytes_to_int
+
+# Lines the matcher must skip or truncate, like iter_log_entries does
+MALFORMED = [
+    "2024-12-01 00:00:00 DENY {src} {dst}",            # missing port
+    "2024-12-01 00:00:00 ALLOW {src} {dst} 80 extra",  # extra field
+    "2024-12-01 00:00:00  DENY {src} {dst} 22",        # double space
+    "2024-12-01\t00:00:00 DENY {src} {dst} 443",       # tab
+    "",                                                 # blank line
+    "garbage",
+]
+
+
+def random_ip(rng, pool):
+    return rng.choice(pool) if rng.random() < 0.05 else \
+        f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+def generate_log(filename, lines, pool, malformed_rate, seed):
+    """
+    Writes a log where a share of the lines are malformed.
+
+    Parameters:
+    - filename: Output filename
+    - lines: Number of lines
+    - pool: Indicator IPs that some lines use
+    - malformed_rate: Share of malformed lines
+    - seed: Random seed
+    """
+    rng = random.Random(seed)
+    out = []
+    for i in range(lines):
+        src, dst = random_ip(rng, pool), random_ip(rng, pool)
+        if rng.random() < malformed_rate:
+            out.append(rng.choice(MALFORMED).format(src=src, dst=dst))
+        else:
+            out.append(f"2024-12-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d} "
+                       f"{rng.choice(['ALLOW', 'DENY'])} {src} {dst} {rng.choice([22, 80, 443])}")
+    with open(filename, 'w') as f:
+        f.write('\n'.join(out) + '\n')
+
+
+def reference_hits(logfile, ip_index):
+    """
+    Matches a log one line at a time (the behaviour iter_ioc_hits must
+    reproduce).
+
+    Returns: List of hit dictionaries
+    """
+    hits = []
+    with open(logfile, 'rb') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < FIELDS:
+                continue
+            date, time, action, source, dest, port = parts[:FIELDS]
+            matches = []
+            for ip, direction in ((source, 'source'), (dest, 'destination')):
+                value = ip_bytes_to_int(ip)
+                threats = ip_index.lookup(value) if value is not None else ()
+                if threats:
+                    matches.append({'ip': ip.decode(), 'direction': direction,
+                                    'threats': list(threats)})
+            if matches:
+                hits.append({
+                    'timestamp': f"{date.decode()} {time.decode()}",
+                    'action': action.decode(),
+                    'source_ip': source.decode(),
+                    'dest_ip': dest.decode(),
+                    'port': int(port) if port.isdigit() else port.decode(),
+                    'matches': matches
+                })
+    return hits
+
+
+def threat_feed(indicators):
+    return {'threats': [{'id': f"THREAT-{i:03d}", 'severity': "HIGH", 'active_exploit': False,
+                         'indicators': {'ips': [indicator]}}
+                        for i, indicator in enumerate(indicators)]}
+
+
+def main():
+    """
+    Runs every indicator mode over clean and malformed logs.
+    """
+    parser = argparse.ArgumentParser(description="IOC matcher harness")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [f"198.51.100.{rng.randrange(1, 255)}" for _ in range(200)]
+    modes = {
+        'few exact IPs (pre-screened)': pool[:10],
+        'many exact IPs': pool,
+        'exact IPs and a CIDR block': pool[:10] + ["198.51.100.0/25"],
+    }
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        logfile = os.path.join(tmpdir, "firewall.log")
+        for rate in (0.0, 0.0005, 0.05):
+            generate_log(logfile, args.lines, pool, rate, args.seed)
+            for name, indicators in modes.items():
+                ip_index = build_ip_index(threat_feed(indicators))
+                got = list(iter_ioc_hits(logfile, ip_index))
+                expected = reference_hits(logfile, ip_index)
+                ok = got == expected
+                print(f"{'✓' if ok else '❌'} {name}, {rate:.2%} malformed lines: "
+                      f"{len(got)} hits (expected {len(expected)})")
+                failed = failed or not ok
+
+        # One short and one long line in the same window: each on its
+        # own must not shift the rows between them
+        with open(logfile, 'w') as f:
+            f.write("2024-12-01 00:00:01 DENY 1.1.1.1 2.2.2.2\n"
+                    "2024-12-01 00:00:02 ALLOW 3.3.3.3 4.4.4.4 80\n"
+                    "2024-12-01 00:00:03 DENY 5.5.5.5 6.6.6.6 443 extra\n")
+        ip_index = build_ip_index(threat_feed(["4.4.4.4"]))
+        got = [(hit['timestamp'], hit['action'], hit['dest_ip'], hit['port'])
+               for hit in iter_ioc_hits(logfile, ip_index)]
+        ok = got == [("2024-12-01 00:00:02", "ALLOW", "4.4.4.4", 80)]
+        print(f"{'✓' if ok else '❌'} short and long line in one window: {got}")
+        failed = failed or not ok
+
+    if failed:
+        print("❌ FAIL")
+        sys.exit(1)
+    print("✅ PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# ioc_matcher.py
+# Correlates firewall log traffic with threat intelligence indicators
+
+import json
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+
+from log_fastpath import MAX_CACHED_IPS, gc_paused, ip_bytes_to_int, int_to_ip, iter_windows
+from threat_parser import load_threat_data
+
+# Fields per canonical log line: date time action src dst port
+FIELDS = 6
+
+# Deleting every non-whitespace byte from a window leaves its separators;
+# a canonical line leaves exactly FIELDS - 1 spaces and its newline
+_NON_WHITESPACE = bytes(byte for byte in range(256) if not bytes([byte]).isspace())
+_CANONICAL_SEPARATORS = b' ' * (FIELDS - 1) + b'\n'
+
+# Up to this many indicators, windows are pre-screened with substring
+# searches before being tokenized
+PRESCREEN_MAX = 64
+
+
+def parse_ip_indicator(text):
+    """
+    Parses an IP indicator into an inclusive range of integer addresses.
+    
+    Accepted forms:
+    - Single IP:    198.51.100.42
+    - CIDR block:   198.51.100.0/24 (host bits are ignored)
+    - Full range:   198.51.100.10-198.51.100.50
+    - Short range:  198.51.100.10-50 (last octet only)
+    
+    Returns: (first, last) integer addresses
+    
+    Raises: ValueError if the indicator is not valid
+    """
+    text = text.strip()
+    
+    if '/' in text:
+        ip, prefix = text.split('/', 1)
+        value = ip_bytes_to_int(ip.encode())
+        if value is None or not prefix.isdigit() or not 0 <= int(prefix) <= 32:
+            raise ValueError(f"Invalid CIDR indicator: {text}")
+        size = 1 << (32 - int(prefix))
+        first = value & ~(size - 1) & 0xFFFFFFFF
+        return first, first + size - 1
+    
+    if '-' in text:
+        start, end = text.split('-', 1)
+        if end.strip().isdigit():
+            end = start.rsplit('.', 1)[0] + '.' + end.strip()
+        first = ip_bytes_to_int(start.strip().encode())
+        last = ip_bytes_to_int(end.strip().encode())
+        if first is None or last is None or first > last:
+            raise ValueError(f"Invalid IP range indicator: {text}")
+        return first, last
+    
+    value = ip_bytes_to_int(text.encode())
+    if value is None:
+        raise ValueError(f"Invalid IP indicator: {text}")
+    return value, value
+
+
+class IPIndex:
+    """
+    Lookup structure for IP indicators.
+    
+    Single addresses live in a dict keyed by 32-bit int. Ranges and CIDR
+    blocks are compiled into disjoint elementary segments (sorted start
+    and end arrays, searched with bisect), each carrying the annotations
+    of every indicator that covers it, most specific first. A lookup is
+    one hash probe plus one O(log n) bisect, however many prefixes
+    overlap.
+    """
+    
+    def __init__(self, exact=None, ranges=()):
+        """
+        Parameters:
+        - exact: Dictionary of 32-bit IP -> tuple of annotations
+        - ranges: Iterable of (first, last, annotation)
+        """
+        self.exact = exact or {}
+        self.starts = array('I')
+        self.ends = array('I')
+        self.segments = []
+        self._compile(list(ranges))
+    
+    def _compile(self, ranges):
+        starts_at = defaultdict(list)
+        ends_at = defaultdict(list)
+        for order, (first, last, _) in enumerate(ranges):
+            starts_at[first].append(order)
+            ends_at[last + 1].append(order)
+        
+        # Sweep the boundaries left to right, tracking covering ranges
+        active = {}
+        bounds = sorted(starts_at.keys() | ends_at.keys())
+        for pos, next_pos in zip(bounds, bounds[1:]):
+            for order in ends_at.get(pos, ()):
+                del active[order]
+            for order in starts_at.get(pos, ()):
+                first, last, annotation = ranges[order]
+                active[order] = (last - first, order, annotation)
+            if not active:
+                continue
+            
+            covering = tuple(annotation for _, _, annotation in sorted(active.values(),
+                                                                       key=lambda item: item[:2]))
+            if self.segments and self.ends[-1] == pos - 1 and self.segments[-1] == covering:
+                self.ends[-1] = next_pos - 1
+            else:
+                self.starts.append(pos)
+                self.ends.append(next_pos - 1)
+                self.segments.append(covering)
+    
+    @property
+    def has_ranges(self):
+        return bool(self.segments)
+    
+    def lookup(self, value):
+        """
+        Returns: Tuple of annotations matching a 32-bit IP (empty if none)
+        """
+        found = self.exact.get(value, ())
+        if self.segments:
+            i = bisect_right(self.starts, value) - 1
+            if i >= 0 and value <= self.ends[i]:
+                found += self.segments[i]
+        return found
+    
+    def __len__(self):
+        return len(self.exact) + len(self.segments)
+
+
+def build_ip_index(threat_data):
+    """
+    Compiles the IP indicators of a threat feed (addresses, CIDR blocks
+    and ranges) into an IPIndex.
+    
+    Parameters:
+    - threat_data: Parsed threat feed (see threat_parser.load_threat_data)
+    
+    Returns: IPIndex whose annotations are dictionaries with the threat
+    'id', 'severity', 'active_exploit' and the matching 'indicator'
+    
+    Raises: ValueError naming the threat if an indicator is not valid
+    """
+    exact = {}
+    ranges = []
+    for threat in threat_data['threats']:
+        for ip in threat['indicators']['ips']:
+            try:
+                first, last = parse_ip_indicator(ip)
+            except ValueError as e:
+                raise ValueError(f"{threat['id']}: {e}") from None
+            annotation = {
+                'id': threat['id'],
+                'severity': threat['severity'],
+                'active_exploit': threat['active_exploit'],
+                'indicator': ip.strip()
+            }
+            if first != last:
+                ranges.append((first, last, annotation))
+            elif annotation not in exact.get(first, ()):
+                exact[first] = exact.get(first, ()) + (annotation,)
+    return IPIndex(exact, ranges)
+
+
+def _window_tokens(window):
+    """
+    Splits a window into a flat token list, FIELDS tokens per line.
+    
+    Canonical windows (every line FIELDS fields split by single spaces)
+    are split in one bytes.split call. They are recognized line by line
+    without a Python loop: the window's separators, left after deleting
+    all other bytes, must be FIELDS - 1 spaces and a newline per line,
+    so a short line can never be made up for by a long one elsewhere.
+    Anything else is split line by line, dropping malformed lines and
+    any extra trailing fields.
+    """
+    lines = window.count(b'\n') + (not window.endswith(b'\n'))
+    separators = window.translate(None, _NON_WHITESPACE)
+    if not window.endswith(b'\n'):
+        separators += b'\n'
+    if lines and separators == _CANONICAL_SEPARATORS * lines:
+        # At most FIELDS tokens per line, so FIELDS * lines means all full
+        tokens = window.split()
+        if len(tokens) == FIELDS * lines:
+            return tokens
+    
+    tokens = []
+    for parts in map(bytes.split, window.split(b'\n')):
+        if len(parts) >= FIELDS:
+            tokens.extend(parts[:FIELDS])
+    return tokens
+
+
+def iter_ioc_hits(logfile, ip_index):
+    """
+    Streams a firewall log and yields the lines that touch an indicator.
+    
+    Each window is tokenized in C and its source and destination
+    columns are tested against the indicator set with set.isdisjoint,
+    so windows without a hit never reach per-line Python code. Only
+    windows containing a hit are walked to find the matching lines.
+    Small indicator sets first screen whole windows with bytes searches
+    and skip tokenizing windows that contain none of the indicators.
+    With range or CIDR indicators, each distinct address of a window is
+    looked up once in the IPIndex (results are cached across windows).
+    
+    Parameters:
+    - logfile: Firewall log
+    - ip_index: IPIndex from build_ip_index
+    
+    Returns: Generator of hit dictionaries (timestamp, action, source_ip,
+    dest_ip, port, matches), where matches lists the matched IPs with
+    their direction and threat annotations
+    """
+    # Exact indicators match on the raw bytes of canonical dotted IPs
+    exact_keys = {int_to_ip(value).encode(): threats
+                  for value, threats in ip_index.exact.items()}
+    if not exact_keys and not ip_index.has_ranges:
+        return
+    exact_set = exact_keys.keys()
+    prescreen = not ip_index.has_ranges and len(exact_keys) <= PRESCREEN_MAX
+    # Raw IP bytes -> annotations, for range lookups
+    lookup_cache = {}
+    
+    with gc_paused():
+        for window in iter_windows(logfile):
+            # A substring miss rules the window out; a hit may be partial
+            # (1.2.3.4 inside 11.2.3.45) and is confirmed on the tokens
+            if prescreen and not any(key in window for key in exact_keys):
+                continue
+            tokens = _window_tokens(window)
+            sources = tokens[3::FIELDS]
+            dests = tokens[4::FIELDS]
+            
+            if ip_index.has_ranges:
+                # Resolve each distinct address of the window once
+                keys = {}
+                for ip in set(sources).union(dests):
+                    threats = lookup_cache.get(ip)
+                    if threats is None:
+                        if len(lookup_cache) > MAX_CACHED_IPS:
+                            lookup_cache.clear()
+                        value = ip_bytes_to_int(ip)
+                        threats = ip_index.lookup(value) if value is not None else ()
+                        lookup_cache[ip] = threats
+                    if threats:
+                        keys[ip] = threats
+                if not keys:
+                    continue
+            elif exact_set.isdisjoint(sources) and exact_set.isdisjoint(dests):
+                continue
+            else:
+                keys = exact_keys
+            
+            rows = sorted({i for i, ip in enumerate(sources) if ip in keys} |
+                          {i for i, ip in enumerate(dests) if ip in keys})
+            for row in rows:
+                date, time, action, source, dest, port = tokens[row * FIELDS:(row + 1) * FIELDS]
+                matches = []
+                for ip, direction in ((source, 'source'), (dest, 'destination')):
+                    if ip in keys:
+                        matches.append({
+                            'ip': ip.decode(),
+                            'direction': direction,
+                            'threats': list(keys[ip])
+                        })
+                yield {
+                    'timestamp': f"{date.decode()} {time.decode()}",
+                    'action': action.decode(),
+                    'source_ip': source.decode(),
+                    'dest_ip': dest.decode(),
+                    'port': int(port) if port.isdigit() else port.decode(),
+                    'matches': matches
+                }
+
+
+def summarize_hits(hits, on_hit=None):
+    """
+    Aggregates IOC hits.
+    
+    Parameters:
+    - hits: Iterable of hit dictionaries (see iter_ioc_hits)
+    - on_hit: Optional callback(hit), e.g. to write hits as they stream
+    
+    Returns: Dictionary with totals per threat, severity and action
+    """
+    total = 0
+    by_threat = Counter()
+    by_severity = Counter()
+    by_action = Counter()
+    matched_ips = Counter()
+    active_exploit_hits = 0
+    
+    for hit in hits:
+        total += 1
+        by_action[hit['action']] += 1
+        threats = {}
+        for match in hit['matches']:
+            matched_ips[match['ip']] += 1
+            for threat in match['threats']:
+                threats[threat['id']] = threat
+        for threat in threats.values():
+            by_threat[threat['id']] += 1
+            by_severity[threat['severity']] += 1
+        if any(threat['active_exploit'] for threat in threats.values()):
+            active_exploit_hits += 1
+        if on_hit:
+            on_hit(hit)
+    
+    return {
+        'total_hits': total,
+        'active_exploit_hits': active_exploit_hits,
+        'hits_by_threat': dict(by_threat.most_common()),
+        'hits_by_severity': dict(by_severity.most_common()),
+        'hits_by_action': dict(by_action),
+        'matched_ips': dict(matched_ips.most_common())
+    }
+
+
+def match_log(logfile, threat_data, output_file=None):
+    """
+    Correlates a firewall log with a threat feed.
+    
+    Parameters:
+    - logfile: Firewall log
+    - threat_data: Parsed threat feed
+    - output_file: Optional NDJSON file receiving one line per hit
+    
+    Returns: Summary dictionary (see summarize_hits)
+    """
+    hits = iter_ioc_hits(logfile, build_ip_index(threat_data))
+    if output_file is None:
+        return summarize_hits(hits)
+    
+    with open(output_file, 'w') as f:
+        def write_hit(hit):
+            f.write(json.dumps(hit) + '\n')
+        return summarize_hits(hits, on_hit=write_hit)
+
+
+# Main program
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Match firewall logs against threat indicators")
+    parser.add_argument("logfile", nargs="?", default="firewall.log")
+    parser.add_argument("-t", "--threats", default="threats.json",
+                        help="Threat intelligence feed (JSON)")
+    parser.add_argument("-o", "--output", default="ioc_hits.ndjson",
+                        help="NDJSON file for matching log lines")
+    args = parser.parse_args()
+    
+    threat_data = load_threat_data(args.threats)
+    
+    print(f"🔍 Matching {args.logfile} against {args.threats}...")
+    summary = match_log(args.logfile, threat_data, args.output)
+    
+    print(f"🚨 {summary['total_hits']} log lines hit known threat IPs "
+          f"({summary['active_exploit_hits']} tied to active exploits)")
+    for threat_id, count in summary['hits_by_threat'].items():
+        print(f"   {threat_id}: {count}")
+    for ip, count in summary['matched_ips'].items():
+        print(f"   - {ip}: {count}")
+    print(f"✓ Hits saved to {args.output}")
@@ -3,48 +3,54 @@
 # Analyzes firewall logs and generates JSON reports
 
 import json
-from collections import Counter
+from collections import Counter, namedtuple
 
-def parse_log_file(filename):
+# One parsed log line. A namedtuple has no per-instance dict, so it is
+# much smaller than the dict this parser used to build for every line.
+LogEntry = namedtuple('LogEntry', ['date', 'time', 'action', 'source_ip', 'dest_ip', 'port'])
+
+
+def iter_log_entries(filename):
     """
-    Parses firewall log file line by line.
+    Streams a firewall log file one entry at a time.
     
-    Returns: List of log entry dictionaries
-    """
-    log_entries = []
+    Only the current line is held in memory, so peak memory stays flat
+    no matter how big the log is.
     
+    Returns: Generator of LogEntry tuples
+    """
     with open(filename, 'r') as f:
-        lines = f.readlines()
+        for line in f:
+            # Split line into components
+            # Format: date time action source_ip dest_ip port
+            parts = line.split()
+            
+            # Skip empty and malformed lines
+            if len(parts) >= 6:
+                yield LogEntry(parts[0], parts[1], parts[2], parts[3], parts[4],
+                               int(parts[5]))
+
+
+def parse_log_file(filename):
+    """
+    Parses firewall log file line by line.
     
-    for line in lines:
-        # Skip empty lines
-        if not line.strip():
-            continue
-        
-        # Split line into components
-        # Format: date time action source_ip dest_ip port
-        parts = line.strip().split()
-        
-        if len(parts) >= 6:
-            entry = {
-                'date': parts[0],
-                'time': parts[1],
-                'action': parts[2],
-                'source_ip': parts[3],
-                'dest_ip': parts[4],
-                'port': int(parts[5])
-            }
-            log_entries.append(entry)
-    
-    return log_entries
+    Returns: List of LogEntry tuples (use iter_log_entries to stream)
+    """
+    return list(iter_log_entries(filename))
 
 
 def analyze_logs(log_entries):
     """
     Analyzes parsed log entries for security insights.
     
+    Works in a single pass over any iterable, including the
+    iter_log_entries generator, without storing the entries.
+    
     Returns: Dictionary with analysis results
     """
+    total_entries = 0
+    
     # Count ALLOW vs DENY
     allow_count = 0
     deny_count = 0
@@ -52,26 +58,29 @@ def analyze_logs(log_entries):
     # Track denied source IPs
     denied_ips = set()
     
-    # Track all denied ports for finding most targeted
-    denied_ports = []
+    # Count denied ports directly instead of keeping a list of them
+    port_counter = Counter()
     
-    # Track timestamps
-    timestamps = []
+    # Only the first and last timestamps are reported
+    first_entry = None
+    last_entry = None
     
     for entry in log_entries:
+        total_entries += 1
+        
         # Count actions
-        if entry['action'] == 'ALLOW':
+        if entry.action == 'ALLOW':
             allow_count += 1
-        elif entry['action'] == 'DENY':
+        elif entry.action == 'DENY':
             deny_count += 1
-            denied_ips.add(entry['source_ip'])
-            denied_ports.append(entry['port'])
+            denied_ips.add(entry.source_ip)
+            port_counter[entry.port] += 1
         
-        # Collect timestamps
-        timestamps.append(f"{entry['date']} {entry['time']}")
+        if first_entry is None:
+            first_entry = entry
+        last_entry = entry
     
     # Find most targeted port using Counter
-    port_counter = Counter(denied_ports)
     most_targeted_port = None
     most_targeted_count = 0
     
@@ -79,11 +88,11 @@ def analyze_logs(log_entries):
         most_targeted_port, most_targeted_count = port_counter.most_common(1)[0]
     
     # Determine time range
-    first_timestamp = timestamps[0] if timestamps else "N/A"
-    last_timestamp = timestamps[-1] if timestamps else "N/A"
+    first_timestamp = f"{first_entry.date} {first_entry.time}" if first_entry else "N/A"
+    last_timestamp = f"{last_entry.date} {last_entry.time}" if last_entry else "N/A"
     
     return {
-        'total_entries': len(log_entries),
+        'total_entries': total_entries,
         'allow_count': allow_count,
         'deny_count': deny_count,
         'denied_source_ips': sorted(list(denied_ips)),
@@ -129,8 +138,13 @@ def display_summary(analysis):
     print(f"   ({deny_pct:.1f}% of traffic was denied)")
     print()
     
-    print(f"🔒 Unique denied source IPs: {len(analysis['denied_source_ips'])}")
-    print("   Blocked IPs:")
+    if analysis.get('approximate'):
+        # Sketch results: estimated distinct count, heavy hitters only
+        print(f"🔒 Unique denied source IPs: ~{analysis['unique_denied_sources']}")
+        print("   Top blocked IPs:")
+    else:
+        print(f"🔒 Unique denied source IPs: {len(analysis['denied_source_ips'])}")
+        print("   Blocked IPs:")
     for ip in analysis['denied_source_ips']:
         print(f"     - {ip}")
     print()
@@ -153,7 +167,10 @@ def display_summary(analysis):
         port_name = port_names.get(port, "Unknown")
         
         print(f"🎯 Most targeted port: {port} ({port_name})")
-        print(f"   Attacked {count} times")
+        if analysis.get('approximate'):
+            print(f"   Attacked ~{count} times")
+        else:
+            print(f"   Attacked {count} times")
         print()
     
     print(f"⏰ Time range:")
@@ -166,21 +183,100 @@ def display_summary(analysis):
 
 # Main program
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Firewall log analyzer")
+    parser.add_argument("logfile", nargs="?", default="firewall.log")
+    parser.add_argument("-o", "--output", default="log_analysis.json")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="Analyze in parallel with this many processes")
+    parser.add_argument("--fast", action="store_true",
+                        help="Use the mmap/bytes fast path parser")
+    parser.add_argument("--cache", action="store_true",
+                        help="Analyze from a columnar cache next to the log "
+                             "(built on first use, reused while the log is unchanged)")
+    parser.add_argument("-f", "--follow", action="store_true",
+                        help="Keep following the log and save periodic snapshots")
+    parser.add_argument("--snapshot-interval", type=float, default=60.0,
+                        help="Seconds between snapshots in follow mode")
+    parser.add_argument("--windows",
+                        help="Stream per-minute/per-hour buckets to this NDJSON file "
+                             "and report traffic bursts")
+    parser.add_argument("--threats",
+                        help="Also match the log against this threat feed's IP indicators")
+    parser.add_argument("--approx", action="store_true",
+                        help="Estimate denied-IP/port statistics with fixed-memory "
+                             "sketches (combine with -w to shard)")
+    args = parser.parse_args()
+    
+    if args.windows:
+        from log_windows import analyze_time_windows, ndjson_bucket_writer
+        
+        with open(args.windows, 'w') as f:
+            windows = analyze_time_windows(iter_log_entries(args.logfile),
+                                           on_close=ndjson_bucket_writer(f))
+        
+        print("⏱️  Hourly traffic:")
+        for bucket in windows['per_hour']:
+            top = ', '.join(f"{ip} ({count})" for ip, count in bucket['top_sources'][:3])
+            print(f"   {bucket['window']}:00  ALLOW {bucket['allow']:>6}  "
+                  f"DENY {bucket['deny']:>6}  top: {top}")
+        for granularity, bursts in windows['bursts'].items():
+            for burst in bursts:
+                print(f"🚨 {granularity} burst at {burst['window']}: {burst['deny']} denies "
+                      f"(expected ~{burst['expected']})")
+        print(f"✓ Time buckets saved to {args.windows}")
+        raise SystemExit(0)
+    
+    if args.follow:
+        from log_follow import follow_log
+        
+        def show_snapshot(snapshot):
+            print(f"📸 {snapshot['total_entries']} entries, "
+                  f"{snapshot['deny_count']} denied, "
+                  f"{len(snapshot['denied_source_ips'])} blocked IPs "
+                  f"(last: {snapshot['time_range']['last']})")
+        
+        print(f"👀 Following {args.logfile} (Ctrl+C to stop)...")
+        analysis = follow_log(args.logfile, args.output,
+                              snapshot_interval=args.snapshot_interval,
+                              on_snapshot=show_snapshot)
+        display_summary(analysis)
+        raise SystemExit(0)
+    
     print()
     print("=" * 70)
     print("FIREWALL LOG ANALYZER")
     print("=" * 70)
     print()
     
-    # Parse log file
-    print("📖 Reading firewall.log...")
-    log_entries = parse_log_file('firewall.log')
-    print(f"✓ Parsed {len(log_entries)} log entries")
-    print()
-    
-    # Analyze logs
+    print(f"📖 Reading {args.logfile}...")
     print("🔍 Analyzing firewall traffic patterns...")
-    analysis = analyze_logs(log_entries)
+    if args.approx:
+        from log_sketches import analyze_logs_approx, analyze_logs_approx_parallel
+        if args.workers:
+            analysis = analyze_logs_approx_parallel(args.logfile, args.workers)
+        else:
+            analysis = analyze_logs_approx(iter_log_entries(args.logfile))
+    elif args.workers:
+        from log_parallel import analyze_logs_parallel
+        analysis = analyze_logs_parallel(args.logfile, args.workers)
+    elif args.cache:
+        from log_cache import analyze_logs_cached
+        analysis = analyze_logs_cached(args.logfile)
+    elif args.fast:
+        from log_fastpath import analyze_logs_fast
+        analysis = analyze_logs_fast(args.logfile)
+    else:
+        # Parse and analyze in one streaming pass
+        analysis = analyze_logs(iter_log_entries(args.logfile))
+    print(f"✓ Parsed {analysis['total_entries']} log entries")
+    if args.threats:
+        from ioc_matcher import match_log
+        from threat_parser import load_threat_data
+        analysis['threat_matches'] = match_log(args.logfile, load_threat_data(args.threats))
+        print(f"🚨 {analysis['threat_matches']['total_hits']} entries hit threat indicators "
+              f"from {args.threats}")
     print("✓ Analysis complete")
     print()
     
@@ -189,7 +285,7 @@ if __name__ == "__main__":
     
     # Save JSON report
     print()
-    print("💾 Saving analysis to log_analysis.json...")
-    save_json_report(analysis, 'log_analysis.json')
+    print(f"💾 Saving analysis to {args.output}...")
+    save_json_report(analysis, args.output)
     print("✓ JSON report saved successfully")
-    print()
\ No newline at end of file
+    print()
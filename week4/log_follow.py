@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# log_follow.py
+# Follows a live firewall log and keeps the analysis up to date
+
+import os
+import time
+
+from log_analyzer import save_json_report
+from log_parallel import empty_partial, finish_partial
+
+
+class IncrementalAnalyzer:
+    """
+    Running version of analyze_logs that is fed one line at a time.
+    
+    It keeps the same mergeable counters log_parallel uses (counts,
+    denied IP set, denied port Counter, earliest/latest timestamp), so
+    a snapshot costs nothing proportional to the lines already seen.
+    """
+    
+    def __init__(self):
+        self.partial = empty_partial()
+    
+    def add_line(self, line):
+        """
+        Adds one raw log line.
+        
+        Returns: True if the line was a valid entry
+        """
+        parts = line.split()
+        if len(parts) < 6 or not parts[5].isdigit():
+            return False
+        
+        partial = self.partial
+        partial['total_entries'] += 1
+        if parts[2] == 'ALLOW':
+            partial['allow_count'] += 1
+        elif parts[2] == 'DENY':
+            partial['deny_count'] += 1
+            partial['denied_ips'].add(parts[3])
+            partial['denied_ports'][int(parts[5])] += 1
+        
+        timestamp = f"{parts[0]} {parts[1]}"
+        if partial['first'] is None or timestamp < partial['first']:
+            partial['first'] = timestamp
+        if partial['last'] is None or timestamp > partial['last']:
+            partial['last'] = timestamp
+        return True
+    
+    def snapshot(self):
+        """
+        Returns the current analysis in the log_analysis.json shape.
+        """
+        return finish_partial(self.partial)
+
+
+class LogFollower:
+    """
+    Tails a log file by byte offset, like `tail -F`.
+    
+    Each poll reads only the bytes appended since the last one. A
+    changed inode means the log was rotated: the rest of the old file
+    is drained and the new file is read from the start. A file that got
+    smaller than the saved offset was truncated and is re-read from 0.
+    
+    Counts carry over across rotation and truncation: entries already
+    seen stay in the analyzer, only new content is added. (A file
+    truncated and refilled past the old offset before the next poll
+    cannot be told apart from appends.)
+    """
+    
+    def __init__(self, filename, analyzer, from_end=False):
+        self.filename = filename
+        self.analyzer = analyzer
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.pending = ''
+        self._open(seek_end=from_end)
+    
+    def _open(self, seek_end=False):
+        """
+        Opens (or reopens) the log; a missing file is retried on poll.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        try:
+            self.file = open(self.filename, 'r')
+        except FileNotFoundError:
+            self.inode = None
+            return
+        stat = os.fstat(self.file.fileno())
+        self.inode = stat.st_ino
+        self.offset = 0
+        self.pending = ''
+        if seek_end:
+            self.offset = self.file.seek(0, os.SEEK_END)
+    
+    def _read_new(self):
+        """
+        Reads appended data and feeds every complete line.
+        
+        Returns: Number of lines processed
+        """
+        data = self.file.read()
+        if not data:
+            return 0
+        self.offset = self.file.tell()
+        
+        # Keep a partly written last line until its newline arrives
+        lines = (self.pending + data).split('\n')
+        self.pending = lines.pop()
+        
+        processed = 0
+        for line in lines:
+            if self.analyzer.add_line(line):
+                processed += 1
+        return processed
+    
+    def _flush_pending(self):
+        """
+        Feeds a last line that never got its newline (file is finished).
+        """
+        line, self.pending = self.pending, ''
+        return 1 if line and self.analyzer.add_line(line) else 0
+    
+    def poll(self):
+        """
+        Processes whatever was appended since the last poll.
+        
+        Returns: Number of new entries processed
+        """
+        if self.file is None:
+            self._open()
+            if self.file is None:
+                return 0
+        
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet: drain the old file
+            return self._read_new()
+        
+        processed = 0
+        if stat.st_ino != self.inode:
+            # Rotation: finish the old file, then start on the new one
+            processed += self._read_new() + self._flush_pending()
+            self._open()
+        elif stat.st_size < self.offset:
+            # Truncation: the old content is gone, start at 0 (what was
+            # already counted stays counted)
+            self.file.seek(0)
+            self.offset = 0
+            self.pending = ''
+        
+        processed += self._read_new()
+        return processed
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def follow_log(filename, snapshot_file=None, poll_interval=1.0,
+               snapshot_interval=60.0, from_end=False, on_snapshot=None):
+    """
+    Follows a log until interrupted, saving periodic snapshots.
+    
+    Parameters:
+    - filename: Log file to follow
+    - snapshot_file: JSON file rewritten with each snapshot (optional)
+    - poll_interval: Seconds between polls
+    - snapshot_interval: Seconds between snapshots
+    - from_end: Skip the existing content and only count new lines
+    - on_snapshot: Optional callback(analysis) for each snapshot
+    
+    Returns: The final analysis when interrupted with Ctrl+C
+    """
+    analyzer = IncrementalAnalyzer()
+    follower = LogFollower(filename, analyzer, from_end=from_end)
+    next_snapshot = time.monotonic()
+    
+    def take_snapshot():
+        analysis = analyzer.snapshot()
+        if snapshot_file:
+            save_json_report(analysis, snapshot_file)
+        if on_snapshot is not None:
+            on_snapshot(analysis)
+        return analysis
+    
+    try:
+        while True:
+            follower.poll()
+            if time.monotonic() >= next_snapshot:
+                take_snapshot()
+                next_snapshot = time.monotonic() + snapshot_interval
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+    
+    return take_snapshot()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# log_parallel.py
+# Multiprocess analysis of large firewall logs split into byte ranges
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Ranges smaller than this are not worth a separate task
+MIN_CHUNK_BYTES = 1 << 20
+
+
+def split_file(filename, chunks):
+    """
+    Splits a file into byte ranges that start and end on line boundaries.
+    
+    Parameters:
+    - filename: Log file
+    - chunks: Number of ranges wanted
+    
+    Returns: List of (start, end) byte offsets covering the whole file
+    """
+    size = os.path.getsize(filename)
+    chunks = max(1, min(chunks, size // MIN_CHUNK_BYTES or 1))
+    
+    offsets = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, chunks):
+            f.seek(size * i // chunks)
+            # Finish the line we landed in; the next range starts after it
+            f.readline()
+            position = f.tell()
+            if offsets[-1] < position < size:
+                offsets.append(position)
+    offsets.append(size)
+    
+    return list(zip(offsets, offsets[1:]))
+
+
+def empty_partial():
+    """
+    Returns an empty partial result (the identity for merge_partials).
+    """
+    return {
+        'total_entries': 0,
+        'allow_count': 0,
+        'deny_count': 0,
+        'denied_ips': set(),
+        'denied_ports': Counter(),
+        'first': None,
+        'last': None
+    }
+
+
+def analyze_range(filename, start, end):
+    """
+    Parses and aggregates one byte range of a log file.
+    
+    Parameters:
+    - filename: Log file
+    - start: First byte (at a line start)
+    - end: Byte after the last line of the range
+    
+    Returns: Partial result dictionary (see empty_partial)
+    """
+    partial = empty_partial()
+    allow_count = deny_count = total = 0
+    denied_ips = partial['denied_ips']
+    denied_ports = partial['denied_ports']
+    first = last = None
+    
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        for line in f:
+            remaining -= len(line)
+            parts = line.split()
+            if len(parts) >= 6:
+                total += 1
+                action = parts[2]
+                if action == b'ALLOW':
+                    allow_count += 1
+                elif action == b'DENY':
+                    deny_count += 1
+                    denied_ips.add(parts[3])
+                    denied_ports[int(parts[5])] += 1
+                
+                timestamp = parts[0] + b' ' + parts[1]
+                if first is None or timestamp < first:
+                    first = timestamp
+                if last is None or timestamp > last:
+                    last = timestamp
+            if remaining <= 0:
+                break
+    
+    partial['total_entries'] = total
+    partial['allow_count'] = allow_count
+    partial['deny_count'] = deny_count
+    # Decode once per distinct value rather than once per line
+    partial['denied_ips'] = {ip.decode() for ip in denied_ips}
+    partial['first'] = first.decode() if first else None
+    partial['last'] = last.decode() if last else None
+    return partial
+
+
+def merge_partials(a, b):
+    """
+    Merges partial result b into a and returns a.
+    
+    Counts add, IP sets union, port Counters add and the time range
+    takes the min/max, so partials can be merged in any order.
+    """
+    a['total_entries'] += b['total_entries']
+    a['allow_count'] += b['allow_count']
+    a['deny_count'] += b['deny_count']
+    a['denied_ips'] |= b['denied_ips']
+    a['denied_ports'].update(b['denied_ports'])
+    if b['first'] is not None and (a['first'] is None or b['first'] < a['first']):
+        a['first'] = b['first']
+    if b['last'] is not None and (a['last'] is None or b['last'] > a['last']):
+        a['last'] = b['last']
+    return a
+
+
+def finish_partial(partial):
+    """
+    Turns a merged partial into the dictionary analyze_logs returns.
+    
+    The time range uses the earliest and latest timestamps, which equals
+    analyze_logs' first/last line for a chronological log.
+    """
+    most_targeted_port = None
+    most_targeted_count = 0
+    if partial['denied_ports']:
+        most_targeted_port, most_targeted_count = partial['denied_ports'].most_common(1)[0]
+    
+    return {
+        'total_entries': partial['total_entries'],
+        'allow_count': partial['allow_count'],
+        'deny_count': partial['deny_count'],
+        'denied_source_ips': sorted(partial['denied_ips']),
+        'most_targeted_port': most_targeted_port,
+        'most_targeted_count': most_targeted_count,
+        'time_range': {
+            'first': partial['first'] or "N/A",
+            'last': partial['last'] or "N/A"
+        }
+    }
+
+
+def _analyze_range_args(args):
+    return analyze_range(*args)
+
+
+def analyze_logs_parallel(filename, workers=None):
+    """
+    Analyzes a log file across a process pool.
+    
+    The file is cut into line-aligned byte ranges (a few per worker to
+    even out the load), each range is aggregated in a worker process and
+    the partial results are merged.
+    
+    Parameters:
+    - filename: Log file
+    - workers: Number of processes (default: CPU count)
+    
+    Returns: Dictionary in the same shape as analyze_logs
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = split_file(filename, workers * 4)
+    
+    result = empty_partial()
+    if workers == 1 or len(ranges) == 1:
+        for start, end in ranges:
+            merge_partials(result, analyze_range(filename, start, end))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tasks = [(filename, start, end) for start, end in ranges]
+            for partial in pool.map(_analyze_range_args, tasks):
+                merge_partials(result, partial)
+    
+    return finish_partial(result)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# log_query.py
+# Indexed queries over firewall logs (by IP, port, action and time range)
+
+import argparse
+import calendar
+import json
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from log_cache import load_or_build_cache, cache_dir, _map_column, COLUMNS
+from log_fastpath import (int_to_ip, format_timestamp, ip_bytes_to_int,
+                          ACTION_CODES, ACTION_NAMES)
+
+INDEX_VERSION = 1
+
+# Columns that get a posting-list index
+INDEXED_COLUMNS = ('source_ip', 'dest_ip', 'port', 'action')
+
+
+def parse_time(text, end_of_day=False):
+    """
+    Converts "YYYY-MM-DD HH:MM:SS" (or just "YYYY-MM-DD") to epoch seconds.
+    
+    Parameters:
+    - text: Timestamp or date string
+    - end_of_day: For a date alone, return 23:59:59 of that day instead
+      of midnight (for inclusive end bounds)
+    """
+    if ' ' in text.strip():
+        return calendar.timegm(time.strptime(text.strip(), "%Y-%m-%d %H:%M:%S"))
+    midnight = calendar.timegm(time.strptime(text.strip(), "%Y-%m-%d"))
+    return midnight + 86399 if end_of_day else midnight
+
+
+def build_postings(column):
+    """
+    Builds a posting-list index for one column.
+    
+    Row ids are appended per value in a single pass, so every posting
+    list is already sorted. The lists are stored CSR-style: sorted keys,
+    offsets into one concatenated row-id array.
+    
+    Returns: (keys array, offsets array, rows array)
+    """
+    postings = {}
+    for row, value in enumerate(column):
+        rows = postings.get(value)
+        if rows is None:
+            rows = postings[value] = array('I')
+        rows.append(row)
+    
+    keys = array('I', sorted(postings))
+    offsets = array('Q', [0])
+    rows = array('I')
+    for key in keys:
+        rows.extend(postings[key])
+        offsets.append(len(rows))
+    return keys, offsets, rows
+
+
+class LogIndex:
+    """
+    Secondary indexes over a log's columnar cache.
+    
+    - one posting list (sorted row ids) per source IP, dest IP, port and
+      action, persisted next to the column cache and memory-mapped
+    - the time index is the timestamp column itself when the log is in
+      chronological order (binary search), otherwise a sorted copy plus
+      the matching row ids
+    
+    A query starts from its most selective posting list, narrows it to
+    the time range with bisect and checks the remaining conditions
+    against the columns, so the cost follows the size of the answer
+    rather than the size of the log.
+    """
+    
+    def __init__(self, logfile):
+        self.logfile = logfile
+        self.columns = load_or_build_cache(logfile)
+        self.directory = cache_dir(logfile)
+        self.postings = {}
+        self._load_or_build_indexes()
+    
+    def _index_path(self, name, part):
+        return os.path.join(self.directory, f"idx_{name}.{part}")
+    
+    def _load_or_build_indexes(self):
+        meta_path = os.path.join(self.directory, 'index.json')
+        with open(os.path.join(self.directory, 'meta.json'), 'r') as f:
+            log_key = json.load(f)['log']
+        
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        if meta is None or meta.get('version') != INDEX_VERSION or meta.get('log') != log_key:
+            meta = self._build_indexes(meta_path, log_key)
+        
+        for name in INDEXED_COLUMNS:
+            self.postings[name] = tuple(
+                _map_column(self._index_path(name, part), code)
+                for part, code in (('keys', 'I'), ('offsets', 'Q'), ('rows', 'I')))
+        
+        self.time_sorted = meta['time_sorted']
+        if self.time_sorted:
+            self.time_values = self.columns.timestamp
+            self.time_rows = None
+        else:
+            self.time_values = _map_column(self._index_path('time', 'values'), 'I')
+            self.time_rows = _map_column(self._index_path('time', 'rows'), 'I')
+    
+    def _build_indexes(self, meta_path, log_key):
+        """
+        Writes every index file, then index.json last.
+        """
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        
+        for name in INDEXED_COLUMNS:
+            for part, values in zip(('keys', 'offsets', 'rows'),
+                                    build_postings(getattr(self.columns, name))):
+                with open(self._index_path(name, part), 'wb') as f:
+                    values.tofile(f)
+        
+        timestamps = self.columns.timestamp
+        time_sorted = all(timestamps[i] <= timestamps[i + 1]
+                          for i in range(self.columns.rows - 1))
+        if not time_sorted:
+            order = sorted(range(self.columns.rows), key=timestamps.__getitem__)
+            with open(self._index_path('time', 'values'), 'wb') as f:
+                array('I', (timestamps[row] for row in order)).tofile(f)
+            with open(self._index_path('time', 'rows'), 'wb') as f:
+                array('I', order).tofile(f)
+        
+        meta = {'version': INDEX_VERSION, 'log': log_key, 'time_sorted': time_sorted}
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        return meta
+    
+    def posting(self, name, value):
+        """
+        Returns the sorted row ids for one column value (zero-copy view).
+        """
+        keys, offsets, rows = self.postings[name]
+        i = bisect_left(keys, value)
+        if i == len(keys) or keys[i] != value:
+            return rows[0:0]
+        return rows[offsets[i]:offsets[i + 1]]
+    
+    def row_ids(self, source_ip=None, dest_ip=None, port=None, action=None,
+                start=None, end=None):
+        """
+        Finds the rows matching every given condition.
+        
+        Parameters:
+        - source_ip / dest_ip: Dotted IP strings
+        - port: Port number
+        - action: "ALLOW" or "DENY"
+        - start / end: Epoch seconds, inclusive
+        
+        Returns: Generator of row ids in log order
+        """
+        conditions = {}
+        if source_ip is not None:
+            conditions['source_ip'] = ip_bytes_to_int(source_ip.encode())
+        if dest_ip is not None:
+            conditions['dest_ip'] = ip_bytes_to_int(dest_ip.encode())
+        if port is not None:
+            conditions['port'] = int(port)
+        if action is not None:
+            conditions['action'] = ACTION_CODES.get(action.upper().encode(), -1)
+        if None in conditions.values():
+            return iter(())
+        
+        # Row range of the time filter in the time index
+        lo, hi = 0, len(self.time_values)
+        if start is not None:
+            lo = bisect_left(self.time_values, start)
+        if end is not None:
+            hi = bisect_right(self.time_values, end)
+        
+        if not conditions:
+            if self.time_rows is None:
+                return iter(range(lo, hi))
+            return iter(sorted(self.time_rows[lo:hi]))
+        
+        # Start from the shortest posting list
+        lists = {name: self.posting(name, value) for name, value in conditions.items()}
+        driver = min(lists, key=lambda name: len(lists[name]))
+        candidates = lists[driver]
+        if self.time_rows is None and (start is not None or end is not None):
+            # Posting lists are sorted row ids and rows are in time order
+            candidates = candidates[bisect_left(candidates, lo):bisect_left(candidates, hi)]
+            start = end = None
+        
+        checks = [(getattr(self.columns, name), value)
+                  for name, value in conditions.items() if name != driver]
+        timestamps = self.columns.timestamp
+        
+        def matches():
+            for row in candidates:
+                if start is not None and timestamps[row] < start:
+                    continue
+                if end is not None and timestamps[row] > end:
+                    continue
+                if all(column[row] == value for column, value in checks):
+                    yield row
+        return matches()
+    
+    def entry(self, row):
+        """
+        Returns one row as a log-format dictionary.
+        """
+        timestamp = format_timestamp(self.columns.timestamp[row])
+        return {
+            'timestamp': timestamp,
+            'action': ACTION_NAMES[self.columns.action[row]],
+            'source_ip': int_to_ip(self.columns.source_ip[row]),
+            'dest_ip': int_to_ip(self.columns.dest_ip[row]),
+            'port': self.columns.port[row]
+        }
+    
+    def query(self, limit=None, **conditions):
+        """
+        Runs a query and returns matching entries (see row_ids for the
+        conditions; start/end may also be timestamp strings, and a date
+        alone as end covers that whole day).
+        """
+        for key in ('start', 'end'):
+            if isinstance(conditions.get(key), str):
+                conditions[key] = parse_time(conditions[key], end_of_day=(key == 'end'))
+        results = []
+        for row in self.row_ids(**conditions):
+            results.append(self.entry(row))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a firewall log through its indexes")
+    parser.add_argument("logfile", nargs="?", default="firewall.log")
+    parser.add_argument("--src", help="Source IP")
+    parser.add_argument("--dst", help="Destination IP")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--action", type=str.upper, choices=["ALLOW", "DENY"])
+    parser.add_argument("--start", help='From "YYYY-MM-DD[ HH:MM:SS]" (inclusive)')
+    parser.add_argument("--end",
+                        help='Until "YYYY-MM-DD[ HH:MM:SS]" (inclusive; a date alone '
+                             'covers the whole day)')
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    
+    index = LogIndex(args.logfile)
+    started = time.perf_counter()
+    results = index.query(source_ip=args.src, dest_ip=args.dst, port=args.port,
+                          action=args.action, start=args.start, end=args.end,
+                          limit=args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    
+    for entry in results:
+        print(f"{entry['timestamp']} {entry['action']} {entry['source_ip']} "
+              f"{entry['dest_ip']} {entry['port']}")
+    print(f"\n✓ {len(results)} matching entries in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# log_sketches.py
+# Fixed-memory probabilistic sketches for denied-traffic statistics
+
+import hashlib
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+MASK64 = (1 << 64) - 1
+
+
+def hash64(item):
+    """
+    Stable 64-bit hash (the same in every process, unlike hash()).
+    
+    Integers go through the splitmix64 finalizer; anything else is
+    hashed as text with BLAKE2b.
+    """
+    if isinstance(item, int):
+        z = (item + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+    return int.from_bytes(hashlib.blake2b(str(item).encode(), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (Flajolet et al., with the usual
+    linear-counting correction for small cardinalities).
+    
+    Uses 2^precision one-byte registers: 16 KB at the default precision
+    of 14. The relative standard error is about 1.04 / sqrt(2^precision),
+    i.e. ~0.8% at precision 14 (within ~2.4% for 99.7% of estimates).
+    Two sketches with the same precision merge by taking register maxima.
+    """
+    
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+    
+    def add(self, item):
+        h = hash64(item)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        # Position of the first 1 bit in the remaining bits
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+    
+    def estimate(self):
+        """
+        Returns: Estimated number of distinct items added
+        """
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+    
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.size)
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch (Cormode & Muthukrishnan) for item frequencies.
+    
+    width = ceil(e / epsilon) and depth = ceil(ln(1 / delta)). An
+    estimate is never below the true count and, with probability at
+    least 1 - delta, at most epsilon * total above it. The defaults
+    (epsilon 0.001, delta 0.01) use 2719 x 5 counters (~109 KB).
+    Sketches with the same shape merge by adding counters.
+    """
+    
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.counters = array('Q', bytes(8 * self.width * self.depth))
+        self.total = 0
+    
+    def _cells(self, item):
+        # Double hashing: row i uses h1 + i * h2
+        h = hash64(item)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+    
+    def add(self, item, count=1):
+        """
+        Counts an item and returns its new estimate.
+        """
+        self.total += count
+        counters = self.counters
+        estimate = None
+        for cell in self._cells(item):
+            counters[cell] += count
+            if estimate is None or counters[cell] < estimate:
+                estimate = counters[cell]
+        return estimate
+    
+    def estimate(self, item):
+        counters = self.counters
+        return min(counters[cell] for cell in self._cells(item))
+    
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different shapes")
+        self.counters = array('Q', map(sum, zip(self.counters, other.counters)))
+        self.total += other.total
+        return self
+    
+    @property
+    def error_bound(self):
+        """
+        Maximum overestimate (with probability 1 - delta).
+        """
+        return math.ceil(self.epsilon * self.total)
+
+
+class HeavyHitters:
+    """
+    Top-K items by Count-Min estimate.
+    
+    The sketch counts everything; a small candidate table keeps the K
+    items with the highest estimates seen so far. Merging adds the
+    sketches and re-ranks the union of both candidate tables.
+    """
+    
+    def __init__(self, k=10, epsilon=0.001, delta=0.01):
+        self.k = k
+        self.sketch = CountMinSketch(epsilon, delta)
+        self.candidates = {}
+        self.floor_item = None
+    
+    def add(self, item, count=1):
+        estimate = self.sketch.add(item, count)
+        candidates = self.candidates
+        if item in candidates or len(candidates) < self.k:
+            candidates[item] = estimate
+            if self.floor_item is None or len(candidates) == self.k:
+                self.floor_item = min(candidates, key=candidates.get)
+        elif estimate > candidates[self.floor_item]:
+            del candidates[self.floor_item]
+            candidates[item] = estimate
+            self.floor_item = min(candidates, key=candidates.get)
+    
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        items = set(self.candidates) | set(other.candidates)
+        ranked = sorted(items, key=self.sketch.estimate, reverse=True)[:self.k]
+        self.candidates = {item: self.sketch.estimate(item) for item in ranked}
+        self.floor_item = min(self.candidates, key=self.candidates.get) if ranked else None
+        return self
+    
+    def top(self, n=None):
+        """
+        Returns: List of (item, estimated count), largest first
+        """
+        ranked = sorted(self.candidates.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:n or self.k]
+
+
+class ApproxDenyStats:
+    """
+    Fixed-memory replacement for analyze_logs' exact denied-IP set and
+    denied-port Counter (~16 KB HLL + 2 x ~109 KB Count-Min by default).
+    Exact ALLOW/DENY counts and the time range are kept as well.
+    Instances built on different shards can be merged.
+    """
+    
+    def __init__(self, top_k=10, precision=14, epsilon=0.001, delta=0.01):
+        self.total_entries = 0
+        self.allow_count = 0
+        self.deny_count = 0
+        self.first = None
+        self.last = None
+        self.sources = HyperLogLog(precision)
+        self.top_sources = HeavyHitters(top_k, epsilon, delta)
+        self.top_ports = HeavyHitters(top_k, epsilon, delta)
+    
+    def add(self, timestamp, action, source_ip, port):
+        self.total_entries += 1
+        if action == 'ALLOW':
+            self.allow_count += 1
+        elif action == 'DENY':
+            self.deny_count += 1
+            self.sources.add(source_ip)
+            self.top_sources.add(source_ip)
+            self.top_ports.add(port)
+        if self.first is None or timestamp < self.first:
+            self.first = timestamp
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+    
+    def merge(self, other):
+        self.total_entries += other.total_entries
+        self.allow_count += other.allow_count
+        self.deny_count += other.deny_count
+        self.sources.merge(other.sources)
+        self.top_sources.merge(other.top_sources)
+        self.top_ports.merge(other.top_ports)
+        if other.first is not None and (self.first is None or other.first < self.first):
+            self.first = other.first
+        if other.last is not None and (self.last is None or other.last > self.last):
+            self.last = other.last
+        return self
+    
+    def result(self):
+        """
+        Returns: analyze_logs-style dictionary with estimates
+        ('denied_source_ips' lists only the heavy hitters)
+        """
+        top_ports = self.top_ports.top()
+        most_targeted_port, most_targeted_count = top_ports[0] if top_ports else (None, 0)
+        return {
+            'approximate': True,
+            'total_entries': self.total_entries,
+            'allow_count': self.allow_count,
+            'deny_count': self.deny_count,
+            'unique_denied_sources': self.sources.estimate(),
+            'denied_source_ips': [ip for ip, _ in self.top_sources.top()],
+            'top_denied_sources': self.top_sources.top(),
+            'top_denied_ports': top_ports,
+            'most_targeted_port': most_targeted_port,
+            'most_targeted_count': most_targeted_count,
+            'error_bounds': {
+                'unique_denied_sources_relative': round(self.sources.relative_error, 4),
+                'count_overestimate_max': self.top_ports.sketch.error_bound,
+                'count_confidence': 1 - self.top_ports.sketch.delta
+            },
+            'time_range': {
+                'first': self.first or "N/A",
+                'last': self.last or "N/A"
+            }
+        }
+
+
+def analyze_logs_approx(log_entries, top_k=10):
+    """
+    Single-pass approximate analysis in fixed memory.
+    
+    Parameters:
+    - log_entries: Iterable of LogEntry (e.g. iter_log_entries)
+    - top_k: Number of top sources/ports to report
+    
+    Returns: Dictionary from ApproxDenyStats.result()
+    """
+    stats = ApproxDenyStats(top_k)
+    for entry in log_entries:
+        stats.add(f"{entry.date} {entry.time}", entry.action, entry.source_ip, entry.port)
+    return stats.result()
+
+
+def analyze_range_approx(filename, start, end, top_k=10):
+    """
+    Sketches one line-aligned byte range of a log file.
+    
+    Returns: ApproxDenyStats for the range (merge with the others)
+    """
+    stats = ApproxDenyStats(top_k)
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        for line in f:
+            remaining -= len(line)
+            parts = line.decode().split()
+            if len(parts) >= 6:
+                port = int(parts[5]) if parts[2] == 'DENY' else None
+                stats.add(f"{parts[0]} {parts[1]}", parts[2], parts[3], port)
+            if remaining <= 0:
+                break
+    return stats
+
+
+def _analyze_range_approx_args(args):
+    return analyze_range_approx(*args)
+
+
+def analyze_logs_approx_parallel(filename, workers=None, top_k=10):
+    """
+    Approximate analysis across a process pool.
+    
+    Each byte range (see log_parallel.split_file) builds its own
+    sketches; merging them gives the same estimates as one pass over
+    the whole file.
+    
+    Returns: Dictionary from ApproxDenyStats.result()
+    """
+    from log_parallel import split_file
+    
+    workers = workers or os.cpu_count() or 1
+    ranges = split_file(filename, workers * 4)
+    tasks = [(filename, start, end, top_k) for start, end in ranges]
+    
+    result = ApproxDenyStats(top_k)
+    if workers == 1 or len(ranges) == 1:
+        for task in tasks:
+            result.merge(analyze_range_approx(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for stats in pool.map(_analyze_range_approx_args, tasks):
+                result.merge(stats)
+    return result.result()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# log_windows.py
+# Time-windowed firewall log statistics with bounded memory
+
+import heapq
+import json
+import math
+from collections import OrderedDict, deque
+from datetime import datetime
+
+# Timestamp prefix lengths for "YYYY-MM-DD HH:MM" and "YYYY-MM-DD HH"
+MINUTE = 16
+HOUR = 13
+
+# Bucket key format and length in seconds for each prefix length
+WINDOW_FORMATS = {
+    MINUTE: ('%Y-%m-%d %H:%M', 60),
+    HOUR: ('%Y-%m-%d %H', 3600),
+    10: ('%Y-%m-%d', 86400)
+}
+
+
+class SpaceSaving:
+    """
+    Space-saving heavy hitters sketch (Metwally et al.).
+    
+    Tracks at most `capacity` items. When a new item arrives and the
+    table is full, it replaces the item with the smallest count and
+    inherits that count as its possible overestimate (error). Any item
+    whose true count is above total / capacity is guaranteed to be
+    present, and each reported count is at most `error` too high.
+    
+    The minimum is found with a heap holding one (count, order, item)
+    entry per tracked item. Counts only grow, so an entry may be stale
+    (too low); it is refreshed when it reaches the top, which keeps
+    eviction at O(log capacity) amortized instead of a scan.
+    """
+    
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []
+        self._order = 0
+    
+    def _push(self, item, count):
+        # The order number breaks ties, so items are never compared
+        self._order += 1
+        heapq.heappush(self._heap, (count, self._order, item))
+    
+    def add(self, item, count=1):
+        """
+        Counts `count` occurrences of an item.
+        """
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            self._push(item, count)
+            return
+        # Evict the current minimum, refreshing stale entries on the way
+        heap = self._heap
+        while True:
+            floor, _, victim = heap[0]
+            current = counts[victim]
+            if current == floor:
+                break
+            heapq.heapreplace(heap, (current, heap[0][1], victim))
+        heapq.heappop(heap)
+        del counts[victim]
+        del self.errors[victim]
+        counts[item] = floor + count
+        self.errors[item] = floor
+        self._push(item, floor + count)
+    
+    def merge(self, other):
+        """
+        Adds another sketch's counts into this one (results stay within
+        the combined error bounds).
+        """
+        for item, count in other.counts.items():
+            self.add(item, count)
+            self.errors[item] += other.errors[item]
+        return self
+    
+    def top(self, n=10):
+        """
+        Returns: List of (item, estimated count) pairs, largest first
+        """
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+class WindowedCounter:
+    """
+    Fixed-size time buckets (per minute, per hour...) in a ring buffer.
+    
+    Each bucket keeps ALLOW/DENY counts plus space-saving sketches of
+    denied source IPs and ports. Only the newest `retention` buckets are
+    held; older buckets are closed, summarized and handed to `on_close`
+    (e.g. to stream them to disk), so memory stays flat over months.
+    
+    Burst detection keeps an exponentially weighted mean and variance of
+    DENY counts per bucket. A closed bucket is a burst when its DENY count
+    is at least `burst_min` and more than `burst_sigma` standard
+    deviations above the mean of the buckets before it. Windows with no
+    entries at all count as buckets with zero DENYs, so quiet periods
+    lower the baseline instead of being ignored.
+    """
+    
+    def __init__(self, key_length, retention=60, top_k=10, sketch_size=100,
+                 burst_sigma=3.0, burst_min=20, alpha=0.1, on_close=None):
+        self.key_length = key_length
+        self.retention = retention
+        self.top_k = top_k
+        self.sketch_size = sketch_size
+        self.burst_sigma = burst_sigma
+        self.burst_min = burst_min
+        self.alpha = alpha
+        self.on_close = on_close
+        self.buckets = OrderedDict()
+        self.late_entries = 0
+        self.mean = None
+        self.variance = 0.0
+        self.last_window = None
+        self.bursts = deque(maxlen=100)
+    
+    def add(self, timestamp, action, source_ip, port):
+        """
+        Adds one entry.
+        
+        Parameters:
+        - timestamp: "YYYY-MM-DD HH:MM:SS" string
+        - action: "ALLOW" or "DENY"
+        - source_ip: Source IP string
+        - port: Destination port
+        """
+        # The bucket key is a timestamp prefix, e.g. "2024-12-01 08:15"
+        key = timestamp[:self.key_length]
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if self.buckets and key < next(reversed(self.buckets)):
+                # Out-of-order entry for a bucket that is closed or was
+                # skipped; logs are chronological, so just count it
+                self.late_entries += 1
+                return
+            bucket = self.buckets[key] = {
+                'window': key,
+                'allow': 0,
+                'deny': 0,
+                'sources': SpaceSaving(self.sketch_size),
+                'ports': SpaceSaving(self.sketch_size)
+            }
+            if len(self.buckets) > self.retention:
+                self._close(self.buckets.popitem(last=False)[1])
+        
+        if action == 'ALLOW':
+            bucket['allow'] += 1
+        elif action == 'DENY':
+            bucket['deny'] += 1
+            bucket['sources'].add(source_ip)
+            bucket['ports'].add(port)
+    
+    def _summary(self, bucket):
+        return {
+            'window': bucket['window'],
+            'allow': bucket['allow'],
+            'deny': bucket['deny'],
+            'top_sources': bucket['sources'].top(self.top_k),
+            'top_ports': bucket['ports'].top(self.top_k)
+        }
+    
+    def _window_number(self, key):
+        """
+        Returns: Number of the window a bucket key names (consecutive
+        windows have consecutive numbers), or None if it cannot be parsed
+        """
+        key_format, seconds = WINDOW_FORMATS.get(self.key_length, (None, None))
+        if key_format is None:
+            return None
+        try:
+            started = datetime.strptime(key, key_format)
+        except ValueError:
+            return None
+        return int((started - datetime(1970, 1, 1)).total_seconds()) // seconds
+    
+    def _skip_empty(self, window):
+        """
+        Feeds a zero DENY count into the baseline for every window with no
+        entries between the last closed bucket and this one.
+        """
+        last, self.last_window = self.last_window, self._window_number(window)
+        if self.mean is None or last is None or self.last_window is None:
+            return
+        # Each zero shrinks the mean and variance by about 1 - alpha, so a
+        # few thousand windows decay them to nothing and longer gaps stop
+        empty = self.last_window - last - 1
+        for _ in range(min(max(0, empty), 10_000)):
+            increment = -self.alpha * self.mean
+            self.variance = (1 - self.alpha) * (self.variance - self.mean * increment)
+            self.mean += increment
+    
+    def _close(self, bucket):
+        """
+        Finalizes an evicted bucket: burst check, then on_close.
+        """
+        summary = self._summary(bucket)
+        deny = bucket['deny']
+        self._skip_empty(bucket['window'])
+        
+        if self.mean is not None:
+            std = math.sqrt(self.variance)
+            if deny >= self.burst_min and deny > self.mean + self.burst_sigma * std:
+                summary['burst'] = True
+                self.bursts.append({
+                    'window': bucket['window'],
+                    'deny': deny,
+                    'expected': round(self.mean, 1),
+                    'top_sources': summary['top_sources'][:3]
+                })
+            # Exponentially weighted mean/variance (West's update)
+            diff = deny - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.variance = (1 - self.alpha) * (self.variance + diff * increment)
+        else:
+            self.mean = float(deny)
+        
+        if self.on_close is not None:
+            self.on_close(summary)
+    
+    def close_all(self):
+        """
+        Closes every open bucket (call at the end of the input).
+        """
+        while self.buckets:
+            self._close(self.buckets.popitem(last=False)[1])
+    
+    def recent(self):
+        """
+        Returns summaries of the buckets still held in the ring.
+        """
+        return [self._summary(bucket) for bucket in self.buckets.values()]
+
+
+def analyze_time_windows(log_entries, retention_minutes=120, retention_hours=48,
+                         top_k=10, on_close=None):
+    """
+    Builds per-minute and per-hour statistics in one streaming pass.
+    
+    Parameters:
+    - log_entries: Iterable of LogEntry (e.g. iter_log_entries)
+    - retention_minutes: Minute buckets kept in memory
+    - retention_hours: Hour buckets kept in memory
+    - top_k: Top source IPs/ports reported per bucket
+    - on_close: Optional callback(granularity, summary) for every bucket
+      as it is closed, e.g. to stream them to an NDJSON file
+    
+    Returns: Dictionary with 'per_minute', 'per_hour' and 'bursts'
+    (per-minute and per-hour burst windows)
+    """
+    per_minute = []
+    per_hour = []
+    
+    def closer(granularity, kept):
+        def close(summary):
+            kept.append(summary)
+            if on_close is not None:
+                on_close(granularity, summary)
+        return close
+    
+    # Closed buckets are kept only as long as the ring would have held them
+    minutes = WindowedCounter(MINUTE, retention_minutes, top_k,
+                              on_close=closer('minute', per_minute))
+    hours = WindowedCounter(HOUR, retention_hours, top_k, burst_min=100,
+                            on_close=closer('hour', per_hour))
+    
+    for entry in log_entries:
+        timestamp = f"{entry.date} {entry.time}"
+        minutes.add(timestamp, entry.action, entry.source_ip, entry.port)
+        hours.add(timestamp, entry.action, entry.source_ip, entry.port)
+        if len(per_minute) > retention_minutes:
+            del per_minute[:-retention_minutes]
+        if len(per_hour) > retention_hours:
+            del per_hour[:-retention_hours]
+    
+    minutes.close_all()
+    hours.close_all()
+    
+    return {
+        'per_minute': per_minute[-retention_minutes:],
+        'per_hour': per_hour[-retention_hours:],
+        'bursts': {
+            'minute': list(minutes.bursts),
+            'hour': list(hours.bursts)
+        },
+        'late_entries': minutes.late_entries + hours.late_entries
+    }
+
+
+def ndjson_bucket_writer(f):
+    """
+    Returns an on_close callback that streams buckets as NDJSON lines.
+    """
+    def write(granularity, summary):
+        f.write(json.dumps({'granularity': granularity, **summary},
+                           separators=(',', ':')) + '\n')
+    return write
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# checkpoint.py
+# Checkpoint journal so interrupted sweeps can resume where they stopped
+
+import json
+import os
+import struct
+import time
+
+from targets import ip_to_int
+
+JOURNAL_MAGIC = b"SCANCKPT1\n"
+
+# One record = 32-bit host + 16-bit port. Port 0 never gets probed, so
+# it marks "every port on this host is done".
+RECORD = struct.Struct("!IH")
+HOST_DONE = 0
+
+# Buffered records are written out when either limit is reached
+FLUSH_RECORDS = 4096
+FLUSH_SECONDS = 1.0
+
+
+class ScanCheckpoint:
+    """
+    Append-only journal of completed (host, port) probes.
+    
+    During a scan every finished probe adds a 6-byte record to an
+    in-memory buffer, which is appended to the file in batches, so the
+    probe loop only pays for a struct.pack. When a host finishes, one
+    host-done record replaces all of its port records.
+    
+    Set `before_flush` to the report writer's flush so findings always
+    reach the report before the probes that produced them are journaled;
+    otherwise a crash could leave ports marked done whose findings were
+    still buffered, and resume would skip them.
+    
+    On resume the journal is replayed into a set of finished hosts plus
+    a 65536-bit bitmap per partly scanned host, then rewritten in that
+    compact form before the scan continues.
+    """
+    
+    def __init__(self, filename, targets, ports, resume=False):
+        self.filename = filename
+        self.spec = {'targets': targets, 'ports': ports}
+        self.done_hosts = set()
+        self.partial = {}
+        self.buffer = bytearray()
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        self.before_flush = None
+        
+        if resume and os.path.exists(filename):
+            self._load()
+        
+        self._rewrite()
+        self.file = open(filename, 'ab')
+    
+    def _load(self):
+        """
+        Replays an existing journal into done_hosts and partial bitmaps.
+        
+        Raises: ValueError if the journal belongs to a different scan
+        """
+        with open(self.filename, 'rb') as f:
+            if f.readline() != JOURNAL_MAGIC:
+                raise ValueError(f"{self.filename} is not a scan checkpoint")
+            spec = json.loads(f.readline() or b'{}')
+            if spec != self.spec:
+                raise ValueError(f"{self.filename} was written for a different scan: "
+                                 f"targets {spec.get('targets')}, ports {spec.get('ports')}")
+            data = f.read()
+        
+        # Ignore a half-written record at the end
+        usable = len(data) - len(data) % RECORD.size
+        for host, port in RECORD.iter_unpack(data[:usable]):
+            if host in self.done_hosts:
+                continue
+            if port == HOST_DONE:
+                self.done_hosts.add(host)
+                self.partial.pop(host, None)
+                continue
+            bitmap = self.partial.get(host)
+            if bitmap is None:
+                bitmap = self.partial[host] = bytearray(8192)
+            bitmap[port >> 3] |= 1 << (port & 7)
+    
+    def _rewrite(self):
+        """
+        Writes the header and the compacted state to a fresh journal.
+        """
+        tmp_name = self.filename + ".tmp"
+        with open(tmp_name, 'wb') as f:
+            f.write(JOURNAL_MAGIC)
+            f.write(json.dumps(self.spec).encode() + b'\n')
+            f.write(b''.join(RECORD.pack(host, HOST_DONE) for host in self.done_hosts))
+            for host, bitmap in self.partial.items():
+                f.write(b''.join(RECORD.pack(host, port)
+                                 for port in range(1, 65536)
+                                 if bitmap[port >> 3] & (1 << (port & 7))))
+        os.replace(tmp_name, self.filename)
+    
+    def is_host_done(self, ip):
+        """
+        Returns True if every port on the host finished in an earlier run.
+        """
+        return ip_to_int(ip) in self.done_hosts
+    
+    def is_port_done(self, ip, port):
+        """
+        Returns True if this probe finished in an earlier run.
+        """
+        bitmap = self.partial.get(ip_to_int(ip))
+        return bitmap is not None and bool(bitmap[port >> 3] & (1 << (port & 7)))
+    
+    def mark_port(self, ip, port):
+        """
+        Records one finished probe.
+        """
+        self.buffer += RECORD.pack(ip_to_int(ip), port)
+        self._maybe_flush()
+    
+    def mark_host(self, ip):
+        """
+        Records that every port on a host is finished.
+        """
+        host = ip_to_int(ip)
+        self.buffer += RECORD.pack(host, HOST_DONE)
+        # Resumed bitmaps are no longer needed once the host is done
+        self.partial.pop(host, None)
+        self._maybe_flush()
+    
+    def _maybe_flush(self):
+        self.buffered += 1
+        if (self.buffered >= FLUSH_RECORDS
+                or time.monotonic() - self.last_flush >= FLUSH_SECONDS):
+            self.flush()
+    
+    def flush(self):
+        """
+        Appends buffered records to the journal file.
+        """
+        if self.buffer:
+            if self.before_flush is not None:
+                self.before_flush()
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer.clear()
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+    
+    def close(self, completed=False):
+        """
+        Flushes and closes the journal.
+        
+        Parameters:
+        - completed: True when the whole scan finished; the journal is
+          then deleted because there is nothing left to resume
+        """
+        self.flush()
+        self.file.close()
+        if completed:
+            os.remove(self.filename)
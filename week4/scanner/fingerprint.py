@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# fingerprint.py
+# Banner grabbing and service fingerprinting for open ports
+
+import asyncio
+import re
+
+# How much of a banner is read and matched
+BANNER_BYTES = 512
+
+# Sent when a service waits for the client to speak first (e.g. HTTP)
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+
+# Fingerprint database: (product, regex). A named group "version" in
+# the regex captures the version string. Earlier entries win ties.
+FINGERPRINTS = [
+    ("OpenSSH", r"^SSH-[\d.]+-OpenSSH[_-](?P<version>[\w.]+)"),
+    ("Dropbear SSH", r"^SSH-[\d.]+-dropbear[_-]?(?P<version>[\w.]*)"),
+    ("SSH", r"^SSH-(?P<version>[\d.]+)-"),
+    ("vsftpd", r"^220[- ].*vsFTPd (?P<version>[\d.]+)"),
+    ("ProFTPD", r"^220[- ].*ProFTPD (?P<version>[\d.]+)"),
+    ("Pure-FTPd", r"^220[- ].*Pure-FTPd"),
+    ("FTP", r"^220[- ].*FTP"),
+    ("Postfix", r"^220[- ].*ESMTP Postfix"),
+    ("Exim", r"^220[- ].*Exim (?P<version>[\d.]+)"),
+    ("SMTP", r"^220[- ].*E?SMTP"),
+    ("Dovecot", r"^\+OK.*Dovecot"),
+    ("POP3", r"^\+OK"),
+    ("IMAP", r"^\* OK.*IMAP"),
+    ("MySQL", r"^.{4}\n(?P<version>[\d.]+[\w.-]*)\x00"),
+    ("Redis", r"^-(?:ERR|NOAUTH)|^\$\d+\r\n# Server\r\nredis_version:(?P<version>[\d.]+)"),
+    ("nginx", r"^HTTP/[\d.]+ .*?\r\nServer: nginx/?(?P<version>[\d.]*)"),
+    ("Apache httpd", r"^HTTP/[\d.]+ .*?\r\nServer: Apache/?(?P<version>[\d.]*)"),
+    ("Microsoft IIS", r"^HTTP/[\d.]+ .*?\r\nServer: Microsoft-IIS/(?P<version>[\d.]+)"),
+    ("Python http.server", r"^HTTP/[\d.]+ .*?\r\nServer: SimpleHTTP/[\d.]+ Python/(?P<version>[\d.]+)"),
+    ("HTTP", r"^HTTP/(?P<version>[\d.]+) \d{3}"),
+]
+
+
+def compile_fingerprints(fingerprints):
+    """
+    Combines every fingerprint regex into one alternation.
+    
+    Each pattern becomes a named group fp<i> (with its version group
+    renamed v<i>), so a single regex pass finds the first matching
+    fingerprint instead of trying each regex in turn.
+    
+    Parameters:
+    - fingerprints: List of (product, regex) tuples
+    
+    Returns: (compiled regex, list of products indexed by position)
+    """
+    parts = []
+    products = []
+    for i, (product, pattern) in enumerate(fingerprints):
+        pattern = pattern.replace('(?P<version>', f'(?P<v{i}>')
+        parts.append(f'(?P<fp{i}>{pattern})')
+        products.append(product)
+    return re.compile('|'.join(parts), re.DOTALL | re.IGNORECASE), products
+
+
+FINGERPRINT_REGEX, FINGERPRINT_PRODUCTS = compile_fingerprints(FINGERPRINTS)
+
+
+def match_banner(banner):
+    """
+    Matches a banner against the compiled fingerprint database.
+    
+    Parameters:
+    - banner: Banner text
+    
+    Returns: Version string such as "OpenSSH 8.9p1", or None if no match
+    """
+    if not banner:
+        return None
+    match = FINGERPRINT_REGEX.match(banner)
+    if match is None:
+        return None
+    
+    # The outer fp<i> group is the last to close, so it is lastgroup
+    index = int(match.lastgroup[2:])
+    product = FINGERPRINT_PRODUCTS[index]
+    try:
+        version = match.group(f'v{index}')
+    except IndexError:
+        version = None
+    return f"{product} {version}" if version else product
+
+
+async def grab_banner(target_ip, port, timeout=2.0):
+    """
+    Connects to an open port and reads whatever the service sends.
+    
+    Services that speak first (SSH, FTP, SMTP...) answer straight away.
+    If nothing arrives in half the timeout an HTTP HEAD request is sent
+    and the rest of the timeout is spent waiting for a reply.
+    
+    Parameters:
+    - target_ip: IP address of the host
+    - port: Open port number
+    - timeout: Total seconds to spend on this port
+    
+    Returns: Banner text (latin-1 decoded), or "" if nothing was read
+    """
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(target_ip, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return ""
+    
+    data = b""
+    try:
+        try:
+            data = await asyncio.wait_for(reader.read(BANNER_BYTES), timeout / 2)
+        except asyncio.TimeoutError:
+            writer.write(HTTP_PROBE)
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(BANNER_BYTES), timeout / 2)
+    except (OSError, asyncio.TimeoutError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    
+    return data.decode('latin-1')
+
+
+async def fingerprint_port(target_ip, port, timeout=2.0):
+    """
+    Grabs a banner and matches it.
+    
+    Returns: Version string, or None if nothing matched
+    """
+    return match_banner(await grab_banner(target_ip, port, timeout))
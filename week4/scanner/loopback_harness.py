@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# loopback_harness.py
+# Opens local listeners on known ports so the probe engine can be
+# checked and benchmarked without touching the network
+
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import time
+
+from port_checker import scan_port_range, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT
+from main import scan_sweep
+from checkpoint import ScanCheckpoint
+from report_gen import NDJSONReportWriter, load_ndjson_report
+
+
+async def _handle_client(reader, writer):
+    """
+    Accepts a connection and closes it straight away.
+    """
+    writer.close()
+
+
+async def open_listeners(count, host="127.0.0.1"):
+    """
+    Starts TCP listeners on free loopback ports.
+    
+    Parameters:
+    - count: Number of listeners to start
+    - host: Address to bind
+    
+    Returns: (list of servers, sorted list of listening ports)
+    """
+    servers = []
+    ports = []
+    for _ in range(count):
+        # Port 0 lets the OS pick a free port, so the harness never collides
+        server = await asyncio.start_server(_handle_client, host, 0)
+        servers.append(server)
+        ports.append(server.sockets[0].getsockname()[1])
+    return servers, sorted(ports)
+
+
+async def run_harness(listener_count=5, start_port=1, end_port=65535,
+                      concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """
+    Scans the loopback interface while known listeners are up.
+    
+    Parameters:
+    - listener_count: Number of listeners to open
+    - start_port: First port to scan
+    - end_port: Last port to scan
+    - concurrency: Probe engine concurrency
+    - timeout: Probe engine per-port timeout
+    
+    Returns: Dictionary with expected ports, found ports, counts and timing
+    """
+    servers, expected = await open_listeners(listener_count)
+    found = []
+    
+    def record_result(port, status, version):
+        if status == "OPEN":
+            found.append(port)
+    
+    try:
+        started = time.perf_counter()
+        counts = await scan_port_range("127.0.0.1", range(start_port, end_port + 1),
+                                       concurrency=concurrency, timeout=timeout,
+                                       on_result=record_result)
+        elapsed = time.perf_counter() - started
+    finally:
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+    
+    return {
+        'expected': [p for p in expected if start_port <= p <= end_port],
+        'found': sorted(found),
+        'counts': counts,
+        'elapsed': elapsed
+    }
+
+
+def open_sockets(count, host="127.0.0.1"):
+    """
+    Opens plain listening sockets on free loopback ports.
+    
+    scan_sweep runs its own event loop, so its listeners cannot be
+    asyncio servers; the kernel completes the handshake without accept().
+    
+    Returns: (list of sockets, sorted list of listening ports)
+    """
+    sockets = []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((host, 0))
+        sock.listen(16)
+        sockets.append(sock)
+    return sockets, sorted(sock.getsockname()[1] for sock in sockets)
+
+
+def run_sweep_check(listener_count=5):
+    """
+    Sweeps the loopback interface with scan_sweep (no report writer) and
+    checks every listener ends up in the returned results.
+    
+    Parameters:
+    - listener_count: Number of listeners to open
+    
+    Returns: (sorted expected ports, [ports found sweeping the first
+    listener alone, ports found sweeping all of them])
+    """
+    sockets = []
+    try:
+        sockets, expected = open_sockets(listener_count)
+        # A host whose last probe finds an open port is the case where a
+        # finding recorded after the host retired used to be dropped, so
+        # sweep a single open port first, then all of them
+        found = []
+        for port_spec in (str(expected[0]), ",".join(str(port) for port in expected)):
+            sweep = scan_sweep("127.0.0.1", port_spec)
+            found.append(sorted(p['port'] for host in sweep['results']
+                                for p in host['open_ports']))
+    finally:
+        for sock in sockets:
+            sock.close()
+    
+    return expected, found
+
+
+class ScanStopped(Exception):
+    """
+    Raised by StoppingCheckpoint to stop a sweep part way.
+    """
+
+
+class StoppingCheckpoint(ScanCheckpoint):
+    """
+    Checkpoint that stops the scan when the first host completes.
+    
+    With stop_after=False the scan stops after the host's last result was
+    recorded but before its host-done record; with stop_after=True the
+    host-done record is flushed to disk first, as a kill right after it
+    would leave things.
+    """
+    
+    stop_after = False
+    
+    def mark_host(self, ip):
+        if self.stop_after:
+            super().mark_host(ip)
+            self.flush()
+        raise ScanStopped(ip)
+
+
+def run_checkpoint_check(listener_count=5):
+    """
+    Stops a checkpointed sweep at host completion, then checks the report
+    and journal agree and a resumed sweep still finds every listener.
+    
+    Parameters:
+    - listener_count: Number of listeners to open
+    
+    Returns: List of failure messages
+    """
+    failures = []
+    sockets = []
+    try:
+        sockets, expected = open_sockets(listener_count)
+        port_spec = ",".join(str(port) for port in expected)
+        for stop_after in (False, True):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                report = os.path.join(tmpdir, "sweep.ndjson")
+                journal = report + ".ckpt"
+                
+                checkpoint = StoppingCheckpoint(journal, "127.0.0.1", port_spec)
+                checkpoint.stop_after = stop_after
+                try:
+                    with NDJSONReportWriter(report) as writer:
+                        scan_sweep("127.0.0.1", port_spec, writer=writer,
+                                   checkpoint=checkpoint)
+                    failures.append(f"stop_after={stop_after}: the sweep was not stopped")
+                except ScanStopped:
+                    pass
+                finally:
+                    checkpoint.close()
+                
+                # Every probe the journal calls done must have its finding on disk
+                results, _ = load_ndjson_report(report)
+                reported = {p['port'] for r in results for p in r['open_ports']}
+                resumed = ScanCheckpoint(journal, "127.0.0.1", port_spec, resume=True)
+                host_done = resumed.is_host_done("127.0.0.1")
+                lost = [port for port in expected if port not in reported
+                        and (host_done or resumed.is_port_done("127.0.0.1", port))]
+                if lost:
+                    failures.append(f"stop_after={stop_after}: journaled as done "
+                                    f"but missing from the report: {lost}")
+                if host_done != stop_after:
+                    failures.append(f"stop_after={stop_after}: host done = {host_done}")
+                
+                try:
+                    with NDJSONReportWriter(report, append=True) as writer:
+                        scan_sweep("127.0.0.1", port_spec, writer=writer,
+                                   checkpoint=resumed)
+                finally:
+                    resumed.close()
+                results, _ = load_ndjson_report(report)
+                found = sorted(p['port'] for r in results for p in r['open_ports'])
+                if found != expected:
+                    failures.append(f"stop_after={stop_after}: resumed report has "
+                                    f"{found}, expected {expected}")
+    finally:
+        for sock in sockets:
+            sock.close()
+    return failures
+
+
+def main():
+    """
+    Runs the harness and prints a pass/fail line with timing.
+    """
+    parser = argparse.ArgumentParser(description="Loopback probe engine harness")
+    parser.add_argument("--listeners", type=int, default=5)
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--end", type=int, default=65535)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    args = parser.parse_args()
+    
+    result = asyncio.run(run_harness(args.listeners, args.start, args.end,
+                                     args.concurrency, args.timeout))
+    
+    scanned = sum(result['counts'].values())
+    rate = scanned / result['elapsed'] if result['elapsed'] else 0
+    print(f"Scanned {scanned} ports in {result['elapsed']:.2f}s ({rate:,.0f} ports/s)")
+    print(f"Counts: {result['counts']}")
+    print(f"Listeners: {result['expected']}")
+    
+    # Other local services may also be open, so only require our listeners
+    missing = set(result['expected']) - set(result['found'])
+    if missing:
+        print(f"❌ FAIL: listeners not detected: {sorted(missing)}")
+        raise SystemExit(1)
+    print("✅ PASS: all listeners detected as OPEN")
+    
+    expected, found = run_sweep_check(args.listeners)
+    if found != [expected[:1], expected]:
+        print(f"❌ FAIL: scan_sweep returned {found}, expected {[expected[:1], expected]}")
+        raise SystemExit(1)
+    print("✅ PASS: scan_sweep returned every listener in its results")
+    
+    failures = run_checkpoint_check(args.listeners)
+    for failure in failures:
+        print(f"❌ FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+    print("✅ PASS: a sweep stopped at host completion resumes without losing findings")
+
+
+if __name__ == "__main__":
+    main()
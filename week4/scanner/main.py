@@ -2,13 +2,43 @@
 # main.py
 # Main security scanner program - imports and uses all modules
 
+import argparse
+import asyncio
+
 # Import functions from our custom modules
 from utils import validate_ip, get_timestamp, format_banner
-from port_checker import check_port_status, is_privileged, get_port_info
-from report_gen import generate_json_report, generate_text_summary
+from port_checker import (scan_port_range, scan_work_queue, is_privileged,
+                          get_port_info, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT)
+from report_gen import (generate_json_report, generate_text_summary,
+                        NDJSONReportWriter, load_ndjson_report)
+from targets import iter_hosts, parse_port_spec, count_ports, WorkScheduler
+from rate_limit import ProbePacer, AdaptiveTimeout
+from checkpoint import ScanCheckpoint
+
+
+def make_pacer(rate=None, host_rate=None, adaptive=False, timeout=DEFAULT_TIMEOUT,
+               min_timeout=0.05):
+    """
+    Builds the probe pacer from scan options.
+    
+    Parameters:
+    - rate: Global probes-per-second budget (None/0 = unlimited)
+    - host_rate: Per-host probes-per-second budget (None/0 = unlimited)
+    - adaptive: Use RTT-based timeouts, with `timeout` as the ceiling
+    - timeout: Fixed (or maximum adaptive) per-port timeout
+    - min_timeout: Floor for adaptive timeouts
+    
+    Returns: ProbePacer, or None when no pacing is needed
+    """
+    if not rate and not host_rate and not adaptive:
+        return None
+    timeouts = AdaptiveTimeout(min_timeout, timeout) if adaptive else None
+    return ProbePacer(rate, host_rate, timeouts)
 
 
-def scan_ports(target_ip, start_port, end_port):
+def scan_ports(target_ip, start_port, end_port,
+               concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, pacer=None,
+               banner_timeout=None):
     """
     Scans a range of ports on target IP.
     
@@ -16,6 +46,10 @@ def scan_ports(target_ip, start_port, end_port):
     - target_ip: IP address to scan
     - start_port: First port in range
     - end_port: Last port in range
+    - concurrency: Maximum number of probes in flight
+    - timeout: Per-port timeout in seconds
+    - pacer: Optional ProbePacer (see make_pacer)
+    - banner_timeout: If set, fingerprint open ports to fill 'version'
     
     Returns: Scan results dictionary
     """
@@ -24,24 +58,32 @@ def scan_ports(target_ip, start_port, end_port):
     print()
     
     open_ports = []
-    total_scanned = 0
     
-    for port in range(start_port, end_port + 1):
-        total_scanned += 1
-        status = check_port_status(port)
-        
+    def record_result(port, status, version):
         if status == "OPEN":
-            port_data = {
+            service = get_port_info(port)
+            privileged = is_privileged(port)
+            open_ports.append({
                 'port': port,
                 'status': status,
-                'service': get_port_info(port),
-                'privileged': is_privileged(port)
-            }
-            open_ports.append(port_data)
+                'service': service,
+                'privileged': privileged,
+                'version': version
+            })
             
             # Display open port immediately
-            priv_marker = "⚠️" if is_privileged(port) else "✓"
-            print(f"{priv_marker} Port {port:>5}: {status:6} - {get_port_info(port)}")
+            priv_marker = "⚠️" if privileged else "✓"
+            detail = f" ({version})" if version else ""
+            print(f"{priv_marker} Port {port:>5}: {status:6} - {service}{detail}")
+    
+    counts = asyncio.run(scan_port_range(
+        target_ip, range(start_port, end_port + 1),
+        concurrency=concurrency, timeout=timeout, on_result=record_result,
+        pacer=pacer, banner_timeout=banner_timeout))
+    total_scanned = sum(counts.values())
+    
+    # Results arrive in completion order, reports list them by port
+    open_ports.sort(key=lambda p: p['port'])
     
     scan_data = {
         'target_ip': target_ip,
@@ -57,13 +99,245 @@ def scan_ports(target_ip, start_port, end_port):
     return scan_data
 
 
+def scan_sweep(target_specs, port_spec, concurrency=DEFAULT_CONCURRENCY,
+               timeout=DEFAULT_TIMEOUT, max_active_hosts=256, per_host_limit=16,
+               pacer=None, writer=None, checkpoint=None, banner_timeout=None):
+    """
+    Scans many hosts (CIDR blocks, ranges, single IPs) for a port spec.
+    
+    Hosts and ports are expanded lazily and fed through a shared work
+    scheduler, so a /16 never becomes a list in memory and probes are
+    spread across hosts instead of hammering one at a time.
+    
+    Parameters:
+    - target_specs: Comma separated targets, e.g. "10.0.0.0/24,10.0.1.5-20"
+    - port_spec: Port spec, e.g. "22,80,8000-8100"
+    - concurrency: Maximum number of probes in flight
+    - timeout: Per-port timeout in seconds
+    - max_active_hosts: Number of hosts worked on at the same time
+    - per_host_limit: Maximum probes in flight against one host
+    - pacer: Optional ProbePacer (see make_pacer)
+    - writer: Optional NDJSONReportWriter; findings are streamed to it
+      as they arrive instead of being kept in 'results'
+    - checkpoint: Optional ScanCheckpoint; finished work is journaled
+      and work it already records as done is skipped
+    - banner_timeout: If set, fingerprint open ports to fill 'version'
+    
+    Returns: Sweep results dictionary with one scan_data entry per host
+    that had open ports (empty 'results' when streaming)
+    """
+    port_ranges = parse_port_spec(port_spec)
+    ports_per_host = count_ports(port_ranges)
+    hosts = iter_hosts(target_specs)
+    skip_port = None
+    if checkpoint is not None:
+        hosts = (ip for ip in hosts if not checkpoint.is_host_done(ip))
+        skip_port = checkpoint.is_port_done
+    
+    print(f"\n🔍 Sweeping {target_specs} ports {port_spec}...")
+    print(f"⏰ Scan started at {get_timestamp()}")
+    print()
+    
+    open_by_host = {}
+    results = []
+    port_range = {
+        'start': port_ranges[0][0],
+        'end': port_ranges[-1][1]
+    }
+    
+    if writer is not None:
+        writer.write_header(targets=target_specs, ports=port_spec,
+                            port_range=port_range, ports_per_host=ports_per_host,
+                            scan_time=get_timestamp())
+    
+    if checkpoint is not None and writer is not None:
+        # Findings must be on disk before their probes are journaled
+        checkpoint.before_flush = writer.flush
+    
+    unrecorded = set()
+    
+    def record_result(ip, port, status, version):
+        try:
+            store_result(ip, port, status, version)
+        except BaseException:
+            # The host still completes, but must not be journaled as done
+            unrecorded.add(ip)
+            raise
+    
+    def store_result(ip, port, status, version):
+        if status == "OPEN":
+            service = get_port_info(port)
+            privileged = is_privileged(port)
+            port_data = {
+                'port': port,
+                'status': status,
+                'service': service,
+                'privileged': privileged,
+                'version': version
+            }
+            if writer is not None:
+                writer.write_finding(ip, port_data)
+            else:
+                open_by_host.setdefault(ip, []).append(port_data)
+            
+            priv_marker = "⚠️" if privileged else "✓"
+            detail = f" ({version})" if version else ""
+            print(f"{priv_marker} {ip:>15} port {port:>5}: {status:6} - {service}{detail}")
+        
+        # Journaled only after the finding was handed to the writer
+        if checkpoint is not None:
+            checkpoint.mark_port(ip, port)
+    
+    def host_done(ip):
+        # Called once the host's last result went through record_result,
+        # so its findings are written and its probes journaled before the
+        # host-done record that makes resume skip it
+        if pacer is not None:
+            pacer.forget(ip)
+        if checkpoint is not None and ip not in unrecorded:
+            checkpoint.mark_host(ip)
+        
+        # Only hosts with findings are kept; the rest cost nothing once done
+        open_ports = open_by_host.pop(ip, None)
+        if open_ports:
+            open_ports.sort(key=lambda p: p['port'])
+            results.append({
+                'target_ip': ip,
+                'scan_time': get_timestamp(),
+                'port_range': port_range,
+                'total_scanned': ports_per_host,
+                'open_ports': open_ports
+            })
+    
+    scheduler = WorkScheduler(hosts, port_ranges,
+                              max_active_hosts=max_active_hosts,
+                              per_host_limit=per_host_limit,
+                              on_host_done=host_done, skip_port=skip_port)
+    try:
+        counts = asyncio.run(scan_work_queue(scheduler, concurrency=concurrency,
+                                             timeout=timeout, on_result=record_result,
+                                             pacer=pacer, banner_timeout=banner_timeout))
+    finally:
+        if checkpoint is not None and writer is not None:
+            # Journal the rest while the writer is still open, then unhook it
+            checkpoint.flush()
+            checkpoint.before_flush = None
+    
+    sweep = {
+        'targets': target_specs,
+        'ports': port_spec,
+        'scan_time': get_timestamp(),
+        'hosts_scanned': scheduler.hosts_started,
+        'total_scanned': sum(counts.values()),
+        'status_counts': counts,
+        'results': results
+    }
+    
+    if writer is not None:
+        writer.close({k: v for k, v in sweep.items() if k != 'results'})
+    
+    return sweep
+
+
+def parse_args(argv=None):
+    """
+    Parses command line options for the non-interactive sweep mode.
+    
+    Returns: argparse Namespace (targets is None for interactive mode)
+    """
+    parser = argparse.ArgumentParser(description="Security port scanner")
+    parser.add_argument("-t", "--targets",
+                        help="Targets to sweep: IPs, CIDR blocks or ranges, comma separated")
+    parser.add_argument("-p", "--ports", default="20-100",
+                        help="Ports to scan, e.g. 22,80,8000-8100 (default: 20-100)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum probes in flight")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Per-port timeout in seconds (ceiling with --adaptive)")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Global probes per second budget (0 = unlimited)")
+    parser.add_argument("--host-rate", type=float, default=0,
+                        help="Per-host probes per second budget (0 = unlimited)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Adapt per-host timeouts to measured round-trip times")
+    parser.add_argument("--max-hosts", type=int, default=256,
+                        help="Hosts scanned at the same time")
+    parser.add_argument("--per-host", type=int, default=16,
+                        help="Maximum probes in flight per host")
+    parser.add_argument("--banners", action="store_true",
+                        help="Grab banners from open ports and fingerprint versions")
+    parser.add_argument("--banner-timeout", type=float, default=2.0,
+                        help="Seconds spent reading each banner")
+    parser.add_argument("-o", "--output", default="sweep_report.ndjson",
+                        help="Streaming NDJSON report filename for sweep mode")
+    parser.add_argument("--checkpoint",
+                        help="Checkpoint journal filename (default: <output>.ckpt)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip work the checkpoint journal records as done")
+    return parser.parse_args(argv)
+
+
+def run_sweep(args):
+    """
+    Runs the non-interactive sweep mode from parsed arguments.
+    """
+    # Check the specs before creating the report file
+    try:
+        parse_port_spec(args.ports)
+        iter_hosts(args.targets)
+    except ValueError as e:
+        print(f"\n❌ Error: {e}")
+        return
+    
+    checkpoint_file = args.checkpoint or args.output + ".ckpt"
+    try:
+        checkpoint = ScanCheckpoint(checkpoint_file, args.targets, args.ports,
+                                    resume=args.resume)
+    except ValueError as e:
+        print(f"\n❌ Error: {e}")
+        return
+    if checkpoint.done_hosts or checkpoint.partial:
+        print(f"↻ Resuming: {len(checkpoint.done_hosts)} hosts already done, "
+              f"{len(checkpoint.partial)} partly done")
+    
+    pacer = make_pacer(args.rate, args.host_rate, args.adaptive, args.timeout)
+    completed = False
+    try:
+        # Resumed runs add to the existing report instead of replacing it
+        with NDJSONReportWriter(args.output, append=args.resume) as writer:
+            sweep = scan_sweep(args.targets, args.ports, concurrency=args.concurrency,
+                               timeout=args.timeout, max_active_hosts=args.max_hosts,
+                               per_host_limit=args.per_host, pacer=pacer,
+                               writer=writer, checkpoint=checkpoint,
+                               banner_timeout=args.banner_timeout if args.banners else None)
+        completed = True
+    finally:
+        checkpoint.close(completed=completed)
+    
+    # Rebuild the per-host summaries from the stream rather than memory
+    results, _ = load_ndjson_report(args.output)
+    for scan_data in results:
+        print(generate_text_summary(scan_data))
+    
+    open_total = sum(len(r['open_ports']) for r in results)
+    print(f"\n✅ Sweep complete! {sweep['hosts_scanned']} hosts, "
+          f"{sweep['total_scanned']} probes, {open_total} open ports found.")
+
+
 def main():
     """
     Main program entry point.
     """
+    args = parse_args()
+    
     # Display banner
     print(format_banner("SECURITY PORT SCANNER"))
     
+    # Non-interactive sweep mode
+    if args.targets:
+        run_sweep(args)
+        return
+    
     # Get target IP
     target_ip = input("Enter target IP address to scan: ")
     
@@ -80,7 +354,8 @@ def main():
     end_port = 100
     
     # Perform scan
-    scan_data = scan_ports(target_ip, start_port, end_port)
+    banner_timeout = args.banner_timeout if args.banners else None
+    scan_data = scan_ports(target_ip, start_port, end_port, banner_timeout=banner_timeout)
     
     # Display text summary
     summary = generate_text_summary(scan_data)
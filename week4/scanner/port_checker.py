@@ -2,20 +2,72 @@
 # port_checker.py
 # Port status checking functions
 
+import asyncio
+import errno
+import os
+import time
+
+from fingerprint import fingerprint_port
+
+# Default tuning for the asyncio probe engine
+DEFAULT_CONCURRENCY = 500
+DEFAULT_TIMEOUT = 1.0
+
+# Metadata returned for ports missing from the services file
+UNKNOWN_PORT = ("Unknown", "tcp", ())
+
+
+def _load_port_table(filename):
+    """
+    Builds the port metadata table from the bundled services file.
+    
+    The table is a flat list indexed by port number (0-65535), so every
+    lookup is a single index with nothing allocated per call. Only tcp
+    rows are loaded: the scanner probes TCP, and a udp service on the
+    same number (e.g. 161/udp SNMP) says nothing about the TCP port.
+    
+    Parameters:
+    - filename: Path to a port_services.txt style file
+    
+    Returns: List of (service, protocol, risk_tags) tuples, one per port
+    """
+    table = [UNKNOWN_PORT] * 65536
+    with open(filename, 'r') as f:
+        for line in f:
+            fields, _, display_name = line.partition('#')
+            fields = fields.split()
+            if len(fields) < 2:
+                continue
+            port, _, protocol = fields[1].partition('/')
+            if protocol != 'tcp':
+                continue
+            tags = ()
+            if len(fields) > 2 and fields[2] != '-':
+                tags = tuple(fields[2].split(','))
+            table[int(port)] = (display_name.strip() or fields[0], protocol, tags)
+    return table
+
+
+# Loaded once at import time and shared by every lookup
+PORT_SERVICES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'port_services.txt')
+PORT_TABLE = _load_port_table(PORT_SERVICES_FILE)
+
+# Ports the offline simulation reports as open
+SIMULATED_OPEN_PORTS = frozenset([22, 80, 443, 3306, 8080])
+
+
 def check_port_status(port):
     """
     Simulates checking if a port is open.
-    In a real scanner, this would use socket connections.
+    Real probing is done by probe_port / scan_port_range below.
     
     Parameters:
     - port: Port number to check
     
     Returns: "OPEN" or "CLOSED"
     """
-    # Common ports that we'll simulate as open
-    common_open_ports = [22, 80, 443, 3306, 8080]
-    
-    if port in common_open_ports:
+    if port in SIMULATED_OPEN_PORTS:
         return "OPEN"
     else:
         return "CLOSED"
@@ -33,6 +85,20 @@ def is_privileged(port):
     return 0 <= port <= 1023
 
 
+def get_port_metadata(port):
+    """
+    Returns the full metadata entry for a port.
+    
+    Parameters:
+    - port: Port number
+    
+    Returns: (service, protocol, risk_tags) tuple
+    """
+    if 0 <= port <= 65535:
+        return PORT_TABLE[port]
+    return UNKNOWN_PORT
+
+
 def get_port_info(port):
     """
     Returns information about common ports.
@@ -42,20 +108,187 @@ def get_port_info(port):
     
     Returns: Service name or "Unknown"
     """
-    port_services = {
-        20: "FTP Data",
-        21: "FTP Control",
-        22: "SSH",
-        23: "Telnet",
-        25: "SMTP",
-        53: "DNS",
-        80: "HTTP",
-        110: "POP3",
-        143: "IMAP",
-        443: "HTTPS",
-        3306: "MySQL",
-        3389: "RDP",
-        8080: "HTTP Alternate"
-    }
-    
-    return port_services.get(port, "Unknown")
\ No newline at end of file
+    return get_port_metadata(port)[0]
+
+
+def get_port_risk_tags(port):
+    """
+    Returns the risk tags for a port, e.g. ('cleartext', 'remote-access').
+    
+    Parameters:
+    - port: Port number
+    
+    Returns: Tuple of tag strings (empty when nothing is known)
+    """
+    return get_port_metadata(port)[2]
+
+
+async def probe_port(target_ip, port, timeout=DEFAULT_TIMEOUT):
+    """
+    Probes one TCP port with a real connect() using asyncio.
+    
+    Parameters:
+    - target_ip: IP address to probe
+    - port: Port number to probe
+    - timeout: Seconds to wait for the handshake
+    
+    Returns: "OPEN", "CLOSED" (connection refused) or "FILTERED" (no answer)
+    """
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(target_ip, port), timeout)
+    except asyncio.TimeoutError:
+        return "FILTERED"
+    except ConnectionRefusedError:
+        return "CLOSED"
+    except OSError as e:
+        # Running out of sockets is our problem, not the target's
+        if e.errno in (errno.EMFILE, errno.ENFILE):
+            raise
+        # Unreachable hosts/networks behave like a firewall dropping packets
+        return "FILTERED"
+    
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return "OPEN"
+
+
+async def paced_probe(target_ip, port, timeout=DEFAULT_TIMEOUT, pacer=None):
+    """
+    Probes one port through an optional pacer (see rate_limit.ProbePacer).
+    
+    The pacer delays the probe to fit the rate budgets, chooses its
+    timeout and receives the measured round-trip time afterwards.
+    
+    Parameters:
+    - target_ip: IP address to probe
+    - port: Port number to probe
+    - timeout: Timeout used when there is no pacer
+    - pacer: Optional ProbePacer
+    
+    Returns: "OPEN", "CLOSED" or "FILTERED"
+    """
+    if pacer is None:
+        return await probe_port(target_ip, port, timeout)
+    
+    probe_timeout = await pacer.before_probe(target_ip, timeout)
+    started = time.monotonic()
+    status = await probe_port(target_ip, port, probe_timeout)
+    pacer.after_probe(target_ip, status, time.monotonic() - started)
+    return status
+
+
+async def scan_port_range(target_ip, ports, concurrency=DEFAULT_CONCURRENCY,
+                          timeout=DEFAULT_TIMEOUT, on_result=None, pacer=None,
+                          banner_timeout=None):
+    """
+    Probes many ports on one target with bounded concurrency.
+    
+    A fixed pool of worker tasks pulls ports from a shared iterator, so
+    a full 1-65535 sweep never creates more than `concurrency` sockets
+    or tasks at once.
+    
+    Parameters:
+    - target_ip: IP address to probe
+    - ports: Iterable of port numbers
+    - concurrency: Maximum number of connects in flight
+    - timeout: Per-port timeout in seconds
+    - on_result: Optional callback(port, status, version) called as
+      results arrive (version is None unless banners are grabbed)
+    - pacer: Optional ProbePacer for rate limits and adaptive timeouts
+    - banner_timeout: If set, grab and fingerprint a banner from every
+      OPEN port, spending at most this many seconds on it
+    
+    Returns: Dictionary mapping status -> count
+    """
+    port_iter = iter(ports)
+    counts = {"OPEN": 0, "CLOSED": 0, "FILTERED": 0}
+    
+    async def worker():
+        # Iterating a shared iterator is safe: workers only switch at await
+        for port in port_iter:
+            status = await paced_probe(target_ip, port, timeout, pacer)
+            counts[status] += 1
+            version = None
+            if status == "OPEN" and banner_timeout:
+                version = await fingerprint_port(target_ip, port, banner_timeout)
+            if on_result is not None:
+                on_result(port, status, version)
+    
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    
+    return counts
+
+
+async def scan_work_queue(scheduler, concurrency=DEFAULT_CONCURRENCY,
+                          timeout=DEFAULT_TIMEOUT, on_result=None, pacer=None,
+                          banner_timeout=None):
+    """
+    Probes (host, port) pairs handed out by a work scheduler.
+    
+    Workers ask the scheduler for the next probe and report back when it
+    finishes, so the scheduler decides the interleaving across hosts and
+    the per-host limits (see targets.WorkScheduler).
+    
+    Parameters:
+    - scheduler: Object with next_probe(), complete(ip) and finished
+    - concurrency: Maximum number of connects in flight
+    - timeout: Per-port timeout in seconds
+    - on_result: Optional callback(ip, port, status, version) called as
+      results arrive (version is None unless banners are grabbed)
+    - pacer: Optional ProbePacer for rate limits and adaptive timeouts
+    - banner_timeout: If set, grab and fingerprint a banner from every
+      OPEN port, spending at most this many seconds on it
+    
+    Returns: Dictionary mapping status -> count
+    """
+    counts = {"OPEN": 0, "CLOSED": 0, "FILTERED": 0}
+    slot_freed = asyncio.Condition()
+    
+    async def worker():
+        while True:
+            item = scheduler.next_probe()
+            if item is None:
+                if scheduler.finished:
+                    return
+                # Every active host is at its limit: wait for a probe to finish
+                async with slot_freed:
+                    await slot_freed.wait()
+                continue
+            
+            ip, port = item
+            # A cancelled probe (e.g. Ctrl+C) is not reported as complete,
+            # so an interrupted host is never recorded as finished
+            status = await paced_probe(ip, port, timeout, pacer)
+            version = None
+            if status == "OPEN" and banner_timeout:
+                version = await fingerprint_port(ip, port, banner_timeout)
+            # Report the result before completing the probe: completing a
+            # host's last probe retires it, and a retired host must already
+            # have every result recorded
+            try:
+                counts[status] += 1
+                if on_result is not None:
+                    on_result(ip, port, status, version)
+            finally:
+                scheduler.complete(ip)
+            
+            async with slot_freed:
+                slot_freed.notify_all()
+    
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    
+    return counts
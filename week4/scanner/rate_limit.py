@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# rate_limit.py
+# Probe pacing: token-bucket rate limits and RTT-based adaptive timeouts
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket that allows `rate` probes per second with bursts of up
+    to `burst` probes.
+    
+    Tokens are reserved rather than waited for: a caller takes a token
+    straight away (the balance may go negative) and is told how long to
+    sleep. Concurrent workers therefore queue up in order without a lock.
+    """
+    
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate / 10)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+    
+    def reserve(self, now=None):
+        """
+        Takes one token.
+        
+        Parameters:
+        - now: Current monotonic time (defaults to time.monotonic())
+        
+        Returns: Seconds the caller must wait before sending
+        """
+        if now is None:
+            now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class AdaptiveTimeout:
+    """
+    Per-host retransmission-style timeout in the spirit of RFC 6298.
+    
+    Each answered probe (OPEN or CLOSED) is an RTT sample:
+    - first sample:  SRTT = R, RTTVAR = R / 2
+    - later samples: RTTVAR = 3/4 RTTVAR + 1/4 |SRTT - R|
+                     SRTT   = 7/8 SRTT   + 1/8 R
+    - timeout = SRTT + 4 * RTTVAR, clamped to [min_timeout, max_timeout]
+    
+    A probe that times out doubles the host's timeout (capped at
+    max_timeout) until the next answered probe. Hosts with no samples
+    yet use max_timeout, so nothing is marked FILTERED too early.
+    """
+    
+    def __init__(self, min_timeout=0.05, max_timeout=1.0):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.hosts = {}
+    
+    def timeout(self, ip):
+        """
+        Returns the timeout to use for the next probe against a host.
+        """
+        state = self.hosts.get(ip)
+        return state[2] if state else self.max_timeout
+    
+    def record_rtt(self, ip, rtt):
+        """
+        Feeds an RTT sample (seconds) from an answered probe.
+        """
+        state = self.hosts.get(ip)
+        if state is None:
+            srtt, rttvar = rtt, rtt / 2
+        else:
+            srtt, rttvar = state[0], state[1]
+            rttvar = 0.75 * rttvar + 0.25 * abs(srtt - rtt)
+            srtt = 0.875 * srtt + 0.125 * rtt
+        rto = min(self.max_timeout, max(self.min_timeout, srtt + 4 * rttvar))
+        self.hosts[ip] = (srtt, rttvar, rto)
+    
+    def record_timeout(self, ip):
+        """
+        Backs off a host's timeout after a probe got no answer.
+        """
+        state = self.hosts.get(ip)
+        if state is not None:
+            self.hosts[ip] = (state[0], state[1], min(self.max_timeout, state[2] * 2))
+    
+    def forget(self, ip):
+        """
+        Drops the state for a host that is finished.
+        """
+        self.hosts.pop(ip, None)
+
+
+class ProbePacer:
+    """
+    Scheduling layer wrapped around every probe.
+    
+    Enforces a global probes-per-second budget and a per-host budget,
+    and picks each probe's timeout from the host's measured RTT.
+    A rate of 0 or None means unlimited.
+    """
+    
+    def __init__(self, global_rate=None, host_rate=None, timeouts=None):
+        self.global_bucket = TokenBucket(global_rate) if global_rate else None
+        self.host_rate = host_rate
+        self.host_buckets = {}
+        self.timeouts = timeouts
+    
+    async def before_probe(self, ip, default_timeout):
+        """
+        Waits until the probe fits in both budgets.
+        
+        Parameters:
+        - ip: Host about to be probed
+        - default_timeout: Timeout to use when adaptive timeouts are off
+        
+        Returns: Timeout in seconds for this probe
+        """
+        now = time.monotonic()
+        delay = 0.0
+        if self.global_bucket is not None:
+            delay = self.global_bucket.reserve(now)
+        if self.host_rate:
+            bucket = self.host_buckets.get(ip)
+            if bucket is None:
+                bucket = self.host_buckets[ip] = TokenBucket(self.host_rate)
+            delay = max(delay, bucket.reserve(now))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        if self.timeouts is None:
+            return default_timeout
+        return self.timeouts.timeout(ip)
+    
+    def after_probe(self, ip, status, rtt):
+        """
+        Feeds the probe outcome back into the timeout controller.
+        
+        Parameters:
+        - ip: Host that was probed
+        - status: "OPEN", "CLOSED" or "FILTERED"
+        - rtt: Seconds from connect() to the answer
+        """
+        if self.timeouts is None:
+            return
+        if status == "FILTERED":
+            self.timeouts.record_timeout(ip)
+        else:
+            self.timeouts.record_rtt(ip, rtt)
+    
+    def forget(self, ip):
+        """
+        Drops per-host budget and timeout state once a host is done.
+        """
+        self.host_buckets.pop(ip, None)
+        if self.timeouts is not None:
+            self.timeouts.forget(ip)
@@ -4,6 +4,10 @@
 
 import json
 
+# Records are buffered and written in batches of this size
+DEFAULT_BATCH_SIZE = 100
+
+
 def generate_json_report(scan_data, filename):
     """
     Generates JSON report of scan results.
@@ -52,7 +56,155 @@ def generate_text_summary(scan_data):
             privileged = "⚠️ PRIVILEGED" if port_info['privileged'] else ""
             
             lines.append(f"  Port {port:>5}: {service:20} {privileged}")
+            if port_info.get('version'):
+                lines.append(f"              Version: {port_info['version']}")
     
     lines.append("\n" + "=" * 70)
     
     return '\n'.join(lines)
+
+
+class NDJSONReportWriter:
+    """
+    Streams scan results to a newline-delimited JSON file.
+    
+    The file holds one compact JSON object per line:
+    - {"type": "scan", ...}      header with targets, ports and start time
+    - {"type": "open_port", ...} one per finding, written as it arrives
+    - {"type": "summary", ...}   totals, written by close()
+    
+    Findings are buffered and flushed every `batch_size` records, so a
+    crash loses at most one batch and memory use does not grow with the
+    size of the sweep. With append=True a resumed scan adds its records
+    after those of the interrupted run.
+    """
+    
+    def __init__(self, filename, batch_size=DEFAULT_BATCH_SIZE, append=False):
+        self.filename = filename
+        self.batch_size = max(1, batch_size)
+        self.buffer = []
+        self.records_written = 0
+        self.file = open(filename, 'a' if append else 'w')
+    
+    def write_record(self, record):
+        """
+        Queues one record and flushes when the batch is full.
+        
+        Parameters:
+        - record: Dictionary with a 'type' key
+        """
+        self.buffer.append(json.dumps(record, separators=(',', ':')) + '\n')
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+    
+    def write_header(self, **fields):
+        """
+        Writes the scan header record and flushes it straight away.
+        """
+        self.write_record({'type': 'scan', **fields})
+        self.flush()
+    
+    def write_finding(self, target_ip, port_data):
+        """
+        Writes one open port finding.
+        
+        Parameters:
+        - target_ip: Host the port belongs to
+        - port_data: Port dictionary as used in scan_data['open_ports']
+        """
+        self.write_record({'type': 'open_port', 'target_ip': target_ip, **port_data})
+    
+    def flush(self):
+        """
+        Writes out buffered records.
+        """
+        if self.buffer:
+            self.file.write(''.join(self.buffer))
+            self.records_written += len(self.buffer)
+            self.buffer.clear()
+        self.file.flush()
+    
+    def close(self, summary=None):
+        """
+        Writes the optional summary record and closes the file.
+        
+        Parameters:
+        - summary: Dictionary of totals for the summary record
+        """
+        if summary is not None:
+            self.write_record({'type': 'summary', **summary})
+        self.flush()
+        self.file.close()
+        print(f"✓ Report saved to {self.filename}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # On errors keep whatever was streamed so far, without a summary
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def read_ndjson_report(filename):
+    """
+    Reads an NDJSON report back one record at a time.
+    
+    A truncated last line (e.g. after a crash) is skipped.
+    
+    Parameters:
+    - filename: NDJSON report filename
+    
+    Returns: Generator of record dictionaries
+    """
+    with open(filename, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def load_ndjson_report(filename):
+    """
+    Rebuilds per-host scan_data dictionaries from an NDJSON report.
+    
+    The results have the same shape scan_ports returns, so they can be
+    passed straight to generate_text_summary.
+    
+    Parameters:
+    - filename: NDJSON report filename
+    
+    Returns: (list of scan_data dictionaries, summary record or None)
+    """
+    header = {}
+    summary = None
+    open_by_host = {}
+    
+    for record in read_ndjson_report(filename):
+        record_type = record.pop('type', None)
+        if record_type == 'scan':
+            header = record
+        elif record_type == 'open_port':
+            # Keyed by port so findings repeated by a resumed run count once
+            ip = record.pop('target_ip')
+            open_by_host.setdefault(ip, {})[record['port']] = record
+        elif record_type == 'summary':
+            summary = record
+    
+    port_range = header.get('port_range', {'start': None, 'end': None})
+    results = []
+    for ip, ports in open_by_host.items():
+        open_ports = [ports[port] for port in sorted(ports)]
+        results.append({
+            'target_ip': ip,
+            'scan_time': header.get('scan_time', 'N/A'),
+            'port_range': port_range,
+            'total_scanned': header.get('ports_per_host', len(open_ports)),
+            'open_ports': open_ports
+        })
+    
+    return results, summary
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# scan_diff.py
+# Compares successive scan reports and lists what changed
+
+import argparse
+import json
+from bisect import bisect_right
+
+from report_gen import read_ndjson_report
+from targets import parse_target, parse_port_spec, ip_to_int
+
+
+def iter_report_findings(filename):
+    """
+    Streams (target_ip, port, service, version) for every open port in
+    a report, plus the report's coverage.
+    
+    Handles all report formats the scanner writes:
+    - single-host JSON (scan_report_*.json)
+    - sweep JSON with a 'results' list
+    - streaming NDJSON sweep reports (read line by line)
+    
+    Parameters:
+    - filename: Report filename
+    
+    Returns: (generator of findings, coverage dictionary). The coverage
+    is filled in while the generator runs, so read it afterwards.
+    """
+    coverage = {'hosts': [], 'ports': []}
+    
+    def add_coverage(targets, port_range=None, ports=None):
+        if isinstance(targets, str):
+            coverage['hosts'].extend(parse_target(t) for t in targets.split(',') if t.strip())
+        if ports:
+            coverage['ports'].extend(parse_port_spec(ports))
+        elif port_range and port_range.get('start') is not None:
+            coverage['ports'].append((port_range['start'], port_range['end']))
+    
+    def findings_from_scan(scan_data):
+        add_coverage(scan_data['target_ip'], scan_data.get('port_range'))
+        for port_info in scan_data['open_ports']:
+            yield (scan_data['target_ip'], port_info['port'],
+                   port_info.get('service'), port_info.get('version'))
+    
+    def findings():
+        if filename.endswith('.ndjson'):
+            for record in read_ndjson_report(filename):
+                if record.get('type') == 'scan':
+                    add_coverage(record.get('targets'), record.get('port_range'),
+                                 record.get('ports'))
+                elif record.get('type') == 'open_port':
+                    yield (record['target_ip'], record['port'],
+                           record.get('service'), record.get('version'))
+            return
+        
+        with open(filename, 'r') as f:
+            report = json.load(f)
+        if 'results' in report:
+            add_coverage(report.get('targets'), ports=report.get('ports'))
+            for scan_data in report['results']:
+                yield from findings_from_scan(scan_data)
+        else:
+            yield from findings_from_scan(report)
+    
+    return findings(), coverage
+
+
+def _merge_ranges(ranges):
+    """
+    Sorts and merges inclusive (start, end) ranges for bisect lookups.
+    
+    Returns: (list of range starts, list of merged ranges)
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [start for start, _ in merged], merged
+
+
+def _in_ranges(value, starts, merged):
+    i = bisect_right(starts, value) - 1
+    return i >= 0 and value <= merged[i][1]
+
+
+def _covered_by(coverage):
+    """
+    Builds a (ip, port) -> bool test for a report's coverage.
+    
+    Ranges are merged once and searched with bisect, so reports listing
+    thousands of targets do not make the closed-port check quadratic.
+    """
+    host_starts, hosts = _merge_ranges(coverage['hosts'])
+    port_starts, ports = _merge_ranges(coverage['ports'])
+    
+    def covered(ip, port):
+        return (_in_ranges(ip_to_int(ip), host_starts, hosts)
+                and _in_ranges(port, port_starts, ports))
+    return covered
+
+
+def _service_changed(old, new):
+    """
+    Compares (service, version) pairs. Versions only count when both
+    scans grabbed banners, so turning --banners on is not a change.
+    """
+    if old[0] != new[0]:
+        return True
+    return old[1] is not None and new[1] is not None and old[1] != new[1]
+
+
+def diff_against(old_index, filename):
+    """
+    Streams a newer report against the index of an older one.
+    
+    Each finding in the new report is one dict lookup, so the diff is
+    linear in the size of both reports. Ports left over in the old
+    index are only reported as closed if the new scan covered them.
+    
+    Parameters:
+    - old_index: {(target_ip, port): (service, version)} of the older report
+    - filename: Newer report filename
+    
+    Returns: (list of change dictionaries, index of the newer report)
+    """
+    changes = []
+    new_index = {}
+    findings, coverage = iter_report_findings(filename)
+    
+    for ip, port, service, version in findings:
+        key = (ip, port)
+        new_index[key] = (service, version)
+        old = old_index.get(key)
+        if old is None:
+            changes.append({'change': 'opened', 'target_ip': ip, 'port': port,
+                            'service': service, 'version': version})
+        elif _service_changed(old, (service, version)):
+            changes.append({'change': 'service_changed', 'target_ip': ip, 'port': port,
+                            'old_service': old[0], 'old_version': old[1],
+                            'service': service, 'version': version})
+    
+    covered = _covered_by(coverage)
+    for (ip, port), (service, version) in old_index.items():
+        if (ip, port) not in new_index and covered(ip, port):
+            changes.append({'change': 'closed', 'target_ip': ip, 'port': port,
+                            'service': service, 'version': version})
+    
+    changes.sort(key=lambda c: (ip_to_int(c['target_ip']), c['port']))
+    return changes, new_index
+
+
+def load_report_index(filename):
+    """
+    Builds the {(target_ip, port): (service, version)} index of a report.
+    """
+    findings, _ = iter_report_findings(filename)
+    return {(ip, port): (service, version) for ip, port, service, version in findings}
+
+
+def diff_reports(filenames):
+    """
+    Diffs each report against the one before it.
+    
+    Parameters:
+    - filenames: Report filenames, oldest first (at least two)
+    
+    Returns: List of {'old', 'new', 'changes'} dictionaries
+    """
+    if len(filenames) < 2:
+        raise ValueError("Need at least two reports to diff")
+    
+    results = []
+    index = load_report_index(filenames[0])
+    for old_name, new_name in zip(filenames, filenames[1:]):
+        changes, index = diff_against(index, new_name)
+        results.append({'old': old_name, 'new': new_name, 'changes': changes})
+    return results
+
+
+def _describe(service, version):
+    return f"{service} ({version})" if version else f"{service}"
+
+
+def format_diff(result):
+    """
+    Formats one diff result as readable text.
+    """
+    lines = [f"\n{result['old']} -> {result['new']}", "-" * 70]
+    if not result['changes']:
+        lines.append("  No changes")
+    for change in result['changes']:
+        where = f"{change['target_ip']}:{change['port']}"
+        current = _describe(change['service'], change['version'])
+        if change['change'] == 'opened':
+            lines.append(f"  🆕 OPENED  {where:22} {current}")
+        elif change['change'] == 'closed':
+            lines.append(f"  ✖ CLOSED  {where:22} {current}")
+        else:
+            previous = _describe(change['old_service'], change['old_version'])
+            lines.append(f"  ↻ CHANGED {where:22} {previous} -> {current}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff successive scan reports")
+    parser.add_argument("reports", nargs="+", help="Report files, oldest first")
+    parser.add_argument("-o", "--output", help="Also save the changes as JSON")
+    args = parser.parse_args()
+    
+    try:
+        results = diff_reports(args.reports)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    
+    for result in results:
+        print(format_diff(result))
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Changes saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# targets.py
+# Parses target and port specifications and schedules host x port work
+
+from collections import deque
+
+from utils import validate_ip
+
+
+def ip_to_int(ip):
+    """
+    Converts a dotted IPv4 string to a 32-bit integer.
+    
+    Parameters:
+    - ip: IP address string
+    
+    Returns: Integer value of the address
+    """
+    a, b, c, d = (int(part) for part in ip.split('.'))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def int_to_ip(value):
+    """
+    Converts a 32-bit integer back to a dotted IPv4 string.
+    
+    Parameters:
+    - value: Integer address
+    
+    Returns: IP address string
+    """
+    return f"{(value >> 24) & 255}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+
+
+def parse_target(spec):
+    """
+    Parses one target into an inclusive range of integer addresses.
+    
+    Accepted forms:
+    - Single IP:    192.168.1.10
+    - CIDR block:   10.0.0.0/24
+    - Full range:   10.0.0.5-10.0.0.50
+    - Short range:  10.0.0.5-50 (last octet only)
+    
+    Parameters:
+    - spec: Target string
+    
+    Returns: (first, last) integer addresses
+    
+    Raises: ValueError if the spec is not valid
+    """
+    spec = spec.strip()
+    
+    if '/' in spec:
+        ip, prefix = spec.split('/', 1)
+        if not validate_ip(ip) or not prefix.isdigit() or not 0 <= int(prefix) <= 32:
+            raise ValueError(f"Invalid CIDR block: {spec}")
+        size = 1 << (32 - int(prefix))
+        first = ip_to_int(ip) & ~(size - 1) & 0xFFFFFFFF
+        return first, first + size - 1
+    
+    if '-' in spec:
+        start, end = spec.split('-', 1)
+        if not validate_ip(start):
+            raise ValueError(f"Invalid IP range: {spec}")
+        if end.isdigit():
+            end = start.rsplit('.', 1)[0] + '.' + end
+        if not validate_ip(end):
+            raise ValueError(f"Invalid IP range: {spec}")
+        first, last = ip_to_int(start), ip_to_int(end)
+        if first > last:
+            raise ValueError(f"IP range is backwards: {spec}")
+        return first, last
+    
+    if not validate_ip(spec):
+        raise ValueError(f"Invalid IP address: {spec}")
+    value = ip_to_int(spec)
+    return value, value
+
+
+def merge_ranges(ranges):
+    """
+    Merges overlapping and adjacent inclusive ranges.
+    
+    Parameters:
+    - ranges: Non-empty list of (start, end) pairs
+    
+    Returns: Sorted list of disjoint (start, end) ranges
+    """
+    ranges = sorted(ranges)
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def iter_hosts(target_specs):
+    """
+    Lazily yields every host address in a list of target specs.
+    
+    Overlapping specs are merged, so hosts come out in address order and
+    each host only once. Only the (first, last) bounds are kept in memory, so a /16 costs the
+    same as a single IP until it is iterated.
+    
+    Parameters:
+    - target_specs: Comma separated string or list of target strings
+    
+    Returns: Generator of IP address strings
+    
+    Raises: ValueError if any target spec is not valid
+    """
+    if isinstance(target_specs, str):
+        target_specs = target_specs.split(',')
+    
+    # Parse eagerly so bad specs fail before any work starts
+    ranges = [parse_target(spec) for spec in target_specs if spec.strip()]
+    if not ranges:
+        raise ValueError("Target spec is empty")
+    # Merge overlapping specs so every host is yielded once
+    ranges = merge_ranges(ranges)
+    return (int_to_ip(value)
+            for first, last in ranges
+            for value in range(first, last + 1))
+
+
+def parse_port_spec(spec):
+    """
+    Parses a port spec such as "22,80,8000-8100".
+    
+    Overlapping and adjacent ranges are merged so no port is probed twice.
+    
+    Parameters:
+    - spec: Port spec string
+    
+    Returns: Sorted list of (start, end) inclusive port ranges
+    
+    Raises: ValueError if a port is outside 1-65535
+    """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                start, end = (int(p) for p in part.split('-', 1))
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid port spec: {part}")
+        if not 1 <= start <= end <= 65535:
+            raise ValueError(f"Invalid port range: {part}")
+        ranges.append((start, end))
+    
+    if not ranges:
+        raise ValueError("Port spec is empty")
+    return merge_ranges(ranges)
+
+
+def iter_ports(port_ranges):
+    """
+    Lazily yields every port in a list of (start, end) ranges.
+    
+    Parameters:
+    - port_ranges: Output of parse_port_spec
+    
+    Returns: Generator of port numbers
+    """
+    for start, end in port_ranges:
+        yield from range(start, end + 1)
+
+
+def count_ports(port_ranges):
+    """
+    Counts ports in a list of (start, end) ranges without expanding them.
+    """
+    return sum(end - start + 1 for start, end in port_ranges)
+
+
+class WorkScheduler:
+    """
+    Hands out (host, port) probes interleaved across a window of hosts.
+    
+    Up to `max_active_hosts` hosts are worked on at once and each one may
+    have at most `per_host_limit` probes in flight. Probes are handed out
+    round robin, so no single host is flooded. When a host runs out of
+    ports and its last probe completes, `on_host_done(ip)` is called and
+    its slot is refilled from the lazy host iterator. Ports for which
+    `skip_port(ip, port)` is true (e.g. already done) are never handed out.
+    """
+    
+    def __init__(self, hosts, port_ranges, max_active_hosts=256, per_host_limit=16,
+                 on_host_done=None, skip_port=None):
+        self.hosts = iter(hosts)
+        self.port_ranges = port_ranges
+        self.max_active_hosts = max(1, max_active_hosts)
+        self.per_host_limit = max(1, per_host_limit)
+        self.active = deque()
+        self.by_ip = {}
+        self.hosts_exhausted = False
+        self.hosts_started = 0
+        self.on_host_done = on_host_done
+        self.skip_port = skip_port
+        self._refill()
+    
+    def _refill(self):
+        """
+        Pulls new hosts from the iterator until the window is full.
+        """
+        while not self.hosts_exhausted and len(self.by_ip) < self.max_active_hosts:
+            ip = next(self.hosts, None)
+            if ip is None:
+                self.hosts_exhausted = True
+                break
+            if ip in self.by_ip:
+                # Already being probed; a second state would corrupt by_ip
+                continue
+            state = {
+                'ip': ip,
+                'ports': self._host_ports(ip),
+                'in_flight': 0,
+                'exhausted': False
+            }
+            self.active.append(state)
+            self.by_ip[ip] = state
+            self.hosts_started += 1
+    
+    def _host_ports(self, ip):
+        """
+        Yields the ports still to probe on one host.
+        """
+        for port in iter_ports(self.port_ranges):
+            if self.skip_port is None or not self.skip_port(ip, port):
+                yield port
+    
+    @property
+    def finished(self):
+        """
+        True once every host has been started and fully completed.
+        """
+        return self.hosts_exhausted and not self.by_ip
+    
+    def next_probe(self):
+        """
+        Returns the next (host, port) to probe.
+        
+        Returns: (ip, port), or None if every active host is at its
+        in-flight limit (call again after complete())
+        """
+        checked = 0
+        while checked < len(self.active):
+            state = self.active[0]
+            if state['in_flight'] >= self.per_host_limit:
+                self.active.rotate(-1)
+                checked += 1
+                continue
+            port = next(state['ports'], None)
+            if port is None:
+                # Out of ports: stop handing it out, keep it until drained
+                state['exhausted'] = True
+                self.active.popleft()
+                if state['in_flight'] == 0:
+                    self._retire(state)
+                continue
+            # Rotate so the next call starts at the following host
+            self.active.rotate(-1)
+            state['in_flight'] += 1
+            return state['ip'], port
+        return None
+    
+    def complete(self, ip):
+        """
+        Marks one probe against a host as finished.
+        
+        Parameters:
+        - ip: Host the probe was sent to
+        """
+        state = self.by_ip[ip]
+        state['in_flight'] -= 1
+        if state['exhausted'] and state['in_flight'] == 0:
+            self._retire(state)
+    
+    def _retire(self, state):
+        """
+        Drops a finished host and frees its slot for the next one.
+        """
+        del self.by_ip[state['ip']]
+        if self.on_host_done is not None:
+            self.on_host_done(state['ip'])
+        self._refill()
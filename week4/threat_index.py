@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# threat_index.py
+# Compiles threat feeds into a memory-mapped binary IOC index
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from ioc_matcher import IPIndex, parse_ip_indicator
+from log_cache import log_fingerprint
+from log_fastpath import ip_bytes_to_int
+from threat_parser import domain_key, iter_threats, summarize_threats
+
+INDEX_VERSION = 2
+INDEX_MAGIC = b'IOCIDX\x00\x01'
+
+# Magic, then the little-endian length of the JSON header that follows
+PREAMBLE = struct.Struct('<8sI')
+
+# Section name -> array typecode, in file order
+SECTIONS = {
+    # Single IPs: sorted addresses and CSR lists of threat numbers
+    'ip_values': 'I',
+    'ip_offsets': 'I',
+    'ip_threats': 'I',
+    # CIDR/range indicators as disjoint segments (see ioc_matcher.IPIndex)
+    'seg_starts': 'I',
+    'seg_ends': 'I',
+    'seg_offsets': 'I',
+    'seg_threats': 'I',
+    # Domains: open-addressing table of entry number + 1 (0 = empty slot)
+    'dom_slots': 'I',
+    'dom_hashes': 'Q',
+    'dom_name_offsets': 'I',
+    'dom_names': 'B',
+    'dom_offsets': 'I',
+    'dom_threats': 'I',
+    # Per-threat metadata as JSON records in one blob
+    'meta_offsets': 'I',
+    'meta_blob': 'B',
+    # Threat numbers of the active exploits, in feed order
+    'exploit_threats': 'I',
+}
+
+
+def index_path(feed_file):
+    """
+    Returns the index file kept next to a feed.
+    """
+    return feed_file + '.idx'
+
+
+def domain_hash(domain):
+    """
+    Stable 64-bit hash of a normalized domain (never 0).
+    """
+    digest = hashlib.blake2b(domain.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+def _csr(mapping):
+    """
+    Turns {key: [threat numbers]} into sorted keys plus CSR offsets and values.
+    """
+    keys = sorted(mapping)
+    offsets = array('I', [0])
+    values = array('I')
+    for key in keys:
+        values.extend(dict.fromkeys(mapping[key]))
+        offsets.append(len(values))
+    return keys, offsets, values
+
+
+def _data_start(header_size):
+    """
+    Returns the file offset of the first section.
+    """
+    end = PREAMBLE.size + header_size
+    return end + (-end % 8)
+
+
+def build_index(feed_file, output=None):
+    """
+    Streams a JSON or NDJSON feed into a binary index file.
+    
+    Parameters:
+    - feed_file: Threat feed
+    - output: Index file (default: next to the feed, see index_path)
+    
+    Returns: Path of the index file
+    """
+    output = output or index_path(feed_file)
+    sections = {name: array(code) for name, code in SECTIONS.items()}
+    exact = {}
+    ranges = []
+    domains = {}
+    metadata = {}
+    meta_offsets = sections['meta_offsets']
+    meta_blob = sections['meta_blob']
+    meta_offsets.append(0)
+    
+    def counted_threats():
+        # Number threats while streaming them into summarize_threats
+        for number, threat in enumerate(iter_threats(feed_file, metadata)):
+            meta_blob.frombytes(json.dumps({
+                'id': threat['id'],
+                'type': threat['type'],
+                'severity': threat['severity'],
+                'active_exploit': threat['active_exploit'],
+                'description': threat['description']
+            }).encode())
+            meta_offsets.append(len(meta_blob))
+            if threat['active_exploit']:
+                sections['exploit_threats'].append(number)
+            
+            for ip in threat['indicators'].get('ips', ()):
+                try:
+                    first, last = parse_ip_indicator(ip)
+                except ValueError as e:
+                    raise ValueError(f"{threat['id']}: {e}") from None
+                if first == last:
+                    exact.setdefault(first, []).append(number)
+                else:
+                    ranges.append((first, last, number))
+            for domain in threat['indicators'].get('domains', ()):
+                domains.setdefault(domain_key(domain), []).append(number)
+            yield threat
+    
+    analysis = summarize_threats(counted_threats())
+    
+    keys, offsets, values = _csr(exact)
+    sections['ip_values'].extend(keys)
+    sections['ip_offsets'] = offsets
+    sections['ip_threats'] = values
+    
+    segments = IPIndex(ranges=ranges)
+    sections['seg_starts'] = segments.starts
+    sections['seg_ends'] = segments.ends
+    sections['seg_offsets'].append(0)
+    for covering in segments.segments:
+        sections['seg_threats'].extend(dict.fromkeys(covering))
+        sections['seg_offsets'].append(len(sections['seg_threats']))
+    
+    names, offsets, values = _csr(domains)
+    sections['dom_offsets'] = offsets
+    sections['dom_threats'] = values
+    sections['dom_name_offsets'].append(0)
+    slot_count = 8
+    while slot_count < 2 * len(names):
+        slot_count *= 2
+    slots = sections['dom_slots'] = array('I', bytes(4 * slot_count))
+    for entry, name in enumerate(names):
+        h = domain_hash(name)
+        sections['dom_hashes'].append(h)
+        sections['dom_names'].frombytes(name.encode())
+        sections['dom_name_offsets'].append(len(sections['dom_names']))
+        slot = h & (slot_count - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = entry + 1
+    
+    # Sections sit on 8-byte boundaries; offsets are relative to the
+    # first 8-byte boundary after the header
+    layout = {}
+    position = 0
+    for name, values in sections.items():
+        layout[name] = [position, len(values)]
+        position += -(-len(values) * values.itemsize // 8) * 8
+    # The header is parsed on every open, so it only holds counts; the
+    # exploit records are read from their section when asked for
+    analysis['unique_ips'] = len(analysis['unique_ips'])
+    analysis['unique_domains'] = len(analysis['unique_domains'])
+    analysis['active_exploits'] = len(analysis['active_exploits'])
+    header_bytes = json.dumps({
+        'version': INDEX_VERSION,
+        'byteorder': sys.byteorder,
+        'feed': log_fingerprint(feed_file),
+        'feed_name': metadata.get('feed_name'),
+        'date': metadata.get('date'),
+        'analysis': analysis,
+        'sections': layout
+    }).encode()
+    base = _data_start(len(header_bytes))
+    
+    # Write to a temporary name so readers never see a partial index
+    temp = output + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(PREAMBLE.pack(INDEX_MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in sections.items():
+            f.seek(base + layout[name][0])
+            values.tofile(f)
+        f.truncate(max(f.tell(), base + position))
+    os.replace(temp, output)
+    return output
+
+
+class ThreatIndex:
+    """
+    Read-only view of a compiled index.
+    
+    Opening maps the file and casts each section to a typed memoryview;
+    nothing is parsed or copied, so startup cost does not grow with the
+    feed. IP lookups are binary searches over the sorted arrays and
+    domain lookups probe the hash table.
+    """
+    
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_size = PREAMBLE.unpack_from(self._map)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a threat index")
+        self.header = json.loads(self._map[PREAMBLE.size:PREAMBLE.size + header_size])
+        if self.header['version'] != INDEX_VERSION or self.header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was built by an incompatible version or platform")
+        
+        view = memoryview(self._map)
+        base = _data_start(header_size)
+        for name, code in SECTIONS.items():
+            start, count = self.header['sections'][name]
+            start += base
+            size = array(code).itemsize
+            setattr(self, name, view[start:start + count * size].cast(code))
+    
+    @property
+    def feed_name(self):
+        return self.header['feed_name']
+    
+    @property
+    def analysis(self):
+        """
+        Feed statistics computed at build time (see summarize_threats;
+        'unique_ips', 'unique_domains' and 'active_exploits' are counts
+        here, see active_exploits() for the records).
+        """
+        return self.header['analysis']
+    
+    def active_exploits(self):
+        """
+        Returns: List of {'id', 'type', 'description'} dictionaries for
+        the threats marked as active exploits, in feed order
+        """
+        exploits = []
+        for number in self.exploit_threats:
+            threat = self.threat(number)
+            exploits.append({
+                'id': threat['id'],
+                'type': threat['type'],
+                'description': threat['description']
+            })
+        return exploits
+    
+    def __len__(self):
+        return len(self.meta_offsets) - 1
+    
+    def threat(self, number):
+        """
+        Returns: Metadata dictionary of the threat with this number
+        """
+        start, end = self.meta_offsets[number], self.meta_offsets[number + 1]
+        return json.loads(self.meta_blob[start:end].tobytes())
+    
+    def ip_threat_numbers(self, value):
+        """
+        Returns: Threat numbers matching a 32-bit IP (exact first, then
+        ranges from most to least specific)
+        """
+        numbers = []
+        i = bisect_left(self.ip_values, value)
+        if i < len(self.ip_values) and self.ip_values[i] == value:
+            numbers.extend(self.ip_threats[self.ip_offsets[i]:self.ip_offsets[i + 1]])
+        i = bisect_right(self.seg_starts, value) - 1
+        if i >= 0 and value <= self.seg_ends[i]:
+            numbers.extend(self.seg_threats[self.seg_offsets[i]:self.seg_offsets[i + 1]])
+        return list(dict.fromkeys(numbers))
+    
+    def lookup_ip(self, ip):
+        """
+        Returns: List of threat metadata dictionaries for a dotted IP
+        """
+        value = ip_bytes_to_int(ip.strip().encode())
+        if value is None:
+            raise ValueError(f"Invalid IP address: {ip}")
+        return [self.threat(number) for number in self.ip_threat_numbers(value)]
+    
+    def domain_threat_numbers(self, domain):
+        """
+        Returns: Threat numbers listing exactly this domain
+        """
+        name = domain_key(domain)
+        h = domain_hash(name)
+        mask = len(self.dom_slots) - 1
+        slot = h & mask
+        while self.dom_slots[slot]:
+            entry = self.dom_slots[slot] - 1
+            if self.dom_hashes[entry] == h:
+                start, end = self.dom_name_offsets[entry], self.dom_name_offsets[entry + 1]
+                if self.dom_names[start:end].tobytes() == name.encode():
+                    return list(self.dom_threats[self.dom_offsets[entry]:self.dom_offsets[entry + 1]])
+            slot = (slot + 1) & mask
+        return []
+    
+    def lookup_domain(self, domain):
+        """
+        Returns: List of threat metadata dictionaries for a domain
+        """
+        return [self.threat(number) for number in self.domain_threat_numbers(domain)]
+
+
+def load_or_build_index(feed_file):
+    """
+    Opens the feed's index, compiling it first if missing or stale.
+    """
+    path = index_path(feed_file)
+    try:
+        index = ThreatIndex(path)
+        if index.header['feed'] == log_fingerprint(feed_file):
+            return index
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    build_index(feed_file, path)
+    return ThreatIndex(path)
+
+
+# Main program
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Compile and query binary threat indicator indexes")
+    parser.add_argument("feed", nargs="?", default="threats.json")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompile the index even if it is up to date")
+    parser.add_argument("--ip", action="append", default=[], help="IP address to look up")
+    parser.add_argument("--domain", action="append", default=[], help="Domain to look up")
+    args = parser.parse_args()
+    
+    if args.rebuild:
+        build_index(args.feed)
+    index = load_or_build_index(args.feed)
+    print(f"📇 {index_path(args.feed)}: {len(index)} threats, "
+          f"{len(index.ip_values)} IPs, {len(index.seg_starts)} range segments, "
+          f"{len(index.dom_hashes)} domains, {len(index.exploit_threats)} active exploits")
+    
+    for ip in args.ip:
+        hits = index.lookup_ip(ip)
+        print(f"🔍 {ip}: " + (", ".join(f"{t['id']} ({t['severity']})" for t in hits) or "no match"))
+    for domain in args.domain:
+        hits = index.lookup_domain(domain)
+        print(f"🔍 {domain}: " + (", ".join(f"{t['id']} ({t['severity']})" for t in hits) or "no match"))
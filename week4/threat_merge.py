@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# threat_merge.py
+# Merges and deduplicates several threat intelligence feeds
+
+import json
+
+from ioc_matcher import parse_ip_indicator
+from threat_parser import domain_key, iter_threats, summarize_threats, generate_report
+
+# Severity order used to keep the worst rating of duplicates
+SEVERITY_RANK = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
+
+
+def ip_key(ip):
+    """
+    Dedup key of an IP indicator: the address range it covers, so
+    198.51.100.0/24 and 198.51.100.0-255 are the same indicator.
+    """
+    try:
+        return parse_ip_indicator(ip)
+    except ValueError:
+        return ip.strip()
+
+
+class FeedMerger:
+    """
+    Incrementally merges threats into clusters of duplicates.
+    
+    Threats sharing an id or any indicator end up in the same cluster
+    (transitively). Every key maps to a cluster in a hash index and
+    clusters are joined with union-find, so each threat costs one lookup
+    per key rather than a comparison against every threat seen before.
+    The earlier cluster absorbs the later one, which keeps ids,
+    indicators and provenance in first-seen order.
+    """
+    
+    def __init__(self):
+        self.key_index = {}
+        self.parent = []
+        self.clusters = []
+        self.threats_read = 0
+        self.feeds = []
+    
+    def _find(self, cluster):
+        root = cluster
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[cluster] != root:
+            self.parent[cluster], cluster = root, self.parent[cluster]
+        return root
+    
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return a
+        if b < a:
+            a, b = b, a
+        _merge_records(self.clusters[a], self.clusters[b])
+        self.clusters[b] = None
+        self.parent[b] = a
+        return a
+    
+    def add(self, threat, feed_name=None, feed_date=None):
+        """
+        Adds one threat, merging it with any cluster it overlaps.
+        """
+        self.threats_read += 1
+        cluster = len(self.clusters)
+        self.parent.append(cluster)
+        record = _new_record(threat, feed_name, feed_date)
+        self.clusters.append(record)
+        
+        # Dedup keys: the id and every (normalized) indicator
+        keys = [('id', threat['id'])]
+        keys.extend(('ip', key) for key in record['ips'])
+        keys.extend(('domain', key) for key in record['domains'])
+        for key in keys:
+            other = self.key_index.get(key)
+            if other is None:
+                self.key_index[key] = cluster
+            else:
+                cluster = self._union(cluster, other)
+    
+    def add_feed(self, filename):
+        """
+        Streams every threat of a JSON or NDJSON feed into the merger.
+        
+        Returns: Number of threats read from the feed
+        """
+        metadata = {}
+        count = 0
+        pending = []
+        for threat in iter_threats(filename, metadata):
+            # Metadata after the threats array is only known at the end
+            if 'feed_name' in metadata:
+                self.add(threat, metadata['feed_name'], metadata.get('date'))
+            else:
+                pending.append(threat)
+            count += 1
+        for threat in pending:
+            self.add(threat, metadata.get('feed_name', filename), metadata.get('date'))
+        self.feeds.append({
+            'file': filename,
+            'feed_name': metadata.get('feed_name', filename),
+            'date': metadata.get('date'),
+            'threats': count
+        })
+        return count
+    
+    def merged_threats(self):
+        """
+        Returns: List of consolidated threats, in first-seen order
+        """
+        return [_finish_record(record) for record in self.clusters if record is not None]
+    
+    def merged_feed(self):
+        """
+        Returns: Feed dictionary in the threats.json shape, plus the
+        source feeds and merge counts
+        """
+        threats = self.merged_threats()
+        dates = [feed['date'] for feed in self.feeds if feed['date']]
+        return {
+            'feed_name': "Merged: " + ", ".join(feed['feed_name'] for feed in self.feeds),
+            'date': max(dates) if dates else None,
+            'sources': self.feeds,
+            'merge_stats': {
+                'threats_read': self.threats_read,
+                'threats_merged': len(threats),
+                'duplicates_removed': self.threats_read - len(threats)
+            },
+            'threats': threats
+        }
+
+
+def _new_record(threat, feed_name, feed_date):
+    indicators = threat['indicators']
+    # Dedup key -> indicator as first written
+    ips = {}
+    for ip in indicators.get('ips', ()):
+        ips.setdefault(ip_key(ip), ip.strip())
+    return {
+        'best': threat,
+        'ids': {threat['id']: None},
+        'ips': ips,
+        'domains': {domain_key(domain): domain_key(domain)
+                    for domain in indicators.get('domains', ())},
+        'active_exploit': bool(threat['active_exploit']),
+        'provenance': [{'feed': feed_name, 'date': feed_date, 'id': threat['id']}]
+    }
+
+
+def _merge_records(into, other):
+    """
+    Folds one cluster record into another (dicts keep first-seen order).
+    """
+    if SEVERITY_RANK.get(other['best']['severity'], -1) > \
+            SEVERITY_RANK.get(into['best']['severity'], -1):
+        into['best'] = other['best']
+    into['ids'].update(other['ids'])
+    for field in ('ips', 'domains'):
+        for key, value in other[field].items():
+            into[field].setdefault(key, value)
+    into['active_exploit'] = into['active_exploit'] or other['active_exploit']
+    into['provenance'].extend(other['provenance'])
+
+
+def _finish_record(record):
+    best = record['best']
+    ids = list(record['ids'])
+    threat = {
+        'id': ids[0],
+        'type': best['type'],
+        'severity': best['severity'],
+        'indicators': {
+            'ips': list(record['ips'].values()),
+            'domains': list(record['domains'].values())
+        },
+        'active_exploit': record['active_exploit'],
+        'description': best['description'],
+        'provenance': record['provenance']
+    }
+    if len(ids) > 1:
+        threat['aliases'] = ids[1:]
+    return threat
+
+
+def merge_feeds(filenames):
+    """
+    Merges several threat feeds into one deduplicated feed.
+    
+    Parameters:
+    - filenames: JSON or NDJSON feed files
+    
+    Returns: Merged feed dictionary (see FeedMerger.merged_feed)
+    """
+    merger = FeedMerger()
+    for filename in filenames:
+        merger.add_feed(filename)
+    return merger.merged_feed()
+
+
+# Main program
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Merge and deduplicate threat intelligence feeds")
+    parser.add_argument("feeds", nargs="+", help="Feed files (JSON or NDJSON)")
+    parser.add_argument("-o", "--output", default="merged_threats.json",
+                        help="Merged feed (JSON)")
+    parser.add_argument("-r", "--report", default="merged_threat_report.txt",
+                        help="Consolidated text report")
+    args = parser.parse_args()
+    
+    print(f"📖 Merging {len(args.feeds)} feeds...")
+    merged = merge_feeds(args.feeds)
+    stats = merged['merge_stats']
+    print(f"✓ {stats['threats_read']} threats read, {stats['threats_merged']} after dedup "
+          f"({stats['duplicates_removed']} duplicates removed)")
+    
+    with open(args.output, 'w') as f:
+        json.dump(merged, f, indent=2)
+    print(f"✓ Merged feed saved to {args.output}")
+    
+    analysis = summarize_threats(merged['threats'])
+    generate_report(merged, analysis, args.report)
+    print(f"✓ Consolidated report saved to {args.report}")
@@ -3,30 +3,203 @@
 # Parses JSON threat intelligence data and generates security reports
 
 import json
+import re
+import sys
 from datetime import datetime
 
-def load_threat_data(filename):
+# Characters read from a feed at a time when streaming
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+
+class _FeedReader:
+    """
+    Buffered text reader that decodes one JSON value at a time.
+    
+    Only the unread tail of the buffer is kept, so memory stays around
+    one chunk plus the largest single value.
+    """
+    
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self):
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self):
+        """
+        Skips whitespace and returns the next character ('' at the end).
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+    
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed threat feed: expected '{char}'")
+        self.pos += 1
+    
+    def value(self, with_text=False):
+        """
+        Decodes the next JSON value, reading more input as needed.
+        
+        Returns: The value, or (value, its source text) with with_text
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number or literal ending at the buffer edge may continue
+                if end < len(self.buffer) or self.eof:
+                    start, self.pos = self.pos, end
+                    if with_text:
+                        return value, self.buffer[start:end]
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_threats(filename, metadata=None, with_text=False):
     """
-    Loads threat intelligence data from JSON file.
+    Streams threat objects from a feed without loading it whole.
+    
+    Accepts a JSON document ({"feed_name": ..., "threats": [...]}) or an
+    NDJSON feed with one threat per line; NDJSON lines without an 'id'
+    are treated as feed metadata (e.g. {"feed_name": ..., "date": ...}).
     
     Parameters:
-    - filename: Path to JSON file
+    - filename: Path to the feed
+    - metadata: Optional dictionary that receives the feed's other
+      top-level fields (fields after the threats array appear once the
+      stream is exhausted)
+    - with_text: Yield (threat, source text) pairs instead; the text is
+      None for the first record of an NDJSON feed
     
-    Returns: Parsed JSON data as dictionary
+    Returns: Generator of threat dictionaries
     """
+    if metadata is None:
+        metadata = {}
+    
     with open(filename, 'r') as f:
-        data = json.load(f)
-    return data
+        reader = _FeedReader(f)
+        if not reader.peek():
+            return
+        
+        # Walk the first object field by field: a 'threats' key makes it
+        # a feed document, otherwise it is the first NDJSON record
+        reader.expect('{')
+        record = {}
+        fields = 0
+        while reader.peek() != '}':
+            if fields:
+                reader.expect(',')
+            fields += 1
+            key = reader.value()
+            reader.expect(':')
+            if key == 'threats':
+                metadata.update(record)
+                yield from _iter_threat_array(reader, with_text)
+                yield from _iter_document_tail(reader, metadata, with_text)
+                return
+            record[key] = reader.value()
+        reader.pos += 1
+        yield from _iter_ndjson(reader, record, metadata, with_text)
 
 
-def analyze_threats(threat_data):
+def _iter_threat_array(reader, with_text=False):
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value(with_text)
+        if reader.peek() == ']':
+            reader.pos += 1
+            return
+        reader.expect(',')
+
+
+def _iter_document_tail(reader, metadata, with_text=False):
     """
-    Analyzes threat data and generates statistics.
+    Walks the top-level fields that follow the threats array.
+    """
+    while reader.peek() != '}':
+        reader.expect(',')
+        key = reader.value()
+        reader.expect(':')
+        if key == 'threats':
+            yield from _iter_threat_array(reader, with_text)
+        else:
+            metadata[key] = reader.value()
+    reader.pos += 1
+
+
+def _iter_ndjson(reader, record, metadata, with_text=False):
+    """
+    Yields NDJSON threats, starting with an already decoded first record.
+    """
+    # The first record was decoded field by field, so it has no text
+    text = None
+    while record is not None:
+        if 'id' in record:
+            yield (record, text) if with_text else record
+        else:
+            metadata.update(record)
+        if not reader.peek():
+            return
+        if with_text:
+            record, text = reader.value(True)
+        else:
+            record = reader.value()
+
+
+def domain_key(domain):
+    """
+    Normalizes a domain indicator: lowercase, without a trailing dot.
+    """
+    return domain.strip().lower().rstrip('.')
+
+
+def load_threat_data(filename):
+    """
+    Loads threat intelligence data from a JSON or NDJSON feed.
     
-    Returns: Dictionary with analysis results
+    Parameters:
+    - filename: Path to the feed
+    
+    Returns: Feed dictionary with a 'threats' list
     """
-    threats = threat_data['threats']
+    metadata = {}
+    threats = list(iter_threats(filename, metadata))
+    return {**metadata, 'threats': threats}
+
+
+def summarize_threats(threats):
+    """
+    Aggregates threats in one pass as they stream in.
+    
+    Only distinct IPs and active exploits are kept, never the full
+    indicator lists.
+    
+    Parameters:
+    - threats: Iterable of threat dictionaries (e.g. iter_threats)
     
+    Returns: Dictionary with analysis results
+    """
     # Count threats by severity
     severity_counts = {
         'CRITICAL': 0,
@@ -35,21 +208,32 @@ def analyze_threats(threat_data):
         'LOW': 0
     }
     
-    # Collect all malicious IPs
-    all_ips = []
+    unique_ips = set()
+    total_ips = 0
+    unique_domains = set()
+    total_domains = 0
+    total_threats = 0
     
     # Find active exploits
     active_exploits = []
     
     # Process each threat
     for threat in threats:
+        total_threats += 1
+        
         # Count by severity
         severity = threat['severity']
         severity_counts[severity] += 1
         
         # Extract IPs
         ips = threat['indicators']['ips']
-        all_ips.extend(ips)
+        total_ips += len(ips)
+        unique_ips.update(ips)
+        
+        # Extract domains
+        domains = threat['indicators'].get('domains', ())
+        total_domains += len(domains)
+        unique_domains.update(map(domain_key, domains))
         
         # Check for active exploits
         if threat['active_exploit']:
@@ -60,19 +244,107 @@ def analyze_threats(threat_data):
             })
     
     # Calculate percentage of CRITICAL threats
-    total_threats = len(threats)
-    critical_percentage = (severity_counts['CRITICAL'] / total_threats) * 100
+    if total_threats:
+        critical_percentage = (severity_counts['CRITICAL'] / total_threats) * 100
+    else:
+        critical_percentage = 0.0
     
     return {
         'total_threats': total_threats,
         'severity_counts': severity_counts,
-        'unique_ips': list(set(all_ips)),  # Remove duplicates
-        'total_ips': len(all_ips),
+        'unique_ips': list(unique_ips),
+        'total_ips': total_ips,
+        'unique_domains': list(unique_domains),
+        'total_domains': total_domains,
         'active_exploits': active_exploits,
         'critical_percentage': critical_percentage
     }
 
 
+def analyze_threats(threat_data):
+    """
+    Analyzes threat data and generates statistics.
+    
+    Returns: Dictionary with analysis results
+    """
+    return summarize_threats(threat_data['threats'])
+
+
+def report_header(threat_data):
+    """
+    Returns: Report title block lines
+    """
+    return [
+        "=" * 70,
+        "THREAT INTELLIGENCE ANALYSIS REPORT",
+        "=" * 70,
+        f"Feed: {threat_data.get('feed_name', 'N/A')}",
+        f"Date: {threat_data.get('date', 'N/A')}",
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        ""
+    ]
+
+
+def report_summary(analysis):
+    """
+    Returns: Summary statistics section lines
+    """
+    return [
+        "-" * 70,
+        "SUMMARY STATISTICS",
+        "-" * 70,
+        f"Total Threats: {analysis['total_threats']}",
+        f"Total Malicious IPs: {analysis['total_ips']}",
+        f"Unique IPs: {len(analysis['unique_ips'])}",
+        f"Total Malicious Domains: {analysis['total_domains']}",
+        f"Unique Domains: {len(analysis['unique_domains'])}",
+        f"Active Exploits: {len(analysis['active_exploits'])}",
+        ""
+    ]
+
+
+def report_severity(analysis):
+    """
+    Returns: Severity breakdown section lines
+    """
+    lines = ["-" * 70, "SEVERITY BREAKDOWN", "-" * 70]
+    for severity, count in analysis['severity_counts'].items():
+        if count > 0:
+            lines.append(f"{severity:10}: {count} threats")
+    lines.append(f"\nCRITICAL threats: {analysis['critical_percentage']:.1f}%")
+    lines.append("")
+    return lines
+
+
+def report_listing(title, items):
+    """
+    Returns: Section lines listing already sorted items (IPs, domains)
+    """
+    lines = ["-" * 70, title, "-" * 70]
+    lines.extend(map("  - ".__add__, items))
+    lines.append("")
+    return lines
+
+
+def report_exploits(active_exploits):
+    """
+    Returns: Active exploits section lines
+    """
+    lines = ["-" * 70, "ACTIVE EXPLOITS (IMMEDIATE ATTENTION REQUIRED)", "-" * 70]
+    for exploit in active_exploits:
+        lines.append(f"\n{exploit['id']} ({exploit['type'].upper()})")
+        lines.append(f"  Description: {exploit['description']}")
+    lines.append("")
+    return lines
+
+
+def report_footer():
+    """
+    Returns: Report footer lines
+    """
+    return ["=" * 70, "END OF REPORT", "=" * 70]
+
+
 def generate_report(threat_data, analysis, output_file):
     """
     Generates a formatted text report and saves to file.
@@ -83,57 +355,13 @@ def generate_report(threat_data, analysis, output_file):
     - output_file: Path to output file
     """
     report_lines = []
-    
-    # Header
-    report_lines.append("=" * 70)
-    report_lines.append("THREAT INTELLIGENCE ANALYSIS REPORT")
-    report_lines.append("=" * 70)
-    report_lines.append(f"Feed: {threat_data['feed_name']}")
-    report_lines.append(f"Date: {threat_data['date']}")
-    report_lines.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report_lines.append("")
-    
-    # Summary statistics
-    report_lines.append("-" * 70)
-    report_lines.append("SUMMARY STATISTICS")
-    report_lines.append("-" * 70)
-    report_lines.append(f"Total Threats: {analysis['total_threats']}")
-    report_lines.append(f"Total Malicious IPs: {analysis['total_ips']}")
-    report_lines.append(f"Unique IPs: {len(analysis['unique_ips'])}")
-    report_lines.append(f"Active Exploits: {len(analysis['active_exploits'])}")
-    report_lines.append("")
-    
-    # Severity breakdown
-    report_lines.append("-" * 70)
-    report_lines.append("SEVERITY BREAKDOWN")
-    report_lines.append("-" * 70)
-    for severity, count in analysis['severity_counts'].items():
-        if count > 0:
-            report_lines.append(f"{severity:10}: {count} threats")
-    report_lines.append(f"\nCRITICAL threats: {analysis['critical_percentage']:.1f}%")
-    report_lines.append("")
-    
-    # Malicious IPs
-    report_lines.append("-" * 70)
-    report_lines.append("MALICIOUS IP ADDRESSES")
-    report_lines.append("-" * 70)
-    for ip in sorted(analysis['unique_ips']):
-        report_lines.append(f"  - {ip}")
-    report_lines.append("")
-    
-    # Active exploits
-    report_lines.append("-" * 70)
-    report_lines.append("ACTIVE EXPLOITS (IMMEDIATE ATTENTION REQUIRED)")
-    report_lines.append("-" * 70)
-    for exploit in analysis['active_exploits']:
-        report_lines.append(f"\n{exploit['id']} ({exploit['type'].upper()})")
-        report_lines.append(f"  Description: {exploit['description']}")
-    report_lines.append("")
-    
-    # Footer
-    report_lines.append("=" * 70)
-    report_lines.append("END OF REPORT")
-    report_lines.append("=" * 70)
+    report_lines.extend(report_header(threat_data))
+    report_lines.extend(report_summary(analysis))
+    report_lines.extend(report_severity(analysis))
+    report_lines.extend(report_listing("MALICIOUS IP ADDRESSES", sorted(analysis['unique_ips'])))
+    report_lines.extend(report_listing("MALICIOUS DOMAINS", sorted(analysis['unique_domains'])))
+    report_lines.extend(report_exploits(analysis['active_exploits']))
+    report_lines.extend(report_footer())
     
     # Write to file using context manager
     with open(output_file, 'w') as f:
@@ -149,15 +377,13 @@ if __name__ == "__main__":
     print("=" * 70)
     print()
     
-    # Load threat data from JSON file
-    print("📖 Loading threat data from threats.json...")
-    threat_data = load_threat_data('threats.json')
-    print(f"✓ Loaded {len(threat_data['threats'])} threats from {threat_data['feed_name']}")
-    print()
-    
-    # Analyze the data
+    # Stream threats from the feed and analyze them as they arrive
+    feed_file = sys.argv[1] if len(sys.argv) > 1 else 'threats.json'
+    print(f"📖 Streaming threat data from {feed_file}...")
     print("🔍 Analyzing threat intelligence...")
-    analysis = analyze_threats(threat_data)
+    threat_data = {}
+    analysis = summarize_threats(iter_threats(feed_file, threat_data))
+    print(f"✓ Loaded {analysis['total_threats']} threats from {threat_data.get('feed_name', feed_file)}")
     print("✓ Analysis complete")
     print()
     